@@ -1,71 +1,133 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 import json
-from auth.auth import Authenticator
+from auth.auth_key_cache import get_auth_key_cache
 from constants.database import MONGO_URI, DATABASE_NAME, \
     MASTER_PASSWORD_COLLECTION_NAME
-from constants.request_parameters import HEADERS_AUTH_KEY_PARAM
+from constants.metrics_config import METRICS_CONTENT_TYPE, STAGE_ENCODE
+from constants.request_parameters import HEADERS_AUTH_KEY_PARAM, HEADERS_NEXT_PAGE_TOKEN_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, JSON_MIMETYPE, NDJSON_MIMETYPE
 from constants.response_messages import SUCCESS, UNAUTHORIZED, \
     INTERNAL_ERROR, NOT_FOUND, SUCCESS_RESPONSE_CODE, \
     INVALID_REQUEST_RESPONSE_CODE, UNAUTHORIZED_RESPONSE_CODE, \
-    NOT_FOUND_RESPONSE_CODE, INTERNAL_ERROR_RESPONSE_CODE
-from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH
+    NOT_FOUND_RESPONSE_CODE, INTERNAL_ERROR_RESPONSE_CODE, VALID_INSERT_COMMAND, \
+    VALID_UPDATE_COMMAND
+from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH, BULK_INSERT_PATH, METRICS_PATH
+from crypto.cipher_key_cache import cipher_key_cache
+from crypto.crypto_pool import crypto_pool
+from database.command_profiler import command_profiler
+from database.pool_monitor import render_pool_metrics
 from database.dbclient import DbClient
 from flask import Flask
+from flask import Response
 from flask import request
+from flask import stream_with_context
 from middleware.auth_middleware import auth_required
+from middleware.bulk_insert_middleware import validate_bulk_insert_request
 from middleware.insert_middleware import validate_insert_request
 from middleware.query_middleware import validate_query_request
+from middleware.request_context import get_request_context
+from middleware.timing_middleware import register_request_timing
 from middleware.update_middleware import validate_update_request
+from processor.bulk_insert_processor import BulkInsertProcessor
+from processor.duplicate_record_error import DuplicateRecordError
 from processor.insert_processor import InsertProcessor
 from processor.query_processor import QueryProcessor
 from processor.update_processor import UpdateProcessor
+from utils.json_stream import generate_json_chunks
+from utils.request_timing import time_stage, time_iteration, render_metrics
+from validator.master_credential_cache import get_master_credential_cache
 
-dbclient = DbClient(mongo_uri=MONGO_URI, database=DATABASE_NAME)
-app = Flask(__name__)
 
+def create_app(mongo_uri=MONGO_URI, database=DATABASE_NAME):
+    """Creates the Flask server along with its database client and starts watching the auth and master collections.
+    Nothing is connected at import time, as the worker processes of the crypto pool import the main module again.
+    Args:
+        mongo_uri (str, optional): Uri of the MongoDB server. Defaults to MONGO_URI.
+        database (str, optional): Name of the database. Defaults to DATABASE_NAME.
+    Returns:
+        Flask: The Flask application.
+    """
+    dbclient = DbClient(mongo_uri=mongo_uri, database=database)
+    get_auth_key_cache(dbclient).watch_changes()
+    get_master_credential_cache(dbclient).watch_changes()
+    app = Flask(__name__)
+    register_request_timing(app)
 
-@app.route(INSERT_PATH, methods=['POST'])
-@auth_required(dbclient)
-@validate_insert_request(dbclient)
-def insert():
-    InsertProcessor(request, dbclient).process()
-    return (SUCCESS, SUCCESS_RESPONSE_CODE)
+    @app.route(INSERT_PATH, methods=['POST'])
+    @auth_required(dbclient)
+    @validate_insert_request(dbclient)
+    def insert():
+        try:
+            InsertProcessor(request, dbclient).process()
+            return (SUCCESS, SUCCESS_RESPONSE_CODE)
+        except DuplicateRecordError as e:
+            return ('{}\n{}'.format(e.args[0], VALID_INSERT_COMMAND), INVALID_REQUEST_RESPONSE_CODE)
 
+    @app.route(QUERY_PATH, methods=['POST'])
+    @auth_required(dbclient)
+    @validate_query_request(dbclient)
+    def query():
+        try:
+            processor = QueryProcessor(request, dbclient)
+            if processor.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE:
+                mimetype = request.accept_mimetypes.best_match(
+                    [JSON_MIMETYPE, NDJSON_MIMETYPE], default=JSON_MIMETYPE)
+                chunks = time_iteration(generate_json_chunks(processor.iterate_results(
+                ), ndjson=mimetype == NDJSON_MIMETYPE, indent=processor.indent), STAGE_ENCODE)
+                if processor.limit == None:
+                    return Response(stream_with_context(chunks), SUCCESS_RESPONSE_CODE, mimetype=mimetype)
+                # The next page token is known only after the page is read, so the page is read before sending the headers.
+                body = ''.join(chunks)
+                headers = {}
+                if processor.next_page_token != None:
+                    headers[HEADERS_NEXT_PAGE_TOKEN_PARAM] = processor.next_page_token
+                return Response(body, SUCCESS_RESPONSE_CODE, headers=headers, mimetype=mimetype)
+            result = processor.process()
+            with time_stage(STAGE_ENCODE):
+                body = json.dumps(result, indent=processor.indent)
+            return (body, SUCCESS_RESPONSE_CODE)
+        except Exception as e:
+            return (str(e.args), INVALID_REQUEST_RESPONSE_CODE)
 
-@app.route(QUERY_PATH, methods=['POST'])
-@auth_required(dbclient)
-@validate_query_request(dbclient)
-def query():
-    try:
-        result = QueryProcessor(request, dbclient).process()
-        return (json.dumps(result, indent=2), SUCCESS_RESPONSE_CODE)
-    except Exception as e:
-        return (str(e.args), INVALID_REQUEST_RESPONSE_CODE)
+    @app.route(UPDATE_PATH, methods=['POST'])
+    @auth_required(dbclient)
+    @validate_update_request(dbclient)
+    def update():
+        try:
+            UpdateProcessor(request, dbclient, get_request_context()).process()
+            return (SUCCESS, SUCCESS_RESPONSE_CODE)
+        except DuplicateRecordError as e:
+            return ('{}\n{}'.format(e.args[0], VALID_UPDATE_COMMAND), INVALID_REQUEST_RESPONSE_CODE)
 
+    @app.route(BULK_INSERT_PATH, methods=['POST'])
+    @auth_required(dbclient)
+    @validate_bulk_insert_request(dbclient)
+    def bulk_insert():
+        result = BulkInsertProcessor(request, dbclient).process()
+        with time_stage(STAGE_ENCODE):
+            body = json.dumps(result, indent=2)
+        return (body, SUCCESS_RESPONSE_CODE)
 
-@app.route(UPDATE_PATH, methods=['POST'])
-@auth_required(dbclient)
-@validate_update_request(dbclient)
-def update():
-    UpdateProcessor(request, dbclient).process()
-    return (SUCCESS, SUCCESS_RESPONSE_CODE)
+    @app.route(METRICS_PATH, methods=['GET'])
+    def metrics():
+        body = render_metrics() + '\n'.join(command_profiler.render() +
+                                             render_pool_metrics() + crypto_pool.render() +
+                                             get_auth_key_cache(dbclient).render() + cipher_key_cache.render()) + '\n'
+        return Response(body, SUCCESS_RESPONSE_CODE, content_type=METRICS_CONTENT_TYPE)
 
+    @app.errorhandler(UNAUTHORIZED_RESPONSE_CODE)
+    def api_unauthorized(error):
+        return (UNAUTHORIZED, UNAUTHORIZED_RESPONSE_CODE)
 
-@app.errorhandler(UNAUTHORIZED_RESPONSE_CODE)
-def api_unauthorized(error):
-    return (UNAUTHORIZED, UNAUTHORIZED_RESPONSE_CODE)
+    @app.errorhandler(NOT_FOUND_RESPONSE_CODE)
+    def api_not_found(error):
+        return (NOT_FOUND, NOT_FOUND_RESPONSE_CODE)
 
-
-@app.errorhandler(NOT_FOUND_RESPONSE_CODE)
-def api_not_found(error):
-    return (NOT_FOUND, NOT_FOUND_RESPONSE_CODE)
-
-
-@app.errorhandler(500)
-def api_internal_error(error):
-    return (INTERNAL_ERROR, INTERNAL_ERROR_RESPONSE_CODE)
+    @app.errorhandler(500)
+    def api_internal_error(error):
+        return (INTERNAL_ERROR, INTERNAL_ERROR_RESPONSE_CODE)
+    return app
 
 
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
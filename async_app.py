@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+from auth.auth_key_cache import get_auth_key_cache
+from constants.database import MONGO_URI, DATABASE_NAME
+from constants.metrics_config import METRICS_CONTENT_TYPE, STAGE_ENCODE
+from constants.request_parameters import HEADERS_NEXT_PAGE_TOKEN_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, JSON_MIMETYPE, NDJSON_MIMETYPE
+from constants.response_messages import SUCCESS, UNAUTHORIZED, \
+    INTERNAL_ERROR, NOT_FOUND, SUCCESS_RESPONSE_CODE, \
+    INVALID_REQUEST_RESPONSE_CODE, UNAUTHORIZED_RESPONSE_CODE, \
+    NOT_FOUND_RESPONSE_CODE, INTERNAL_ERROR_RESPONSE_CODE, VALID_INSERT_COMMAND, \
+    VALID_UPDATE_COMMAND, VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND, \
+    VALID_GET_MULTIPLE_SECRETS_QUERY_TYPE_COMMAND
+from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH, METRICS_PATH
+from database.async_dbclient import AsyncDbClient
+from crypto.cipher_key_cache import cipher_key_cache
+from crypto.crypto_pool import crypto_pool
+from database.command_profiler import command_profiler
+from database.pool_monitor import render_pool_metrics
+from database.dbclient import DbClient
+from middleware.async_middleware import async_auth_required, validate_async_request, register_async_request_timing, FORM_REQUEST_ATTRIBUTE
+from middleware.request_context import REQUEST_CONTEXT_ATTRIBUTE
+from processor.duplicate_record_error import DuplicateRecordError
+from processor.insert_processor import InsertProcessor
+from processor.query_processor import QueryProcessor
+from processor.update_processor import UpdateProcessor
+from quart import Quart
+from quart import Response
+from quart import g
+from quart import request
+from utils.async_executor import run_blocking
+from utils.json_stream import generate_json_chunks_async
+from utils.request_timing import time_stage, time_async_iteration, render_metrics
+from validator.insert_request_validator import InsertRequestValidator
+from validator.master_credential_cache import get_master_credential_cache
+from validator.query_request_validator import QueryRequestValidator
+from validator.update_request_validator import UpdateRequestValidator
+
+VALID_QUERY_COMMAND = '{}\nOR\n{}\nOR\n{}'.format(
+    VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND, VALID_GET_MULTIPLE_SECRETS_QUERY_TYPE_COMMAND)
+
+
+def create_app(mongo_uri=MONGO_URI, database=DATABASE_NAME):
+    """Creates the Quart server along with its database clients and starts watching the auth and master collections.
+    Nothing is connected at import time, as the worker processes of the crypto pool import the main module again.
+    Args:
+        mongo_uri (str, optional): Uri of the MongoDB server. Defaults to MONGO_URI.
+        database (str, optional): Name of the database. Defaults to DATABASE_NAME.
+    Returns:
+        Quart: The Quart application.
+    """
+    # The synchronous client backs the auth and master caches and the validators, which run in the thread pool.
+    # The records are read and written with the async client.
+    dbclient = DbClient(mongo_uri=mongo_uri, database=database)
+    get_auth_key_cache(dbclient).watch_changes()
+    get_master_credential_cache(dbclient).watch_changes()
+    async_dbclient = AsyncDbClient(mongo_uri=mongo_uri, database=database)
+    app = Quart(__name__)
+    register_async_request_timing(app)
+
+    @app.before_serving
+    async def load_collections():
+        await async_dbclient.refresh_collections()
+        await async_dbclient.warm_up()
+
+    @app.route(INSERT_PATH, methods=['POST'])
+    @async_auth_required(dbclient)
+    @validate_async_request(InsertRequestValidator, dbclient, VALID_INSERT_COMMAND)
+    async def insert():
+        try:
+            processor = await run_blocking(InsertProcessor, g.get(FORM_REQUEST_ATTRIBUTE), async_dbclient)
+            await processor.process_async()
+            return (SUCCESS, SUCCESS_RESPONSE_CODE)
+        except DuplicateRecordError as e:
+            return ('{}\n{}'.format(e.args[0], VALID_INSERT_COMMAND), INVALID_REQUEST_RESPONSE_CODE)
+
+    @app.route(QUERY_PATH, methods=['POST'])
+    @async_auth_required(dbclient)
+    @validate_async_request(QueryRequestValidator, dbclient, VALID_QUERY_COMMAND)
+    async def query():
+        try:
+            processor = await run_blocking(QueryProcessor, g.get(FORM_REQUEST_ATTRIBUTE), async_dbclient)
+            if processor.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE:
+                mimetype = request.accept_mimetypes.best_match(
+                    [JSON_MIMETYPE, NDJSON_MIMETYPE], default=JSON_MIMETYPE)
+                chunks = time_async_iteration(generate_json_chunks_async(processor.iterate_results_async(
+                ), ndjson=mimetype == NDJSON_MIMETYPE, indent=processor.indent), STAGE_ENCODE)
+                if processor.limit == None:
+                    return Response(chunks, SUCCESS_RESPONSE_CODE, mimetype=mimetype)
+                # The next page token is known only after the page is read, so the page is read before sending the headers.
+                body = ''.join([chunk async for chunk in chunks])
+                headers = {}
+                if processor.next_page_token != None:
+                    headers[HEADERS_NEXT_PAGE_TOKEN_PARAM] = processor.next_page_token
+                return Response(body, SUCCESS_RESPONSE_CODE, headers=headers, mimetype=mimetype)
+            result = await processor.process_async()
+            with time_stage(STAGE_ENCODE):
+                body = json.dumps(result, indent=processor.indent)
+            return (body, SUCCESS_RESPONSE_CODE)
+        except Exception as e:
+            return (str(e.args), INVALID_REQUEST_RESPONSE_CODE)
+
+    @app.route(UPDATE_PATH, methods=['POST'])
+    @async_auth_required(dbclient)
+    @validate_async_request(UpdateRequestValidator, dbclient, VALID_UPDATE_COMMAND)
+    async def update():
+        try:
+            processor = await run_blocking(UpdateProcessor, g.get(FORM_REQUEST_ATTRIBUTE), async_dbclient, g.get(REQUEST_CONTEXT_ATTRIBUTE))
+            await processor.process_async()
+            return (SUCCESS, SUCCESS_RESPONSE_CODE)
+        except DuplicateRecordError as e:
+            return ('{}\n{}'.format(e.args[0], VALID_UPDATE_COMMAND), INVALID_REQUEST_RESPONSE_CODE)
+
+    @app.route(METRICS_PATH, methods=['GET'])
+    async def metrics():
+        body = render_metrics() + '\n'.join(command_profiler.render() +
+                                             render_pool_metrics() + crypto_pool.render() +
+                                             get_auth_key_cache(dbclient).render() + cipher_key_cache.render()) + '\n'
+        return Response(body, SUCCESS_RESPONSE_CODE, content_type=METRICS_CONTENT_TYPE)
+
+    @app.errorhandler(UNAUTHORIZED_RESPONSE_CODE)
+    async def api_unauthorized(error):
+        return (UNAUTHORIZED, UNAUTHORIZED_RESPONSE_CODE)
+
+    @app.errorhandler(NOT_FOUND_RESPONSE_CODE)
+    async def api_not_found(error):
+        return (NOT_FOUND, NOT_FOUND_RESPONSE_CODE)
+
+    @app.errorhandler(500)
+    async def api_internal_error(error):
+        return (INTERNAL_ERROR, INTERNAL_ERROR_RESPONSE_CODE)
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run()
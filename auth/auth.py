@@ -1,4 +1,4 @@
-from constants.database import AUTH_COLLECTION_NAME, AUTH_COLLECTION_KEY_FIELD
+from auth.auth_key_cache import get_auth_key_cache
 from utils.hash import generate_hash
 
 
@@ -6,25 +6,22 @@ class Authenticator:
     """A wrapper class for authentication
 
     Attributes:
-        auth_collection (Collection): The collection where auth keys are stored in each row.
+        auth_key_cache (AuthKeyCache): The process-local cache of the auth key hashes.
     """
-    auth_collection = None
+    auth_key_cache = None
 
     def __init__(self, dbclient):
         """
         Args:
             dbclient (DbClient): The database client object.
         """
-        self.auth_collection = dbclient.get_collection(AUTH_COLLECTION_NAME)
+        self.auth_key_cache = get_auth_key_cache(dbclient)
 
     def authenticate(self, key):
-        """ Authenticates a key.
+        """ Authenticates a key. The hash of the key is looked up in the auth key cache.
         Args:
             key (str): The authentication key whose hash is present in the auth collection.
         Returns:
             bool: True of the hash of the auth key was found, False otherwise.
         """
-        cursor = self.auth_collection.find({
-            AUTH_COLLECTION_KEY_FIELD: generate_hash(key)
-        })
-        return cursor != None and cursor.count() != 0
+        return self.auth_key_cache.contains(generate_hash(key))
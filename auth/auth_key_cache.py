@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from constants.database import AUTH_COLLECTION_NAME, AUTH_COLLECTION_KEY_FIELD, AUTH_KEY_CACHE_TTL_SECONDS, AUTH_NEGATIVE_CACHE_MAX_SIZE, AUTH_NEGATIVE_CACHE_TTL_SECONDS
+from constants.metrics_config import STAGE_DB
+from pymongo.errors import PyMongoError
+from utils.request_timing import time_stage
+
+
+class AuthKeyCache:
+    """A process-local cache of the auth key hashes stored in the auth collection.
+
+    All the hashes are loaded into a set, which is loaded again once its time to live expires or after invalidate() is called.
+    A hash missing from the set is looked up in the auth collection, so that newly added keys are accepted immediately.
+    Hashes that are not found are remembered in a bounded negative cache, so that repeated invalid keys don't query the database.
+
+    Attributes:
+        auth_collection (Collection): The collection where auth keys are stored in each row.
+        ttl (float): Number of seconds the set of hashes stays in the cache.
+        negative_max_size (int): Maximum number of invalid hashes remembered.
+        negative_ttl (float): Number of seconds an invalid hash is remembered.
+        clock (function): Returns the current time in seconds.
+        keys (set): The set of valid auth key hashes. None if the set is not loaded.
+        expiry (float): The time at which the set of hashes expires.
+        negative_keys (OrderedDict): Map of invalid hash to its expiry time, ordered from least to most recently added.
+        generation (int): Incremented on every invalidation, so that a load racing with an invalidation is not cached.
+        hits (int): Number of lookups served from the set of valid hashes.
+        negative_hits (int): Number of lookups served from the negative cache.
+        misses (int): Number of lookups that queried the database.
+        lock (Lock): Lock guarding the cached hashes and the counters.
+    """
+    auth_collection = None
+    ttl = None
+    negative_max_size = None
+    negative_ttl = None
+    clock = None
+    keys = None
+    expiry = None
+    negative_keys = None
+    generation = None
+    hits = None
+    negative_hits = None
+    misses = None
+    lock = None
+
+    def __init__(self, auth_collection, ttl=AUTH_KEY_CACHE_TTL_SECONDS, negative_max_size=AUTH_NEGATIVE_CACHE_MAX_SIZE, negative_ttl=AUTH_NEGATIVE_CACHE_TTL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            auth_collection (Collection): The collection where auth keys are stored in each row.
+            ttl (float, optional): Number of seconds the set of hashes stays in the cache. Defaults to AUTH_KEY_CACHE_TTL_SECONDS.
+            negative_max_size (int, optional): Maximum number of invalid hashes remembered. Defaults to AUTH_NEGATIVE_CACHE_MAX_SIZE.
+            negative_ttl (float, optional): Number of seconds an invalid hash is remembered. Defaults to AUTH_NEGATIVE_CACHE_TTL_SECONDS.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.auth_collection = auth_collection
+        self.ttl = ttl
+        self.negative_max_size = negative_max_size
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.negative_keys = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def contains(self, key_hash):
+        """Checks whether the hash is present in the auth collection.
+        Args:
+            key_hash (str): Hash of the authentication key.
+        Returns:
+            bool: True if the hash is present in the auth collection, False otherwise.
+        """
+        now = self.clock()
+        with self.lock:
+            keys = self.keys if self.keys != None and now < self.expiry else None
+        if keys == None:
+            keys = self.__load()
+
+        with self.lock:
+            if key_hash in keys:
+                self.hits += 1
+                return True
+            expiry = self.negative_keys.get(key_hash)
+            if expiry != None and now < expiry:
+                self.negative_hits += 1
+                return False
+            self.misses += 1
+
+        with time_stage(STAGE_DB):
+            found = next(self.auth_collection.find({
+                AUTH_COLLECTION_KEY_FIELD: key_hash
+            }), None) != None
+
+        with self.lock:
+            if found:
+                keys.add(key_hash)
+                self.negative_keys.pop(key_hash, None)
+            else:
+                self.negative_keys.pop(key_hash, None)
+                self.negative_keys[key_hash] = self.clock() + self.negative_ttl
+                while len(self.negative_keys) > self.negative_max_size:
+                    self.negative_keys.popitem(last=False)
+        return found
+
+    def invalidate(self):
+        """Drops the cached hashes. They are loaded again on the next lookup."""
+        with self.lock:
+            self.keys = None
+            self.expiry = None
+            self.negative_keys.clear()
+            self.generation += 1
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: The lookup counters and the hit rate, which is the fraction of lookups that didn't query the database.
+        """
+        with self.lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.negative_hits) / lookups if lookups > 0 else 0.0
+            }
+
+    def render(self):
+        """
+        Returns:
+            list: The lookup counters and the hit rate in the Prometheus text format.
+        """
+        stats = self.get_stats()
+        return ['# HELP pwdmngr_auth_key_cache_lookups_total Number of auth key lookups by result.',
+                '# TYPE pwdmngr_auth_key_cache_lookups_total counter'] + \
+            ['pwdmngr_auth_key_cache_lookups_total{{result="{}"}} {}'.format(result, stats[field]) for result, field in [
+                ('hit', 'hits'), ('negative_hit', 'negative_hits'), ('miss', 'misses')]] + \
+            ['# HELP pwdmngr_auth_key_cache_hit_rate Fraction of auth key lookups that did not query the database.',
+             '# TYPE pwdmngr_auth_key_cache_hit_rate gauge',
+             'pwdmngr_auth_key_cache_hit_rate {}'.format(stats['hit_rate'])]
+
+    def watch_changes(self):
+        """Starts a daemon thread that invalidates the cached hashes on every change to the auth collection.
+        Change streams require a replica set. If they are unavailable the thread exits and the time to live is relied on.
+        Returns:
+            Thread: The started thread.
+        """
+        thread = threading.Thread(target=self.__watch, daemon=True)
+        thread.start()
+        return thread
+
+    def __load(self):
+        """Loads all the hashes of the auth collection into a new set.
+        Returns:
+            set: The set of valid auth key hashes.
+        """
+        with self.lock:
+            generation = self.generation
+        with time_stage(STAGE_DB):
+            keys = set(document[AUTH_COLLECTION_KEY_FIELD] for document in self.auth_collection.find(
+                {}, {AUTH_COLLECTION_KEY_FIELD: 1}))
+        with self.lock:
+            if generation == self.generation:
+                self.keys = keys
+                self.expiry = self.clock() + self.ttl
+        return keys
+
+    def __watch(self):
+        """Invalidates the cached hashes for every event of the change stream on the auth collection."""
+        try:
+            with self.auth_collection.watch() as stream:
+                for _ in stream:
+                    self.invalidate()
+        except PyMongoError as e:
+            logging.getLogger(__name__).warning(
+                'Auth collection change stream unavailable, relying on TTL: %s', e)
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_auth_key_cache(dbclient):
+    """Returns the auth key cache of the database client. The cache is created on the first call.
+    Args:
+        dbclient (DbClient): The database client object.
+    Returns:
+        AuthKeyCache: The cache shared by all requests using the database client.
+    """
+    with _caches_lock:
+        if dbclient not in _caches:
+            _caches[dbclient] = AuthKeyCache(
+                dbclient.get_collection(AUTH_COLLECTION_NAME))
+        return _caches[dbclient]
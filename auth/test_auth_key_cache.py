@@ -0,0 +1,114 @@
+from auth.auth_key_cache import AuthKeyCache
+from constants.database import AUTH_COLLECTION_KEY_FIELD
+from mock import Mock
+from utils.hash import generate_hash
+from utils.test import create_mock_clock, create_mock_cursor
+
+
+def create_auth_documents(*keys):
+    """Creates the rows of auth collection.
+    Args:
+        keys (str): The keys whose hashes are stored in the rows.
+    Returns:
+        list: The rows.
+    """
+    return [{AUTH_COLLECTION_KEY_FIELD: generate_hash(key)} for key in keys]
+
+
+def create_auth_collection(documents):
+    """Creates a mock auth collection whose find() returns a new cursor on every call.
+    A find() with an empty query returns all the rows. Otherwise the rows matching the query are returned.
+    Args:
+        documents (list): The rows of the collection. The list can be changed to simulate writes.
+    Returns:
+        Mock: Mock Collection object.
+    """
+    def find(query, projection=None):
+        if len(query) == 0:
+            return create_mock_cursor(cursor_values=documents)
+        return create_mock_cursor(cursor_values=[document for document in documents if document == query])
+
+    collection = Mock()
+    collection.find = Mock(side_effect=find)
+    return collection
+
+
+def test_auth_key_cache_hit_after_load():
+    """Tests that the hashes are loaded once and valid keys are served from the set."""
+
+    collection = create_auth_collection(create_auth_documents('key1', 'key2'))
+    cache = AuthKeyCache(collection)
+    assert cache.contains(generate_hash('key1')) == True
+    assert cache.contains(generate_hash('key2')) == True
+    assert collection.find.call_count == 1
+    assert cache.get_stats()['hit_rate'] == 1.0
+
+
+def test_auth_key_cache_negative_hit():
+    """Tests that an invalid key queries the database once and is served from the negative cache afterwards."""
+
+    collection = create_auth_collection(create_auth_documents('key1'))
+    cache = AuthKeyCache(collection)
+    for _ in range(5):
+        assert cache.contains(generate_hash('bad_key')) == False
+    assert collection.find.call_count == 2
+    assert cache.get_stats() == {
+        'hits': 0, 'negative_hits': 4, 'misses': 1, 'hit_rate': 0.8}
+
+
+def test_auth_key_cache_render():
+    """Tests the Prometheus metrics of the cache after a hit, a miss and a negative hit."""
+
+    cache = AuthKeyCache(create_auth_collection(create_auth_documents('key1')))
+    cache.contains(generate_hash('key1'))
+    cache.contains(generate_hash('bad_key'))
+    cache.contains(generate_hash('bad_key'))
+    lines = cache.render()
+    assert 'pwdmngr_auth_key_cache_lookups_total{result="hit"} 1' in lines
+    assert 'pwdmngr_auth_key_cache_lookups_total{result="negative_hit"} 1' in lines
+    assert 'pwdmngr_auth_key_cache_lookups_total{result="miss"} 1' in lines
+    assert 'pwdmngr_auth_key_cache_hit_rate {}'.format(2 / 3) in lines
+
+
+def test_auth_key_cache_negative_cache_bounded():
+    """Tests that the negative cache evicts the oldest invalid key when it is full."""
+
+    cache = AuthKeyCache(create_auth_collection(create_auth_documents('key1')), negative_max_size=2)
+    for key in ['bad1', 'bad2', 'bad3']:
+        cache.contains(generate_hash(key))
+    assert list(cache.negative_keys) == [
+        generate_hash('bad2'), generate_hash('bad3')]
+
+
+def test_auth_key_cache_negative_entry_expires():
+    """Tests that an invalid key is looked up again once its negative entry expires."""
+
+    clock = create_mock_clock()
+    collection = create_auth_collection(create_auth_documents('key1'))
+    cache = AuthKeyCache(collection, ttl=100, negative_ttl=10, clock=clock)
+    cache.contains(generate_hash('bad_key'))
+    clock.now = 10
+    cache.contains(generate_hash('bad_key'))
+    assert cache.misses == 2
+
+
+def test_auth_key_cache_new_key_accepted_before_reload():
+    """Tests that a key added after the set was loaded is found in the database and added to the set."""
+
+    documents = []
+    cache = AuthKeyCache(create_auth_collection(documents))
+    assert cache.contains(generate_hash('key1')) == False
+    documents.extend(create_auth_documents('key2'))
+    assert cache.contains(generate_hash('key2')) == True
+
+
+def test_auth_key_cache_ttl_reload_drops_revoked_key():
+    """Tests that the set is loaded again once it expires, so that revoked keys are rejected."""
+
+    clock = create_mock_clock()
+    documents = create_auth_documents('key1')
+    cache = AuthKeyCache(create_auth_collection(documents), ttl=60, clock=clock)
+    assert cache.contains(generate_hash('key1')) == True
+    documents.clear()
+    clock.now = 60
+    assert cache.contains(generate_hash('key1')) == False
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Load test comparing the Flask server (app.py) and the async server (async_app.py).
+
+Both servers must be running against the same database. Example:
+
+    python -m benchmark.load_test --server flask=http://localhost:5000 --server async=http://localhost:5001 \\
+        --auth-key <key> --master-password <password> --master-key <key> --requests 2000 --concurrency 64
+
+Every server gets the same scenarios: an insert of a new record, a search (query type 1), a decryption (query type 2) and an update.
+"""
+import argparse
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from constants.request_parameters import HEADERS_AUTH_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_NEW_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_QUERY_TYPE_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
+from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH
+
+
+def post(url, auth_key, form):
+    """Sends a form to the server.
+    Args:
+        url (str): The url of the endpoint.
+        auth_key (str): The authentication key.
+        form (list): List of (param, value) of the form.
+    Returns:
+        (int, float): The status code, The latency in seconds.
+    """
+    request = urllib.request.Request(url, data=urllib.parse.urlencode(form).encode(), headers={
+        HEADERS_AUTH_KEY_PARAM: auth_key
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def create_scenarios(master_password, master_key, run_id):
+    """Creates the requests of every scenario. The index of the request makes the inserted records unique.
+    Args:
+        master_password (str): The master password.
+        master_key (str): The master key.
+        run_id (str): Unique id of the run, so that repeated runs don't insert duplicates.
+    Returns:
+        dict: Path and a function creating the form of the i-th request, by scenario name.
+    """
+    master = [(BODY_MASTER_PASSWORD_PARAM, master_password),
+              (BODY_MASTER_KEY_PARAM, master_key)]
+    domain = 'loadtest-{}.com'.format(run_id)
+    return {
+        'insert': (INSERT_PATH, lambda i: master + [
+            (BODY_DOMAIN_PARAM, domain), (BODY_USERNAME_PARAM, 'user{}'.format(i)), (BODY_SECRET_PARAM, 'secret{}'.format(i))]),
+        'search': (QUERY_PATH, lambda i: master + [
+            (BODY_QUERY_TYPE_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE), (BODY_DOMAIN_PARAM, domain)]),
+        'decrypt': (QUERY_PATH, lambda i: master + [
+            (BODY_QUERY_TYPE_PARAM, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE), (BODY_DOMAIN_PARAM, domain), (BODY_USERNAME_PARAM, 'user{}'.format(i))]),
+        'update': (UPDATE_PATH, lambda i: master + [
+            (BODY_DOMAIN_PARAM, domain), (BODY_USERNAME_PARAM, 'user{}'.format(i)), (BODY_NEW_SECRET_PARAM, 'new-secret{}'.format(i))]),
+    }
+
+
+def percentile(values, fraction):
+    """
+    Args:
+        values (list): Sorted values.
+        fraction (float): The percentile as a fraction between 0 and 1.
+    Returns:
+        float: The value at the percentile.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_scenario(base_url, path, create_form, auth_key, requests, concurrency):
+    """Sends the requests of a scenario with the given concurrency.
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and number of errors.
+    """
+    url = base_url.rstrip('/') + path
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda i: post(url, auth_key, create_form(i)), range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, latency in results)
+    return {
+        'throughput': requests / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'errors': sum(1 for status, _ in results if status != 200)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load test comparing the Flask and the async server.')
+    parser.add_argument('--server', action='append', required=True,
+                        help='name=url of a server to test. Can be repeated.')
+    parser.add_argument('--auth-key', required=True)
+    parser.add_argument('--master-password', required=True)
+    parser.add_argument('--master-key', required=True)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    print('{:<8} {:<8} {:>10} {:>9} {:>9} {:>9} {:>7}'.format(
+        'server', 'scenario', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for server in args.server:
+        name, base_url = server.split('=', 1)
+        scenarios = create_scenarios(
+            args.master_password, args.master_key, uuid.uuid4().hex)
+        for scenario, (path, create_form) in scenarios.items():
+            result = run_scenario(base_url, path, create_form,
+                                  args.auth_key, args.requests, args.concurrency)
+            print('{:<8} {:<8} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7}'.format(
+                name, scenario, result['throughput'], result['p50'], result['p95'], result['p99'], result['errors']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Benchmark suite of key derivation, encryption and the endpoints of the Flask server (app.py).
+
+The endpoints are called through the Flask test client against an in-memory MongoDB (mongomock), so no server or database is needed.
+mongomock is only needed by the benchmark: pip install -r benchmark/requirements.txt
+mongomock scans every record for every query, so large collections are benchmarked against a MongoDB server with --mongo-uri.
+The benchmark database on that server is dropped and seeded again on every run.
+
+    python -m benchmark.suite --sizes 1000,10000 --output bench.json
+    python -m benchmark.suite --sizes 1000,10000,100000,1000000 --mongo-uri mongodb://localhost:27017 --output bench.json
+    python -m benchmark.suite --sizes 1000 --output new.json --compare bench.json
+
+The results are written as JSON, so that the results of two commits can be compared with --compare.
+Encryption and decryption are measured for every version of the secret format, along with the BSON size of a record,
+and the change from the legacy format is printed.
+"""
+import argparse
+import bson
+import json
+import platform
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+import pymongo
+from pymongo.errors import OperationFailure
+from constants.database import AUTH_COLLECTION_NAME, AUTH_COLLECTION_KEY_FIELD, MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.request_parameters import HEADERS_AUTH_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_NEW_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_QUERY_TYPE_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
+from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH
+from crypto.cipher_key import CipherKey
+from crypto.decrypter import Decrypter
+from crypto.encrypter import Encrypter
+from crypto.secret_format import SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM
+from utils.hash import generate_hash
+from utils.ngram import generate_ngram_fields
+
+AUTH_KEY = 'benchmark-auth-key'
+MASTER_PASSWORD = 'benchmark-password'
+MASTER_KEY = '1234'
+SECRET_SIZES = [16, 256, 4096, 65536]
+# Number of secrets of the record whose BSON size is reported for every secret format.
+SECRETS_PER_RECORD = 3
+SECRET_FORMATS = [SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM]
+DEFAULT_SIZES = '1000,10000'
+# Name of the database used by the benchmark.
+BENCHMARK_DATABASE_NAME = 'pwdmngr_benchmark'
+# Number of records inserted into the password manager collection at a time while seeding it.
+SEED_BATCH_SIZE = 10000
+# A result is reported as a regression by --compare if its median is slower by more than this fraction.
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(name, function, iterations, **labels):
+    """Calls the function repeatedly and measures the latency of every call.
+    Args:
+        name (str): Name of the benchmark.
+        function (function): Function called with the index of the iteration.
+        iterations (int): Number of calls.
+        labels (dict): Parameters of the benchmark reported with the result, like the collection size.
+    Returns:
+        dict: The name, labels and latency statistics in milliseconds.
+    """
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        function(i)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    result = {'name': name}
+    result.update(labels)
+    result.update({
+        'iterations': iterations,
+        'min': latencies[0] * 1000,
+        'mean': sum(latencies) / iterations * 1000,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'max': latencies[-1] * 1000
+    })
+    return result
+
+
+def percentile(values, fraction):
+    """
+    Args:
+        values (list): Sorted values.
+        fraction (float): The percentile as a fraction between 0 and 1.
+    Returns:
+        float: The value at the percentile.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def benchmark_crypto(iterations):
+    """Measures cipher key derivation (without the cipher key cache) and encryption and decryption of secrets of different sizes in every secret format.
+    The encryption and decryption results have the BSON size of a record having SECRETS_PER_RECORD secrets of the size.
+    Args:
+        iterations (int): Number of calls per benchmark.
+    Returns:
+        list: The results.
+    """
+    results = [measure('cipher_key', lambda i: CipherKey(
+        MASTER_PASSWORD, int(MASTER_KEY) + i), iterations)]
+    for size in SECRET_SIZES:
+        secret = 'x' * size
+        for version in SECRET_FORMATS:
+            encrypter = Encrypter(MASTER_PASSWORD, int(MASTER_KEY), version)
+            encrypted = encrypter.encrypt(secret)
+            record_bytes = len(bson.encode({
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'domain.com',
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user',
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: [encrypter.encrypt(secret) for _ in range(SECRETS_PER_RECORD)]
+            }))
+            results.append(measure('encrypt', lambda i: Encrypter(MASTER_PASSWORD, int(MASTER_KEY), version).encrypt(secret),
+                                   iterations, secret_size=size, format=version, record_bytes=record_bytes))
+            results.append(measure('decrypt', lambda i: Decrypter(MASTER_PASSWORD, int(MASTER_KEY)).decrypt(encrypted),
+                                   iterations, secret_size=size, format=version, record_bytes=record_bytes))
+    return results
+
+
+def compare_secret_formats(results):
+    """Prints the change of the record size and of the encryption and decryption throughput of the GCM format from the legacy format.
+    Args:
+        results (list): The results of benchmark_crypto().
+    """
+    by_key = {(result['name'], result['secret_size'], result['format']): result
+              for result in results if 'format' in result}
+    print('{:>11} {:>24} {:>30} {:>30}'.format(
+        'secret_size', 'record bytes', 'encrypt MB/s', 'decrypt MB/s'))
+    for size in SECRET_SIZES:
+        columns = []
+        legacy, gcm = by_key[('encrypt', size, SECRET_FORMAT_LEGACY)], by_key[('encrypt', size, SECRET_FORMAT_GCM)]
+        columns.append((legacy['record_bytes'], gcm['record_bytes']))
+        for name in ['encrypt', 'decrypt']:
+            legacy, gcm = by_key[(name, size, SECRET_FORMAT_LEGACY)], by_key[(name, size, SECRET_FORMAT_GCM)]
+            columns.append((size / legacy['p50'] / 1000, size / gcm['p50'] / 1000))
+        print('{:>11} '.format(size) + ' '.join('{:>12.1f} -> {:>8.1f} {:>+7.1%}'.format(before, after, after / before - 1)
+                                                for before, after in columns))
+
+
+def create_database(mongo_uri=None):
+    """Creates the benchmark database with the auth and master collections.
+    The change streams of mongomock fail like the ones of a standalone MongoDB server, so the caches rely on their TTL.
+    Args:
+        mongo_uri (str, optional): Uri of a MongoDB server. Defaults to an in-memory database of mongomock.
+    Returns:
+        Database: The benchmark database.
+    """
+    if mongo_uri != None:
+        client = pymongo.MongoClient(mongo_uri)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit('mongomock is required for the endpoint benchmarks: pip install -r benchmark/requirements.txt')
+
+        def watch(*args, **kwargs):
+            raise OperationFailure(
+                'The $changeStream stage is only supported on replica sets')
+        mongomock.collection.Collection.watch = watch
+        client = mongomock.MongoClient()
+    client.drop_database(BENCHMARK_DATABASE_NAME)
+    database = client[BENCHMARK_DATABASE_NAME]
+    database[AUTH_COLLECTION_NAME].insert_one(
+        {AUTH_COLLECTION_KEY_FIELD: generate_hash(AUTH_KEY)})
+    database[MASTER_PASSWORD_COLLECTION_NAME].insert_one({
+        MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash(MASTER_PASSWORD),
+        MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash(MASTER_KEY)
+    })
+    database.create_collection(PASSWORD_MANAGER_COLLECTION_NAME)
+    return database
+
+
+def load_app(database):
+    """Creates the Flask server with its database client connected to the benchmark database.
+    Args:
+        database (Database): The benchmark database.
+    Returns:
+        Flask: The Flask application.
+    """
+    import app
+    with patch.object(pymongo, 'MongoClient', lambda *args, **kwargs: {database.name: database}):
+        return app.create_app(database=database.name)
+
+
+def seed(collection, size):
+    """Replaces the records of the password manager collection with the given number of records.
+    The records share a single encrypted secret, as the secret doesn't change the cost of the queries.
+    Args:
+        collection (Collection): The password manager collection.
+        size (int): Number of records.
+    """
+    collection.delete_many({})
+    secrets = [Encrypter(MASTER_PASSWORD, int(MASTER_KEY)).encrypt('secret')]
+    for start in range(0, size, SEED_BATCH_SIZE):
+        documents = []
+        for i in range(start, min(size, start + SEED_BATCH_SIZE)):
+            domain, username = 'domain{}.com'.format(i), 'user{}'.format(i)
+            document = {
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username,
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: secrets
+            }
+            document.update(generate_ngram_fields(domain, username))
+            documents.append(document)
+        collection.insert_many(documents)
+
+
+def benchmark_endpoints(client, collection, size, iterations):
+    """Measures /insert, /query of type 1 and 2 and /update against a collection of the given size.
+    Args:
+        client (FlaskClient): The test client of the Flask server.
+        collection (Collection): The password manager collection.
+        size (int): Number of records in the collection.
+        iterations (int): Number of requests per endpoint.
+    Returns:
+        list: The results.
+    """
+    seed(collection, size)
+    master = {BODY_MASTER_PASSWORD_PARAM: MASTER_PASSWORD,
+              BODY_MASTER_KEY_PARAM: MASTER_KEY}
+    headers = {HEADERS_AUTH_KEY_PARAM: AUTH_KEY}
+
+    def post(path, form):
+        response = client.post(path, data=dict(master, **form), headers=headers)
+        response.get_data()
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def existing(i):
+        return 'domain{}.com'.format(i % size), 'user{}'.format(i % size)
+
+    return [
+        measure('insert', lambda i: post(INSERT_PATH, {
+            BODY_DOMAIN_PARAM: 'new{}.com'.format(i), BODY_USERNAME_PARAM: 'user', BODY_SECRET_PARAM: 'secret'}), iterations, size=size),
+        measure('query_search', lambda i: post(QUERY_PATH, {
+            BODY_QUERY_TYPE_PARAM: QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, BODY_DOMAIN_PARAM: existing(i)[0]}), iterations, size=size),
+        measure('query_decrypt', lambda i: post(QUERY_PATH, {
+            BODY_QUERY_TYPE_PARAM: QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+            BODY_DOMAIN_PARAM: existing(i)[0], BODY_USERNAME_PARAM: existing(i)[1]}), iterations, size=size),
+        measure('update', lambda i: post(UPDATE_PATH, {
+            BODY_DOMAIN_PARAM: existing(i)[0], BODY_USERNAME_PARAM: existing(i)[1], BODY_NEW_SECRET_PARAM: 'secret{}'.format(i)}), iterations, size=size)
+    ]
+
+
+def get_commit():
+    """
+    Returns:
+        str: The git commit of the working tree, None if it isn't a git repository.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_result_key(result):
+    """
+    Args:
+        result (dict): A result of measure().
+    Returns:
+        tuple: The name and labels of the result, which identify it in the results of another run.
+    """
+    return tuple(sorted((key, value) for key, value in result.items() if key in ['name', 'size', 'secret_size', 'format']))
+
+
+def compare(results, baseline):
+    """Prints the change of the median latency of every result that is also in the baseline.
+    Args:
+        results (list): The results of this run.
+        baseline (list): The results of the baseline run.
+    Returns:
+        int: Number of regressions.
+    """
+    baseline = {get_result_key(result): result for result in baseline}
+    regressions = 0
+    for result in results:
+        before = baseline.get(get_result_key(result))
+        if before == None:
+            continue
+        change = result['p50'] / before['p50'] - 1
+        regression = change > REGRESSION_THRESHOLD
+        regressions += regression
+        print('{:<40} {:>10.3f} {:>10.3f} {:>+8.1%}{}'.format(', '.join('{}={}'.format(key, value) for key, value in get_result_key(result)),
+                                                             before['p50'], result['p50'], change, '  REGRESSION' if regression else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of key derivation, encryption and the endpoints of the Flask server.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='Comma separated sizes of the password manager collection. Defaults to {}.'.format(DEFAULT_SIZES))
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='Number of calls per benchmark.')
+    parser.add_argument('--output', help='File to write the JSON results to.')
+    parser.add_argument(
+        '--compare', help='JSON results of a previous run to compare with. Exits with 1 if any median is slower by more than {:.0%}.'.format(REGRESSION_THRESHOLD))
+    parser.add_argument('--mongo-uri',
+                        help='Uri of a MongoDB server to benchmark the endpoints against. Defaults to an in-memory database.')
+    parser.add_argument('--skip-endpoints', action='store_true',
+                        help='Only run the key derivation and encryption benchmarks.')
+    args = parser.parse_args()
+
+    results = benchmark_crypto(args.iterations)
+    if not args.skip_endpoints:
+        database = create_database(args.mongo_uri)
+        client = load_app(database).test_client()
+        for size in [int(size) for size in args.sizes.split(',')]:
+            results.extend(benchmark_endpoints(
+                client, database[PASSWORD_MANAGER_COLLECTION_NAME], size, args.iterations))
+
+    for result in results:
+        print('{:<40} p50 {:>10.3f} ms  p95 {:>10.3f} ms'.format(', '.join(
+            '{}={}'.format(key, value) for key, value in get_result_key(result)), result['p50'], result['p95']))
+    compare_secret_formats(results)
+    report = {'commit': get_commit(), 'python': platform.python_version(),
+              'platform': platform.platform(), 'results': results}
+    if args.output != None:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare != None:
+        with open(args.compare) as baseline:
+            if compare(results, json.load(baseline)['results']) > 0:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# Number of threads running blocking work (key derivation, encryption, cache loads and validation) for the async server.
+ASYNC_EXECUTOR_MAX_WORKERS = 8
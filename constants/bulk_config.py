@@ -0,0 +1,5 @@
+# Number of records written to the password manager collection in a single insert_many().
+BULK_INSERT_BATCH_SIZE = 1000
+
+# Number of bytes read at a time from the records file of a bulk insert request.
+BULK_RECORDS_READ_CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,6 @@
+# Number of worker processes that encrypt and decrypt secrets. 0 runs all the work in the process handling the request.
+CRYPTO_POOL_MAX_WORKERS = 4
+
+# Requests having fewer secrets than this are encrypted or decrypted in the process handling the request,
+# as sending them to a worker costs more than the work itself.
+CRYPTO_POOL_MIN_BATCH_SIZE = 32
@@ -15,6 +15,16 @@ MASTER_PASSWORD_COLLECTION_NAME = 'master'
 PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD = 'domain'
 PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD = 'username'
 PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD = 'secrets'
+# Search index fields. They hold the n-grams of lowercase domain and username.
+PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD = 'domain-ngrams'
+PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD = 'username-ngrams'
+# Fields written while the master credentials are rotated. They hold the secrets encrypted with the new master password and master key,
+# and the hash of the new credentials, until the secrets are replaced by them.
+PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD = 'pending-secrets'
+PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD = 'pending-credentials'
+
+# Maximum number of duplicate domain and username combinations whose _ids are logged when the unique index can't be created.
+UNIQUE_INDEX_DUPLICATES_LOG_LIMIT = 20
 
 # Auth collection fields
 AUTH_COLLECTION_KEY_FIELD = 'key'
@@ -22,3 +32,48 @@ AUTH_COLLECTION_KEY_FIELD = 'key'
 # Master collection fields
 MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD = 'master-password'
 MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD = 'master-key'
+# The state of a rotation of the master credentials. Writes are rejected while it is set.
+MASTER_PASSWORD_COLLECTION_ROTATION_FIELD = 'rotation'
+
+# Number of seconds the master password and master key hashes are cached in the process before being fetched again.
+MASTER_PASSWORD_CACHE_TTL_SECONDS = 30
+
+# Number of seconds the set of auth key hashes is cached in the process before being loaded again.
+AUTH_KEY_CACHE_TTL_SECONDS = 60
+# Maximum number of invalid auth key hashes remembered in the process.
+AUTH_NEGATIVE_CACHE_MAX_SIZE = 1024
+# Number of seconds an invalid auth key hash is remembered in the process.
+AUTH_NEGATIVE_CACHE_TTL_SECONDS = 60
+
+# Whether the latency, documents and bytes of every MongoDB command are recorded by the command profiler.
+MONGO_COMMAND_PROFILING_ENABLED = True
+# Whether the command profiler also counts the bytes sent and received. Every command and reply is encoded again to measure it.
+MONGO_COMMAND_BYTES_ENABLED = False
+# MongoDB commands taking longer than this are logged to the slow command log.
+MONGO_SLOW_COMMAND_THRESHOLD_SECONDS = 0.1
+# Name of the logger of the slow command log.
+MONGO_SLOW_COMMAND_LOGGER_NAME = 'pwdmngr.slow_commands'
+
+# Maximum number of connections in the pool of a MongoDB client. Requests wait for a connection when all of them are in use.
+MONGO_MAX_POOL_SIZE = 100
+# Number of connections opened when the server starts and kept open while idle, so that the first requests don't pay for connecting.
+MONGO_MIN_POOL_SIZE = 10
+# Milliseconds a connection can stay idle in the pool before it is closed. 0 keeps idle connections open.
+MONGO_MAX_IDLE_TIME_MS = 0
+# Milliseconds to wait for a new connection to be established.
+MONGO_CONNECT_TIMEOUT_MS = 10000
+# Milliseconds to wait for the reply of a command before the connection is considered broken. 0 waits forever.
+MONGO_SOCKET_TIMEOUT_MS = 30000
+# Milliseconds to wait for a server to become available for a command.
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 10000
+# Milliseconds a request waits for a free connection when all connections of the pool are in use. 0 waits forever.
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 5000
+# Maximum number of seconds the server waits at startup for MONGO_MIN_POOL_SIZE connections to be opened.
+MONGO_WARM_UP_TIMEOUT_SECONDS = 5
+
+# Read concern level by collection name, for example {MASTER_PASSWORD_COLLECTION_NAME: 'majority'}.
+# The collections that are not listed use the read concern of the client.
+MONGO_COLLECTION_READ_CONCERNS = {}
+# Write concern options by collection name, for example {PASSWORD_MANAGER_COLLECTION_NAME: {'w': 'majority', 'j': True}}.
+# The collections that are not listed use the write concern of the client.
+MONGO_COLLECTION_WRITE_CONCERNS = {}
@@ -9,3 +9,15 @@ CIPHER_KEY_LENGTH = 16
 
 # Number of iteration by which the key is churned during generation.
 CIPHER_KEY_CHURN_COUNT = 128
+
+# Maximum number of derived cipher keys held in the process-local cache.
+CIPHER_KEY_CACHE_MAX_SIZE = 64
+
+# Number of seconds a derived cipher key stays in the cache.
+CIPHER_KEY_CACHE_TTL_SECONDS = 300
+
+# Version of the format in which new secrets are written. Secrets of every version are decrypted.
+# 0 is the legacy format: AES in CBC mode with the cipher key as initialization vector, stored as a base64 string.
+# 1 is AES in GCM mode with a random nonce per secret, stored as binary.
+# Keep it at 0 while servers that can't decrypt version 1 are still serving, like during a rolling upgrade.
+SECRET_FORMAT_VERSION = 1
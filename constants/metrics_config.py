@@ -0,0 +1,21 @@
+# Whether the time spent in every stage of a request is recorded. When disabled, recording a stage only costs a context variable lookup.
+METRICS_ENABLED = True
+
+# Upper bounds in seconds of the buckets of the latency histograms served on the metrics path.
+METRICS_HISTOGRAM_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Stages of a request. The time of a stage excludes the time of the stages nested in it.
+STAGE_AUTH = 'auth'
+STAGE_MASTER_VALIDATION = 'master_validation'
+STAGE_FIELD_VALIDATION = 'field_validation'
+STAGE_KEY_DERIVATION = 'key_derivation'
+STAGE_DB = 'db'
+STAGE_CRYPTO = 'crypto'
+STAGE_ENCODE = 'encode'
+# Name of the total time of a request in the Server-Timing header.
+STAGE_TOTAL = 'total'
+
+# Content type of the metrics in the Prometheus text format.
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Endpoint label of the requests that matched no endpoint.
+METRICS_NOT_FOUND_ENDPOINT = 'not_found'
@@ -1,5 +1,9 @@
 # Header parameter that the user can use to specify the authentication key.
 HEADERS_AUTH_KEY_PARAM = 'auth-key'
+# Header parameter of a search response having the page token for the next page. It is absent on the last page.
+HEADERS_NEXT_PAGE_TOKEN_PARAM = 'next-page-token'
+# Response header having the time spent in every stage of the request, when metrics are enabled.
+HEADERS_SERVER_TIMING_PARAM = 'Server-Timing'
 
 # Body parameter that the user can use to specify the master password for all operations.
 BODY_MASTER_PASSWORD_PARAM = 'master-password'
@@ -12,6 +16,14 @@ BODY_USERNAME_PARAM = 'username'
 # Body parameter that the user can use to specify a list of secrets for insert operation.
 BODY_SECRET_PARAM = 'secret'
 
+# Body parameter (file) that the user can use to specify the records for bulk insert operation.
+# The file must be a JSON array or newline delimited JSON of records.
+BODY_RECORDS_PARAM = 'records'
+# Fields of each record in the records file of bulk insert operation.
+RECORD_DOMAIN_FIELD = 'domain'
+RECORD_USERNAME_FIELD = 'username'
+RECORD_SECRETS_FIELD = 'secrets'
+
 # Body parameter that the user can use to specify the query type for query requests.
 BODY_QUERY_TYPE_PARAM = 'query-type'
 
@@ -19,6 +31,22 @@ BODY_QUERY_TYPE_PARAM = 'query-type'
 QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE = '1'
 # Body parameter value for second query type. This is used for decrypting all secrets of single record match.
 QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE = '2'
+# Body parameter value for third query type. This is used for decrypting all secrets of many records at once.
+# The records are selected by repeated domain and username parameters that are paired by their order.
+QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE = '3'
+
+# Body parameter that the user can use to specify the indentation of the JSON response of query requests. 0 gives compact JSON.
+BODY_INDENT_PARAM = 'indent'
+
+# Body parameter that the user can use to specify the maximum number of results in a page of search query.
+BODY_LIMIT_PARAM = 'limit'
+# Body parameter that the user can use to continue a search query from the page token of the previous page.
+BODY_PAGE_TOKEN_PARAM = 'page-token'
+
+# Accept header values that select the format of the streamed search results.
+# NDJSON gives one result per line. Otherwise the results are sent as a JSON array.
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
 
 # Body parameter that the user can use to specify the new username for update operation.
 BODY_NEW_USERNAME_PARAM = 'new-username'
@@ -1,13 +1,18 @@
 from constants.request_parameters import *
+from constants.search_config import QUERY_RESPONSE_MAX_INDENT, QUERY_SEARCH_MAX_LIMIT, MAX_QUERY_SELECTORS
 
 VALID_INSERT_COMMAND = 'Usage: curl <url>/insert -H "{}: (required)" -d "{}=(required)&{}=(required)&{}=(required)&{}=(required)&{}=(required)&{}=(optional)..."'.format(
     HEADERS_AUTH_KEY_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_SECRET_PARAM)
-VALID_SEARCH_QUERY_TYPE_COMMAND = 'Usage: curl <url>/query -H "{}: (required)" -d "{}=1{}=(required)&{}=(required)&{}=(required)&{}=(optional)"'.format(
-    HEADERS_AUTH_KEY_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM)
-VALID_GET_SECRETS_QUERY_TYPE_COMMAND = 'Usage: curl <url>/query -H "{}: (required)" -d "{}=2&{}=(required)&{}=(required)&{}=(required)&{}=(optional)"'.format(
-    HEADERS_AUTH_KEY_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM)
+VALID_SEARCH_QUERY_TYPE_COMMAND = 'Usage: curl <url>/query -H "{}: (required)" -H "Accept: (optional) {} or {}" -d "{}=1&{}=(required)&{}=(required)&{}=(required)&{}=(optional)&{}=(optional)&{}=(optional)&{}=(optional)"'.format(
+    HEADERS_AUTH_KEY_PARAM, JSON_MIMETYPE, NDJSON_MIMETYPE, BODY_QUERY_TYPE_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_LIMIT_PARAM, BODY_PAGE_TOKEN_PARAM, BODY_INDENT_PARAM)
+VALID_GET_SECRETS_QUERY_TYPE_COMMAND = 'Usage: curl <url>/query -H "{}: (required)" -d "{}=2&{}=(required)&{}=(required)&{}=(required)&{}=(optional)&{}=(optional)"'.format(
+    HEADERS_AUTH_KEY_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_INDENT_PARAM)
+VALID_GET_MULTIPLE_SECRETS_QUERY_TYPE_COMMAND = 'Usage: curl <url>/query -H "{}: (required)" -d "{}=3&{}=(required)&{}=(required)&{}=(required)&{}=(required)&{}=(optional)&{}=(optional)...&{}=(optional)"'.format(
+    HEADERS_AUTH_KEY_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_INDENT_PARAM)
 VALID_UPDATE_COMMAND = 'Usage: curl <url>/update -H "{}: (required)" -d "{}=(required)&{}=(required)&{}=(required)&{}=(optional)&{}=(optional)&{}=(optional)&{}=(optional)..."'.format(
     HEADERS_AUTH_KEY_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_NEW_USERNAME_PARAM, BODY_NEW_SECRET_PARAM, BODY_NEW_SECRET_PARAM)
+VALID_BULK_INSERT_COMMAND = 'Usage: curl <url>/bulk-insert -H "{}: (required)" -F "{}=(required)" -F "{}=(required)" -F "{}=@(required).ndjson"'.format(
+    HEADERS_AUTH_KEY_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_RECORDS_PARAM)
 
 ERROR_MASTER_PASSWORD = 'Master password is missing or incorrect.'
 ERROR_MASTER_KEY = 'Master key is missing or incorrect.'
@@ -17,17 +22,45 @@ ERROR_USERNAME_REQUIRED = 'Username is missing in the request.'
 ERROR_ATLEAST_ONE_SECRET_REQUIRED = 'At least one secret is required.'
 ERROR_SECRETS_REQUIRED = 'One or more secret(s) have missing values.'
 ERROR_DUPLICATE_DOMAIN_USERNAME = 'The given combination of domain and username already exists.'
+ERROR_UNIQUE_INDEX_DUPLICATES = ('The unique index on domain and username of the password manager collection could not be created, as some combinations '
+                                 'have several records: %s. The server does not start without the index. Keep a single record of every combination, '
+                                 'delete the others and start the server again.')
 ERROR_QUERY_TYPE_REQUIRED = 'Query type is missing or invalid in request.'
 ERROR_USERNAME_SPECIFIED_BUT_BLANK = 'If username is specified in request, then it should be non-empty.'
 ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS = 'Multiple records were found. Only one record is allowed for decryption.'
 ERROR_NO_RECORD_FOUND = 'No records were found for the given combination.'
+ERROR_DECRYPTION_FAILED = 'Secrets of the record could not be decrypted. They are corrupted or were not encrypted with the given master password and key.'
+ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED = 'Every domain must be paired with a non-empty username.'
+ERROR_TOO_MANY_SELECTORS = 'At most {} domain and username pairs can be specified in request.'.format(
+    MAX_QUERY_SELECTORS)
 ERROR_NEW_USERNAME_SPECIFIED_BUT_BLANK = 'If new username is specified in request, then it should be non-empty.'
 ERROR_NEW_SECRET_SPECIFIED_BUT_BLANK = 'If new secrets is specified in request, then it should be valid.'
 ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE = 'Exactly one record must match for update. Multiple or no match has been found.'
 ERROR_OLD_AND_NEW_USERNAME_SAME = 'Old and new username cannot be same.'
 ERROR_DUPLICATE_DOMAIN_NEW_USERNAME = 'The given combination for domain and new username already exists.'
+ERROR_INVALID_INDENT = 'If indent is specified in request, then it should be an integer from 0 to {}.'.format(
+    QUERY_RESPONSE_MAX_INDENT)
+ERROR_INVALID_LIMIT = 'If limit is specified in request, then it should be an integer from 1 to {}.'.format(
+    QUERY_SEARCH_MAX_LIMIT)
+ERROR_INVALID_PAGE_TOKEN = 'Page token is invalid. It must be the next page token of a previous search response.'
+ERROR_PAGE_TOKEN_REQUIRES_LIMIT = 'If page token is specified in request, then limit should be specified too.'
+ERROR_RECORDS_REQUIRED = 'Records file is missing in the request.'
+ERROR_INVALID_RECORD = 'Record must be a JSON object with non-empty domain and username and a non-empty list of non-empty secrets.'
+ERROR_MALFORMED_RECORDS = 'Records file is not a valid JSON array or newline delimited JSON.'
+ERROR_RECORD_WRITE_FAILED = 'Record could not be written.'
+ERROR_ROTATION_IN_PROGRESS = 'Master password and key are being rotated. Secrets can only be read until the rotation finishes.'
+ERROR_ROTATION_ALREADY_STARTED = 'Another rotation of the master password and key has already started.'
+ERROR_ROTATION_NEW_CREDENTIALS = 'New master password and key must be the ones of the rotation that is being resumed.'
+ERROR_CHECKPOINT_MISMATCH = ('The checkpoint next to the archive was written by another command or for another archive. '
+                             'Remove the checkpoint file to start over.')
+ERROR_MIGRATION_LEGACY_FORMAT = 'SECRET_FORMAT_VERSION must select the binary format on every server before the secrets are migrated.'
 
 SUCCESS = 'Success!'
+
+# Fields of the response of query for decrypting secrets of many records.
+QUERY_RESULTS_FIELD = 'results'
+QUERY_ERRORS_FIELD = 'errors'
+QUERY_ERROR_MESSAGE_FIELD = 'message'
 UNAUTHORIZED = 'Unauthorized!'
 INTERNAL_ERROR = 'Internal error!'
 NOT_FOUND = 'Not found!'
@@ -37,3 +70,9 @@ UNAUTHORIZED_RESPONSE_CODE = 403
 INTERNAL_ERROR_RESPONSE_CODE = 500
 NOT_FOUND_RESPONSE_CODE = 400
 INVALID_REQUEST_RESPONSE_CODE = 400
+
+# Status of each record in the report of bulk insert operation.
+RECORD_STATUS_INSERTED = 'inserted'
+RECORD_STATUS_DUPLICATE = 'duplicate'
+RECORD_STATUS_INVALID = 'invalid'
+RECORD_STATUS_FAILED = 'failed'
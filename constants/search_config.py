@@ -0,0 +1,20 @@
+# Length of the n-grams stored in the search index of the password manager collection.
+SEARCH_NGRAM_LENGTH = 3
+
+# Indentation of the JSON response of query requests if it is not specified in the request.
+QUERY_RESPONSE_DEFAULT_INDENT = 2
+
+# Maximum indentation that can be specified for the JSON response of query requests.
+QUERY_RESPONSE_MAX_INDENT = 8
+
+# Maximum number of results that can be requested in a page of search query.
+QUERY_SEARCH_MAX_LIMIT = 1000
+
+# Maximum number of domain and username pairs of a query for decrypting secrets of many records, which bounds the $or of its query.
+MAX_QUERY_SELECTORS = 1000
+
+# Number of characters sent at a time while streaming the search results.
+QUERY_RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# Number of records updated in a single bulk write while backfilling the search index.
+SEARCH_NGRAM_BACKFILL_BATCH_SIZE = 1000
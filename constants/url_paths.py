@@ -1,3 +1,5 @@
 INSERT_PATH = '/insert'
 QUERY_PATH = '/query'
 UPDATE_PATH = '/update'
+BULK_INSERT_PATH = '/bulk-insert'
+METRICS_PATH = '/metrics'
@@ -0,0 +1,21 @@
+# Number of records fetched from the password manager collection in a single cursor batch while exporting the vault.
+VAULT_EXPORT_BATCH_SIZE = 1000
+# Number of records written in a single bulk_write() while importing the vault.
+VAULT_IMPORT_BATCH_SIZE = 1000
+# Number of uncompressed bytes of records after which a frame of the archive is written. A frame only holds whole records.
+VAULT_FRAME_SIZE = 1024 * 1024
+# zlib compression level of the frames, from 1 (fastest) to 9 (smallest).
+VAULT_COMPRESSION_LEVEL = 6
+# Number of seconds between two progress reports of an export or import.
+VAULT_PROGRESS_INTERVAL_SECONDS = 5
+# Environment variables holding the master password and master key. They are prompted for if unset.
+VAULT_MASTER_PASSWORD_ENV = 'PWDMNGR_MASTER_PASSWORD'
+VAULT_MASTER_KEY_ENV = 'PWDMNGR_MASTER_KEY'
+# Environment variables holding the new master password and master key of a rotation. They are prompted for if unset.
+VAULT_NEW_MASTER_PASSWORD_ENV = 'PWDMNGR_NEW_MASTER_PASSWORD'
+VAULT_NEW_MASTER_KEY_ENV = 'PWDMNGR_NEW_MASTER_KEY'
+
+# Number of records re-encrypted and written at a time while rotating the master password and master key.
+VAULT_ROTATION_BATCH_SIZE = 1000
+# Number of records converted and written at a time while migrating the secrets in the legacy format to the binary format.
+VAULT_MIGRATION_BATCH_SIZE = 1000
@@ -11,10 +11,12 @@ class CipherKey:
         master_password (str): Master password passed by client.
         master_key (int): Master key passed by client.
         key (str): The generated key.
+        randomizer (Random): Private random number generator seeded with the master key. It keeps generation thread-safe.
     """
     master_password = None
     master_key = None
     key = None
+    randomizer = None
 
     def __init__(self, master_password, master_key):
         """
@@ -45,62 +47,56 @@ class CipherKey:
         The following algorithm is used for key generation:
 
         1. The delta for caesar cipher is computed as the mod inverse of master key under self.MOD.
-        2. The randomizer is seeded with the master key.
+        2. A private randomizer is seeded with the master key. The global random module is left untouched.
         3. The key is initialized to the master password.
         3. The key is trimmed (if length is greater than CIHER_KEY_LENGTH) or padded (by repeatation, if length is less than CIHER_KEY_LENGTH).
         4. For CIPHER_KEY_CHURN_COUNT number of times,
             a. Caesar cipher is applied to the key.
             b. The key is then randomized.
             c. The delta for caesar cipher is re-computed as the mod inverse of existing delta under self.MOD.
+
+        The result is computed in closed form, which gives the same key as running the steps:
+
+        - The mod inverse of the mod inverse is the number itself, so the delta alternates between two values.
+        - The caesar cipher shifts every character by the same delta modulo CIPHER_KEY_ASCII_LIM, so all the shifts add up to a single shift.
+        - The randomization permutes the positions independently of the characters, so the permutations are composed on positions only.
         """
         if self.master_password == None or self.master_password == '':
             raise Exception('Master Key should be at least one character long')
         if self.master_key == None or self.master_key < 0:
             raise Exception('Master Password must be a non-negative integer')
 
-        caesar_delta = self.__mod_inverse(self.master_key)
-        random.seed(self.master_key)
+        deltas = [self.__mod_inverse(self.master_key)]
+        deltas.append(self.__mod_inverse(deltas[0]))
+        self.randomizer = random.Random(self.master_key)
         self.key = self.master_password
         self.__trim()
         self.__pad()
+
+        positions = range(len(self.key))
         for _ in range(CIPHER_KEY_CHURN_COUNT):
-            self.__apply_caesar(caesar_delta)
-            self.__randomize()
-            caesar_delta = self.__mod_inverse(caesar_delta)
+            positions = [positions[index] for index in self.randomizer.sample(
+                range(len(self.key)), len(self.key))]
+        characters = [ord(self.key[position]) for position in positions]
+        if CIPHER_KEY_CHURN_COUNT > 0:
+            shift = ((CIPHER_KEY_CHURN_COUNT + 1) // 2 * deltas[0] +
+                     CIPHER_KEY_CHURN_COUNT // 2 * deltas[1]) % CIPHER_KEY_ASCII_LIM
+            characters = [(character + shift) %
+                          CIPHER_KEY_ASCII_LIM for character in characters]
+        self.key = ''.join(map(chr, characters))
 
     def __mod_inverse(self, number):
         """Computes the modular inverse of the number under CIPHER_KEY_MOD.
+        A multiple of CIPHER_KEY_MOD has no inverse, and 0 is returned for it.
         Args:
             number (int): The number whose modular inverse is to be calculated.
 
         Returns:
             int: Modular inverse of number under CIPHER_KEY_MOD.
         """
-        result = 1
-        power = CIPHER_KEY_MOD - 2
-        while power > 0:
-            if (power & 1) > 0:
-                result *= number
-                result %= CIPHER_KEY_MOD
-            power //= 2
-            number *= number
-            number %= CIPHER_KEY_MOD
-        return result
-
-    def __apply_caesar(self, delta):
-        """Applies caesar cipher to the key. The characters are bound by CIPHER_KEY_ASCII_LIM.
-        Args:
-            delta (int): The delta by which the characters are required to be shifted.
-        """
-        keylist = list(self.key)
-        for index in range(len(keylist)):
-            keylist[index] = chr((ord(keylist[index]) + delta) %
-                                 CIPHER_KEY_ASCII_LIM)
-        self.key = ''.join(keylist)
-
-    def __randomize(self):
-        """Applies randomization to the characters of the key."""
-        self.key = ''.join(random.sample(self.key, len(self.key)))
+        if number % CIPHER_KEY_MOD == 0:
+            return 0
+        return pow(number, -1, CIPHER_KEY_MOD)
 
     def __pad(self):
         """Repeatedly appends specified master password to the key till the key is 
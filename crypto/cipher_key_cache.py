@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from constants.key_config import CIPHER_KEY_CACHE_MAX_SIZE, CIPHER_KEY_CACHE_TTL_SECONDS
+from constants.metrics_config import STAGE_KEY_DERIVATION
+from crypto.cipher_key import CipherKey
+from utils.hash import generate_hash
+from utils.request_timing import time_stage
+
+
+class CipherKeyCache:
+    """A bounded, process-local cache of derived cipher keys.
+
+    The keys are looked up by the hash of master password and master key, so the credentials themselves are never stored.
+    The least recently used key is evicted when the cache is full and a key is evicted when its time to live expires.
+    Evicted keys are overwritten with zeros.
+
+    Attributes:
+        max_size (int): Maximum number of keys in the cache.
+        ttl (float): Number of seconds a key stays in the cache.
+        clock (function): Returns the current time in seconds.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that required key generation.
+        entries (OrderedDict): Map of credential hash to (key bytearray, expiry time), ordered from least to most recently used.
+        lock (Lock): Lock guarding the entries and the counters.
+    """
+    max_size = None
+    ttl = None
+    clock = None
+    hits = None
+    misses = None
+    entries = None
+    lock = None
+
+    def __init__(self, max_size=CIPHER_KEY_CACHE_MAX_SIZE, ttl=CIPHER_KEY_CACHE_TTL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            max_size (int, optional): Maximum number of keys in the cache. Defaults to CIPHER_KEY_CACHE_MAX_SIZE.
+            ttl (float, optional): Number of seconds a key stays in the cache. Defaults to CIPHER_KEY_CACHE_TTL_SECONDS.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_binary(self, master_password, master_key):
+        """Returns the cipher key for the master password and master key. The key is generated on a cache miss.
+        Args:
+            master_password (str): Master password for key generation.
+            master_key (int): Master key for key generation.
+        Returns:
+            bytes: Cipher key as bytes
+        """
+        digest = self.__digest(master_password, master_key)
+        with self.lock:
+            self.__evict_expired()
+            if digest in self.entries:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                return bytes(self.entries[digest][0])
+            self.misses += 1
+
+        with time_stage(STAGE_KEY_DERIVATION):
+            cipher_key_builder = CipherKey.Builder()
+            cipher_key_builder.set_master_password(master_password)
+            cipher_key_builder.set_master_key(master_key)
+            cipher_key = cipher_key_builder.build().get_binary()
+
+        with self.lock:
+            if digest in self.entries:
+                self.__evict(digest)
+            self.entries[digest] = (bytearray(cipher_key),
+                                    self.clock() + self.ttl)
+            while len(self.entries) > self.max_size:
+                self.__evict(next(iter(self.entries)))
+        return cipher_key
+
+    def render(self):
+        """
+        Returns:
+            list: The lookup counters and the number of cached keys in the Prometheus text format.
+        """
+        with self.lock:
+            hits, misses, size = self.hits, self.misses, len(self.entries)
+        return ['# HELP pwdmngr_cipher_key_cache_lookups_total Number of cipher key lookups by result. A miss derives the key.',
+                '# TYPE pwdmngr_cipher_key_cache_lookups_total counter',
+                'pwdmngr_cipher_key_cache_lookups_total{{result="hit"}} {}'.format(hits),
+                'pwdmngr_cipher_key_cache_lookups_total{{result="miss"}} {}'.format(misses),
+                '# HELP pwdmngr_cipher_key_cache_size Number of cipher keys in the cache.',
+                '# TYPE pwdmngr_cipher_key_cache_size gauge',
+                'pwdmngr_cipher_key_cache_size {}'.format(size)]
+
+    def clear(self):
+        """Evicts all the keys."""
+        with self.lock:
+            for digest in list(self.entries):
+                self.__evict(digest)
+
+    def __digest(self, master_password, master_key):
+        """Hashes the master password and master key. The length of master password is included to keep the hash unambiguous.
+        Args:
+            master_password (str): Master password for key generation.
+            master_key (int): Master key for key generation.
+        Returns:
+            str: Hash of the credentials.
+        """
+        return generate_hash('{}:{}:{}'.format(len(master_password or ''), master_password, master_key))
+
+    def __evict_expired(self):
+        """Evicts the keys whose time to live has expired. Must be called with the lock held."""
+        now = self.clock()
+        for digest in [digest for digest, (_, expiry) in self.entries.items() if expiry <= now]:
+            self.__evict(digest)
+
+    def __evict(self, digest):
+        """Removes a key from the cache and overwrites it with zeros. Must be called with the lock held.
+        Args:
+            digest (str): Hash of the credentials of the key.
+        """
+        key, _ = self.entries.pop(digest)
+        for index in range(len(key)):
+            key[index] = 0
+
+
+# Cache shared by all encrypters and decrypters of the process.
+cipher_key_cache = CipherKeyCache()
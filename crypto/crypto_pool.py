@@ -0,0 +1,293 @@
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from constants.crypto_pool_config import CRYPTO_POOL_MAX_WORKERS, CRYPTO_POOL_MIN_BATCH_SIZE
+from constants.metrics_config import STAGE_CRYPTO
+from crypto.decrypter import Decrypter
+from crypto.encrypter import Encrypter
+from crypto.secret_format import SECRET_FORMAT_GCM
+from utils.request_timing import time_stage
+
+
+def encrypt_records(master_password, master_key, records):
+    """Encrypts the secrets of records. A new Encrypter is used for every record as the AES cipher chains the blocks of all secrets it encrypts.
+    It runs in the worker processes, each of which derives the cipher key once and keeps it in its own cipher key cache.
+    Args:
+        master_password (str): Master password for key generation.
+        master_key (int): Master key for key generation.
+        records (list): List of secrets of every record.
+    Returns:
+        list: List of encrypted secrets of every record.
+    """
+    result = []
+    for secrets in records:
+        encrypter = Encrypter(master_password, master_key)
+        result.append([encrypter.encrypt(secret) for secret in secrets])
+    return result
+
+
+def decrypt_records(master_password, master_key, records):
+    """Decrypts the secrets of records. The Decrypter keeps no state between secrets, so a single one decrypts every record.
+    Args:
+        master_password (str): Master password for key generation.
+        master_key (int): Master key for key generation.
+        records (list): List of encrypted secrets of every record.
+    Returns:
+        list: List of decrypted secrets of every record.
+    """
+    decrypter = Decrypter(master_password, master_key)
+    return [decrypter.decrypt_secrets(secrets) for secrets in records]
+
+
+def reencrypt_records(master_password, master_key, new_master_password, new_master_key, records):
+    """Decrypts the secrets of records with a master password and master key and encrypts them with new ones.
+    Args:
+        master_password (str): Master password the secrets are encrypted with.
+        master_key (int): Master key the secrets are encrypted with.
+        new_master_password (str): Master password to encrypt the secrets with.
+        new_master_key (int): Master key to encrypt the secrets with.
+        records (list): List of encrypted secrets of every record.
+    Returns:
+        list: List of secrets of every record encrypted with the new master password and master key.
+    """
+    result = []
+    decrypter = Decrypter(master_password, master_key)
+    for secrets in records:
+        encrypter = Encrypter(new_master_password, new_master_key)
+        result.append([encrypter.encrypt(secret)
+                      for secret in decrypter.decrypt_secrets(secrets)])
+    return result
+
+
+def convert_records(master_password, master_key, records):
+    """Converts the secrets of records in the legacy format to the GCM format, keeping the master password and master key.
+    Binary secrets are kept as they are.
+    Args:
+        master_password (str): Master password for key generation.
+        master_key (int): Master key for key generation.
+        records (list): List of encrypted secrets of every record.
+    Returns:
+        list: List of secrets of every record in the GCM format.
+    """
+    decrypter = Decrypter(master_password, master_key)
+    encrypter = Encrypter(master_password, master_key, SECRET_FORMAT_GCM)
+    return [[encrypter.encrypt(decrypted) if isinstance(secret, str) else secret
+             for secret, decrypted in zip(secrets, decrypter.decrypt_secrets(secrets))] for secrets in records]
+
+
+class CryptoPool:
+    """A pool of worker processes for the CPU-bound key derivation, encryption and decryption, which don't scale across threads because of the GIL.
+
+    The work of a request is sent to the workers as a batch of records. A large batch is split into one task per worker.
+    A batch with fewer secrets than min_batch_size is run in the calling process.
+    The workers are spawned on the first use, so the pool can be created at import time.
+
+    Attributes:
+        max_workers (int): Number of worker processes. 0 runs all the work in the calling process.
+        min_batch_size (int): Minimum number of secrets in a batch that is sent to the workers.
+        clock (function): Returns the current time in seconds.
+        executor (ProcessPoolExecutor): The pool of worker processes. It is None until the first batch is sent to the workers.
+        queue_depth (int): Number of tasks sent to the workers that haven't finished.
+        pool_tasks (int): Number of finished tasks run by the workers.
+        local_tasks (int): Number of batches run in the calling process.
+        total_latency (float): Total seconds from sending a task to the workers until its result was received.
+        max_latency (float): Maximum seconds from sending a task to the workers until its result was received.
+        lock (Lock): Lock guarding the executor and the counters.
+    """
+    max_workers = None
+    min_batch_size = None
+    clock = None
+    executor = None
+    queue_depth = None
+    pool_tasks = None
+    local_tasks = None
+    total_latency = None
+    max_latency = None
+    lock = None
+
+    def __init__(self, max_workers=CRYPTO_POOL_MAX_WORKERS, min_batch_size=CRYPTO_POOL_MIN_BATCH_SIZE, clock=time.monotonic):
+        """
+        Args:
+            max_workers (int, optional): Number of worker processes. Defaults to CRYPTO_POOL_MAX_WORKERS.
+            min_batch_size (int, optional): Minimum number of secrets in a batch that is sent to the workers. Defaults to CRYPTO_POOL_MIN_BATCH_SIZE.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.max_workers = max_workers
+        self.min_batch_size = min_batch_size
+        self.clock = clock
+        self.queue_depth = 0
+        self.pool_tasks = 0
+        self.local_tasks = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.lock = threading.Lock()
+
+    def encrypt_records(self, master_password, master_key, records):
+        """Encrypts the secrets of records.
+        Args:
+            master_password (str): Master password for key generation.
+            master_key (int): Master key for key generation.
+            records (list): List of secrets of every record.
+        Returns:
+            list: List of encrypted secrets of every record.
+        """
+        with time_stage(STAGE_CRYPTO):
+            return self.__run(encrypt_records, (master_password, master_key), records)
+
+    def decrypt_records(self, master_password, master_key, records):
+        """Decrypts the secrets of records.
+        Args:
+            master_password (str): Master password for key generation.
+            master_key (int): Master key for key generation.
+            records (list): List of encrypted secrets of every record.
+        Returns:
+            list: List of decrypted secrets of every record.
+        """
+        with time_stage(STAGE_CRYPTO):
+            return self.__run(decrypt_records, (master_password, master_key), records)
+
+    def reencrypt_records(self, master_password, master_key, new_master_password, new_master_key, records):
+        """Encrypts the secrets of records with a new master password and master key.
+        Args:
+            master_password (str): Master password the secrets are encrypted with.
+            master_key (int): Master key the secrets are encrypted with.
+            new_master_password (str): Master password to encrypt the secrets with.
+            new_master_key (int): Master key to encrypt the secrets with.
+            records (list): List of encrypted secrets of every record.
+        Returns:
+            list: List of secrets of every record encrypted with the new master password and master key.
+        """
+        with time_stage(STAGE_CRYPTO):
+            return self.__run(reencrypt_records, (master_password, master_key, new_master_password, new_master_key), records)
+
+    def convert_records(self, master_password, master_key, records):
+        """Converts the secrets of records in the legacy format to the GCM format.
+        Args:
+            master_password (str): Master password for key generation.
+            master_key (int): Master key for key generation.
+            records (list): List of encrypted secrets of every record.
+        Returns:
+            list: List of secrets of every record in the GCM format.
+        """
+        with time_stage(STAGE_CRYPTO):
+            return self.__run(convert_records, (master_password, master_key), records)
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: The queue depth, the number of tasks run by the workers and in the calling process and the latency of the tasks run by the workers in seconds.
+        """
+        with self.lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'pool_tasks': self.pool_tasks,
+                'local_tasks': self.local_tasks,
+                'average_latency': self.total_latency / self.pool_tasks if self.pool_tasks > 0 else 0.0,
+                'max_latency': self.max_latency
+            }
+
+    def render(self):
+        """
+        Returns:
+            list: The stats in the Prometheus text format.
+        """
+        metrics = [
+            ('pwdmngr_crypto_pool_queue_depth', 'gauge', 'Number of tasks sent to the workers that have not finished.', 'queue_depth'),
+            ('pwdmngr_crypto_pool_tasks_total', 'counter', 'Number of finished tasks run by the workers.', 'pool_tasks'),
+            ('pwdmngr_crypto_pool_local_tasks_total', 'counter', 'Number of batches run in the calling process.', 'local_tasks'),
+            ('pwdmngr_crypto_pool_task_seconds_total', 'counter', 'Time from sending a task to the workers until its result was received.', 'total_latency'),
+            ('pwdmngr_crypto_pool_task_max_seconds', 'gauge', 'Maximum time from sending a task to the workers until its result was received.', 'max_latency')
+        ]
+        with self.lock:
+            stats = {'queue_depth': self.queue_depth, 'pool_tasks': self.pool_tasks, 'local_tasks': self.local_tasks,
+                     'total_latency': self.total_latency, 'max_latency': self.max_latency}
+        lines = []
+        for name, metric_type, description, field in metrics:
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            lines.append('{} {}'.format(name, stats[field]))
+        return lines
+
+    def shutdown(self):
+        """Stops the worker processes. They are spawned again if another batch is sent to the workers."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor != None:
+            executor.shutdown()
+
+    def __run(self, function, credentials, records):
+        """Runs the function on the records either in the calling process or in the workers.
+        Args:
+            function (function): encrypt_records(), decrypt_records(), reencrypt_records() or convert_records().
+            credentials (tuple): The master passwords and master keys passed to the function before the records.
+            records (list): List of secrets of every record.
+        Returns:
+            list: The result of the function for every record, in the order of the records.
+        """
+        secret_count = sum(len(secrets) for secrets in records)
+        if self.max_workers == 0 or secret_count < self.min_batch_size:
+            with self.lock:
+                self.local_tasks += 1
+            return function(*credentials, records)
+
+        task_count = min(self.max_workers, len(records),
+                         secret_count // self.min_batch_size)
+        task_size = math.ceil(len(records) / task_count)
+        executor = self.__get_executor()
+        tasks = []
+        for index in range(0, len(records), task_size):
+            tasks.append(self.__submit(executor, function, credentials,
+                                       records[index: index + task_size]))
+        for future, start in tasks:
+            wait([future])
+            self.__complete(start)
+        result = []
+        for future, _ in tasks:
+            result.extend(future.result())
+        return result
+
+    def __submit(self, executor, function, credentials, records):
+        """Sends a task to the workers and increments the queue depth.
+        Returns:
+            (Future, float): The future of the task, The time at which it was sent.
+        """
+        start = self.clock()
+        with self.lock:
+            self.queue_depth += 1
+        try:
+            return executor.submit(function, *credentials, records), start
+        except Exception:
+            with self.lock:
+                self.queue_depth -= 1
+            raise
+
+    def __complete(self, start):
+        """Decrements the queue depth and records the latency of a finished task.
+        Args:
+            start (float): The time at which the task was sent.
+        """
+        latency = self.clock() - start
+        with self.lock:
+            self.queue_depth -= 1
+            self.pool_tasks += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def __get_executor(self):
+        """Creates the pool of worker processes on the first use.
+        The workers are spawned rather than forked, so that they don't inherit the threads and the database connections of the server.
+        A spawned worker imports the main module again as __mp_main__, so the servers only connect to the database in create_app().
+        Returns:
+            ProcessPoolExecutor: The pool of worker processes.
+        """
+        with self.lock:
+            if self.executor == None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+
+# Pool shared by all the processors of the process.
+crypto_pool = CryptoPool()
@@ -1,50 +1,113 @@
 import base64
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
-from crypto.cipher_key import CipherKey
+from Crypto.Util.strxor import strxor
+from crypto.cipher_key_cache import cipher_key_cache
+from crypto.secret_format import SECRET_FORMAT_GCM, GCM_NONCE_SIZE, GCM_TAG_SIZE, derive_gcm_key
 
 
 class Decrypter:
     """A wrapper class for decryption
 
-    This class uses AES cipher to decrypt strings. Cipher Block Chain mode is used for AES.
+    This class uses AES cipher to decrypt strings of every version of the secret format. It keeps no state between secrets,
+    so the same Decrypter decrypts the secrets of any number of records, in any order.
+    Binary secrets are in the GCM format and are decrypted independently of each other.
+    String secrets are in the legacy format, which uses Cipher Block Chain mode chained across the secrets of a record:
+    the initialization vector of a secret is the last block of the previous secret of the record, and the cipher key for the first one.
 
     Attributes:
-        cipher (AESCipher): The AES cipher
+        ecb_cipher (AESCipher): The AES cipher in ECB mode holding the expanded cipher key. It is stateless, so every legacy secret reuses it.
+        legacy_iv (bytes): The initialization vector of the first legacy secret of a record, which is the cipher key.
+        gcm_key (bytes): The AES key of the GCM format
     """
-    cipher = None
+    ecb_cipher = None
+    legacy_iv = None
+    gcm_key = None
 
     def __init__(self, master_password, master_key):
         """
-        A new CipherKey object is created using the given master password and master key.
-        The key binary of CipherKey is then used as key and initialization vector for AES cipher.
+        The cipher key for the given master password and master key is looked up in the cipher key cache (and generated on a miss).
+        The legacy format uses the cipher key as key and initialization vector for AES cipher. The GCM format uses a key derived from it.
         Args:
             master_password (str): Master password for key generation.
             master_key (int): Master key for key generation.
         """
-        cipher_key_builder = CipherKey.Builder()
-        cipher_key_builder.set_master_password(master_password)
-        cipher_key_builder.set_master_key(master_key)
-        cipher_key = cipher_key_builder.build().get_binary()
-        self.cipher = AES.new(cipher_key, AES.MODE_CBC, cipher_key)
-
-    def decrypt(self, encrypted_base64_string):
-        """Decrypts an encrypted base64 string using AESCipher and returns a utf-8 string of the decrypted bytes.
-        Decryption works as follows:
+        cipher_key = cipher_key_cache.get_binary(master_password, master_key)
+        self.ecb_cipher = AES.new(cipher_key, AES.MODE_ECB)
+        self.legacy_iv = cipher_key
+        self.gcm_key = derive_gcm_key(cipher_key)
+
+    def decrypt(self, encrypted, iv=None):
+        """Decrypts an encrypted secret and returns a utf-8 string of the decrypted bytes.
+        GCM decryption works as follows:
+        1. The version byte, the nonce, the encrypted bytes and the authentication tag are split.
+        2. The bytes are decrypted and verified along with the version byte.
+        3. The bytes are then decoded to utf-8 string.
+
+        Legacy decryption works as follows:
         1. The ASCII base64 string is encoded to bytes.
         2. The base64 bytes are converted to normal bytes (Every 8 bits are converted to 6 bit)
         3. The bytes are decrypted.
-        4. The decrypted bytes are unpadded using AES block size.
+        4. The decrypted bytes are unpadded.
         5. The bytes are then decoded to utf-8 string.
 
         Args:
-            string (str): The base64 encrypted string to be encrypted.
+            encrypted (bytes|str): The binary encrypted secret, or the base64 encrypted string of the legacy format.
+            iv (bytes, optional): The initialization vector of a legacy secret. Defaults to the one of the first secret of a record.
 
         Returns:
             string: Decrypted bytes as utf-8 string
+
+        Raises:
+            ValueError: If the secret is of an unknown version or fails authentication.
+        """
+        if isinstance(encrypted, str):
+            encrypted_base64_bytes = encrypted.encode('ascii')
+            encrypted_bytes = base64.b64decode(encrypted_base64_bytes)
+            return self.__decrypt_legacy(encrypted_bytes, iv if iv != None else self.legacy_iv)
+        encrypted = bytes(encrypted)
+        if len(encrypted) < 1 + GCM_NONCE_SIZE + GCM_TAG_SIZE or encrypted[0] != SECRET_FORMAT_GCM:
+            raise ValueError('Unsupported secret format')
+        cipher = AES.new(self.gcm_key, AES.MODE_GCM,
+                         nonce=encrypted[1:1 + GCM_NONCE_SIZE])
+        cipher.update(encrypted[:1])
+        encoded_bytes = cipher.decrypt_and_verify(
+            encrypted[1 + GCM_NONCE_SIZE:-GCM_TAG_SIZE], encrypted[-GCM_TAG_SIZE:])
+        return encoded_bytes.decode('utf-8')
+
+    def decrypt_secrets(self, secrets):
+        """Decrypts the secrets of a record.
+        The initialization vectors of the legacy secrets are read from the stored secrets, so every secret is decrypted on its own.
+        Args:
+            secrets (list): The encrypted secrets of a record, in the order they are stored.
+        Returns:
+            list: The decrypted secrets.
+        """
+        result = []
+        iv = self.legacy_iv
+        for secret in secrets:
+            if not isinstance(secret, str):
+                result.append(self.decrypt(secret))
+                continue
+            encrypted_bytes = base64.b64decode(secret.encode('ascii'))
+            result.append(self.__decrypt_legacy(encrypted_bytes, iv))
+            iv = encrypted_bytes[-AES.block_size:]
+        return result
+
+    def __decrypt_legacy(self, encrypted_bytes, iv):
+        """Decrypts a legacy secret in CBC mode with the ECB cipher: every decrypted block is XORed with the previous encrypted block.
+        Args:
+            encrypted_bytes (bytes): The encrypted bytes of the secret.
+            iv (bytes): The initialization vector of the secret.
+        Returns:
+            string: Decrypted bytes as utf-8 string
+        Raises:
+            ValueError: If the encrypted bytes aren't whole blocks or aren't padded.
         """
-        encrypted_base64_bytes = encrypted_base64_string.encode('ascii')
-        encrypted_bytes = base64.b64decode(encrypted_base64_bytes)
-        padded_encoded_bytes = self.cipher.decrypt(encrypted_bytes)
+        if len(encrypted_bytes) == 0 or len(encrypted_bytes) % AES.block_size != 0:
+            raise ValueError('Unsupported secret format')
+        decrypted_bytes = self.ecb_cipher.decrypt(encrypted_bytes)
+        padded_encoded_bytes = strxor(
+            decrypted_bytes, iv + encrypted_bytes[:-AES.block_size])
         encoded_bytes = unpad(padded_encoded_bytes, AES.block_size)
         return encoded_bytes.decode('utf-8')
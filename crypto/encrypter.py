@@ -1,36 +1,55 @@
 import base64
+from bson.binary import Binary
 from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
 from Crypto.Util.Padding import pad
-from crypto.cipher_key import CipherKey
+from constants.key_config import SECRET_FORMAT_VERSION
+from crypto.cipher_key_cache import cipher_key_cache
+from crypto.secret_format import SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM, GCM_NONCE_SIZE, derive_gcm_key
 
 
 class Encrypter:
     """A wrapper class for encryption
 
-    This class uses AES cipher to encrypt strings. Cipher Block Chain mode is used for AES.
+    This class uses AES cipher to encrypt strings in the versioned secret format.
+    The GCM format encrypts every secret with its own random nonce, so the secrets don't depend on each other.
+    The legacy format uses Cipher Block Chain mode, which chains the blocks of all the secrets encrypted by the same Encrypter.
 
     Attributes:
-        cipher (AESCipher): The AES cipher
+        version (int): Version of the format of the encrypted secrets.
+        cipher (AESCipher): The AES cipher of the legacy format.
+        gcm_key (bytes): The AES key of the GCM format.
     """
+    version = None
     cipher = None
+    gcm_key = None
 
-    def __init__(self, master_password, master_key):
+    def __init__(self, master_password, master_key, version=SECRET_FORMAT_VERSION):
         """
-        A new CipherKey object is created using the given master password and master key.
-        The key binary of CipherKey is then used as key and initialization vector for AES cipher.
+        The cipher key for the given master password and master key is looked up in the cipher key cache (and generated on a miss).
+        The legacy format uses the cipher key as key and initialization vector for AES cipher. The GCM format uses a key derived from it.
         Args:
             master_password (str): Master password for key generation.
             master_key (int): Master key for key generation.
+            version (int, optional): Version of the format of the encrypted secrets. Defaults to SECRET_FORMAT_VERSION.
         """
-        cipher_key_builder = CipherKey.Builder()
-        cipher_key_builder.set_master_password(master_password)
-        cipher_key_builder.set_master_key(master_key)
-        cipher_key = cipher_key_builder.build().get_binary()
-        self.cipher = AES.new(cipher_key, AES.MODE_CBC, cipher_key)
+        assert version in [SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM]
+        cipher_key = cipher_key_cache.get_binary(master_password, master_key)
+        self.version = version
+        if version == SECRET_FORMAT_LEGACY:
+            self.cipher = AES.new(cipher_key, AES.MODE_CBC, cipher_key)
+        else:
+            self.gcm_key = derive_gcm_key(cipher_key)
 
     def encrypt(self, string):
-        """Encrypts the string using AESCipher and returns a base64 string of the encrypted bytes.
-        Encryption works as follows:
+        """Encrypts the string in the format of the version of the Encrypter.
+        GCM encryption works as follows:
+        1. Encode the string to bytes.
+        2. Generate a random nonce.
+        3. Encrypt the bytes and authenticate them along with the version byte.
+        4. Concatenate the version byte, the nonce, the encrypted bytes and the authentication tag.
+
+        Legacy encryption works as follows:
         1. Encode the string to bytes.
         2. Pad the bytes to the block size of AES.
         3. Encrypt the bytes.
@@ -41,10 +60,17 @@ class Encrypter:
             string (str): The string to be encrypted.
 
         Returns:
-            string: Encrypted bytes as base64 string
+            Binary|string: Encrypted secret as BSON binary, or as base64 string in the legacy format
         """
         encoded_bytes = string.encode('utf-8')
-        padded_encoded_bytes = pad(encoded_bytes, AES.block_size)
-        encrypted_bytes = self.cipher.encrypt(padded_encoded_bytes)
-        encrypted_base64_bytes = base64.b64encode(encrypted_bytes)
-        return encrypted_base64_bytes.decode('ascii')
+        if self.version == SECRET_FORMAT_LEGACY:
+            padded_encoded_bytes = pad(encoded_bytes, AES.block_size)
+            encrypted_bytes = self.cipher.encrypt(padded_encoded_bytes)
+            encrypted_base64_bytes = base64.b64encode(encrypted_bytes)
+            return encrypted_base64_bytes.decode('ascii')
+        header = bytes([self.version])
+        nonce = get_random_bytes(GCM_NONCE_SIZE)
+        cipher = AES.new(self.gcm_key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(header)
+        encrypted_bytes, tag = cipher.encrypt_and_digest(encoded_bytes)
+        return Binary(header + nonce + encrypted_bytes + tag)
@@ -0,0 +1,21 @@
+import hashlib
+import hmac
+
+# The legacy format: AES in CBC mode with the cipher key as initialization vector, stored as a base64 string.
+SECRET_FORMAT_LEGACY = 0
+# AES in GCM mode, stored as binary: the version byte, a random nonce, the ciphertext and the authentication tag.
+SECRET_FORMAT_GCM = 1
+GCM_NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+# Context of the derivation of the GCM key, so that the cipher key isn't used by both modes.
+GCM_KEY_CONTEXT = b'pwdmngr-secret-gcm'
+
+
+def derive_gcm_key(cipher_key):
+    """Derives the key of the GCM format from the cipher key.
+    Args:
+        cipher_key (bytes): The cipher key of the master password and master key.
+    Returns:
+        bytes: The 256 bit AES key.
+    """
+    return hmac.new(cipher_key, GCM_KEY_CONTEXT, hashlib.sha256).digest()
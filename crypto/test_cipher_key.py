@@ -1,5 +1,17 @@
+import json
+import os
 import pytest
-from utils.test import create_cipher_key
+import random
+from concurrent.futures import ThreadPoolExecutor
+from utils.test import create_cipher_key, create_random_string, create_random_master_key
+
+STRESS_TEST_KEY_COUNT = 2000
+STRESS_TEST_THREAD_COUNT = 16
+MAX_STRING_LENGTH = 32
+MAX_MASTER_KEY_VALUE = 100000
+# Keys generated by the original step-by-step algorithm as [master password, master key, key bytes in hex].
+GOLDEN_VECTORS_FILE = os.path.join(os.path.dirname(
+    __file__), 'test_cipher_key_vectors.json')
 
 
 def test_exact_length_master_password():
@@ -60,3 +72,39 @@ def test_illegal_master_key():
         pytest.xfail('Expected exception as the master key was negative')
     except Exception as e:
         pass
+
+
+def test_global_random_state_untouched():
+    """Tests that key generation doesn't reseed the global random module."""
+
+    random.seed(42)
+    state = random.getstate()
+    create_cipher_key('sdal67g34', 642)
+    assert random.getstate() == state
+
+
+def test_concurrent_key_generation():
+    """Generates STRESS_TEST_KEY_COUNT keys serially and then concurrently from STRESS_TEST_THREAD_COUNT threads.
+    Assertion is made that the concurrently generated keys are identical to the serially generated keys.
+    """
+    credentials = [(create_random_string(MAX_STRING_LENGTH), create_random_master_key(MAX_MASTER_KEY_VALUE))
+                   for _ in range(STRESS_TEST_KEY_COUNT)]
+
+    def generate(credential):
+        return create_cipher_key(credential[0], credential[1]).get_string()
+
+    serial_keys = [generate(credential) for credential in credentials]
+    with ThreadPoolExecutor(max_workers=STRESS_TEST_THREAD_COUNT) as executor:
+        concurrent_keys = list(executor.map(generate, credentials))
+    assert concurrent_keys == serial_keys
+
+
+def test_golden_vectors():
+    """Tests that the generated keys are identical to the keys generated by the original algorithm, so that existing secrets can still be decrypted.
+    The vectors include unicode and control characters in master passwords and master keys that are 0 or multiples of CIPHER_KEY_MOD."""
+
+    with open(GOLDEN_VECTORS_FILE, encoding='utf-8') as file:
+        vectors = json.load(file)
+    assert len(vectors) >= 3000
+    for master_password, master_key, expected_key in vectors:
+        assert create_cipher_key(master_password, master_key).get_binary().hex() == expected_key, (master_password, master_key)
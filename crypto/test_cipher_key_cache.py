@@ -0,0 +1,85 @@
+import pytest
+from crypto.cipher_key_cache import CipherKeyCache
+from utils.test import create_cipher_key, create_mock_clock
+
+
+def test_cipher_key_cache_hit():
+    """Tests that a repeated lookup is served from the cache and returns the generated key."""
+
+    cache = CipherKeyCache()
+    first = cache.get_binary('abcd', 1234)
+    second = cache.get_binary('abcd', 1234)
+    assert first == second == create_cipher_key('abcd', 1234).get_binary()
+    assert cache.misses == 1
+    assert cache.hits == 1
+
+
+def test_cipher_key_cache_render():
+    """Tests the Prometheus metrics of the cache after a miss and a hit."""
+
+    cache = CipherKeyCache()
+    cache.get_binary('abcd', 1234)
+    cache.get_binary('abcd', 1234)
+    lines = cache.render()
+    assert 'pwdmngr_cipher_key_cache_lookups_total{result="hit"} 1' in lines
+    assert 'pwdmngr_cipher_key_cache_lookups_total{result="miss"} 1' in lines
+    assert 'pwdmngr_cipher_key_cache_size 1' in lines
+
+
+def test_cipher_key_cache_distinct_credentials():
+    """Tests that different credentials are cached as different keys."""
+
+    cache = CipherKeyCache()
+    cache.get_binary('abcd', 1234)
+    cache.get_binary('abcd', 1235)
+    cache.get_binary('abce', 1234)
+    assert cache.misses == 3
+    assert cache.hits == 0
+
+
+def test_cipher_key_cache_ttl_expiry_zeroizes_key():
+    """Tests that an expired key is evicted, overwritten with zeros and generated again."""
+
+    clock = create_mock_clock()
+    cache = CipherKeyCache(ttl=10, clock=clock)
+    cache.get_binary('abcd', 1234)
+    key = next(iter(cache.entries.values()))[0]
+    clock.now = 10
+    assert cache.get_binary('abcd', 1234) == create_cipher_key(
+        'abcd', 1234).get_binary()
+    assert key == bytearray(len(key))
+    assert cache.misses == 2
+
+
+def test_cipher_key_cache_bounded_size_evicts_least_recently_used():
+    """Tests that the least recently used key is evicted and zeroized when the cache is full."""
+
+    cache = CipherKeyCache(max_size=2)
+    cache.get_binary('first', 1)
+    first_key = next(iter(cache.entries.values()))[0]
+    cache.get_binary('second', 2)
+    cache.get_binary('third', 3)
+    assert len(cache.entries) == 2
+    assert first_key == bytearray(len(first_key))
+    cache.get_binary('third', 3)
+    assert cache.hits == 1
+
+
+def test_cipher_key_cache_clear_zeroizes_keys():
+    """Tests that clearing the cache overwrites every key with zeros."""
+
+    cache = CipherKeyCache()
+    cache.get_binary('abcd', 1234)
+    key = next(iter(cache.entries.values()))[0]
+    cache.clear()
+    assert len(cache.entries) == 0
+    assert key == bytearray(len(key))
+
+
+def test_cipher_key_cache_illegal_master_password():
+    """Tests that key generation errors are raised and nothing is cached."""
+
+    cache = CipherKeyCache()
+    with pytest.raises(Exception):
+        cache.get_binary('', 1234)
+    assert len(cache.entries) == 0
@@ -0,0 +1,105 @@
+from crypto.crypto_pool import CryptoPool, encrypt_records, decrypt_records, reencrypt_records
+from crypto.encrypter import Encrypter
+from crypto.secret_format import SECRET_FORMAT_LEGACY
+
+
+def create_records(record_count, secret_count):
+    """Creates the secrets of records.
+    Args:
+        record_count (int): Number of records.
+        secret_count (int): Number of secrets of every record.
+    Returns:
+        list: List of secrets of every record.
+    """
+    return [['secret{}-{}'.format(record, secret) for secret in range(secret_count)] for record in range(record_count)]
+
+
+def test_crypto_pool_small_batch_runs_in_process():
+    """Tests that a batch smaller than the minimum batch size is run in the calling process without spawning workers."""
+
+    pool = CryptoPool(max_workers=2, min_batch_size=8)
+    records = create_records(2, 3)
+    encrypted = pool.encrypt_records('abcd', 1234, records)
+    assert decrypt_records('abcd', 1234, encrypted) == records
+    assert pool.executor == None
+    assert pool.get_stats()['local_tasks'] == 1
+
+
+def test_crypto_pool_without_workers_runs_in_process():
+    """Tests that all the batches are run in the calling process if the pool has no workers."""
+
+    pool = CryptoPool(max_workers=0, min_batch_size=1)
+    pool.decrypt_records('abcd', 1234, encrypt_records(
+        'abcd', 1234, create_records(10, 10)))
+    assert pool.executor == None
+    assert pool.get_stats()['pool_tasks'] == 0
+
+
+def test_crypto_pool_render():
+    """Tests the Prometheus metrics of the pool after a batch run in the calling process.
+    Expects the queue depth, the task counters and the latency."""
+
+    pool = CryptoPool(max_workers=0, min_batch_size=1)
+    pool.encrypt_records('abcd', 1234, create_records(2, 3))
+    lines = pool.render()
+    assert 'pwdmngr_crypto_pool_queue_depth 0' in lines
+    assert 'pwdmngr_crypto_pool_local_tasks_total 1' in lines
+    assert 'pwdmngr_crypto_pool_tasks_total 0' in lines
+    assert '# TYPE pwdmngr_crypto_pool_task_seconds_total counter' in lines
+    assert 'pwdmngr_crypto_pool_task_max_seconds 0.0' in lines
+
+
+def test_crypto_pool_large_batch_runs_in_workers():
+    """Tests that a large batch is split among the workers and gives the results in the order of the records."""
+
+    pool = CryptoPool(max_workers=2, min_batch_size=8)
+    records = create_records(9, 4)
+    try:
+        encrypted = pool.encrypt_records('abcd', 1234, records)
+        assert pool.decrypt_records('abcd', 1234, encrypted) == records
+        stats = pool.get_stats()
+        assert stats['pool_tasks'] == 4
+        assert stats['local_tasks'] == 0
+        assert stats['queue_depth'] == 0
+        assert stats['max_latency'] > 0
+    finally:
+        pool.shutdown()
+
+
+def test_crypto_pool_reencrypt_records():
+    """Tests that the secrets re-encrypted with a new master password and master key in the workers are decrypted by the new ones.
+    Expects the same secrets as re-encrypting in the calling process."""
+
+    pool = CryptoPool(max_workers=2, min_batch_size=8)
+    records = create_records(9, 4)
+    encrypted = encrypt_records('abcd', 1234, records)
+    try:
+        reencrypted = pool.reencrypt_records(
+            'abcd', 1234, 'efgh', 5678, encrypted)
+        assert decrypt_records('efgh', 5678, reencrypted) == records
+        assert decrypt_records('efgh', 5678, reencrypt_records(
+            'abcd', 1234, 'efgh', 5678, encrypted)) == records
+        assert pool.get_stats()['pool_tasks'] > 0
+    finally:
+        pool.shutdown()
+
+
+def test_crypto_pool_records_with_many_legacy_secrets():
+    """Tests records in the legacy format holding dozens of secrets, decrypted and converted to the GCM format in the workers.
+    Expects the original secrets."""
+
+    pool = CryptoPool(max_workers=2, min_batch_size=8)
+    records = create_records(5, 48)
+    encrypted = []
+    for secrets in records:
+        encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_LEGACY)
+        encrypted.append([encrypter.encrypt(secret) for secret in secrets])
+    try:
+        assert pool.decrypt_records('abcd', 1234, encrypted) == records
+        converted = pool.convert_records('abcd', 1234, encrypted)
+        assert all(not isinstance(secret, str)
+                   for secrets in converted for secret in secrets)
+        assert decrypt_records('abcd', 1234, converted) == records
+        assert pool.get_stats()['pool_tasks'] > 0
+    finally:
+        pool.shutdown()
@@ -1,10 +1,16 @@
+import base64
+from bson.binary import Binary
+from Crypto.Cipher import AES
 from crypto.encrypter import Encrypter
 from crypto.decrypter import Decrypter
+from crypto.secret_format import SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM, GCM_NONCE_SIZE, GCM_TAG_SIZE
+import pytest
 from utils.test import create_random_string, create_random_master_key
 
 MAX_STRING_LENGTH = 16
 MAX_MASTER_KEY_VALUE = 10000
 TEST_ITERATION_COUNT = 100
+RECORD_SECRET_COUNT = 48
 
 
 def test_encryption_decryption():
@@ -21,3 +27,80 @@ def test_encryption_decryption():
         encrypted_string = encrypter.encrypt(test_string)
         decrypted_string = decrypter.decrypt(encrypted_string)
         assert test_string, decrypted_string
+
+
+def test_gcm_format():
+    """Tests the GCM format of the secrets.
+    Expects binary secrets having the version byte, a nonce and a tag, which differ for the same secret and decrypt in any order."""
+
+    encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_GCM)
+    secrets = ['secret1', 'pin1', 'secret1', 'ユーザー']
+    encrypted = [encrypter.encrypt(secret) for secret in secrets]
+    for secret, encrypted_secret in zip(secrets, encrypted):
+        assert isinstance(encrypted_secret, Binary)
+        assert encrypted_secret[0] == SECRET_FORMAT_GCM
+        assert len(encrypted_secret) == 1 + GCM_NONCE_SIZE + \
+            len(secret.encode('utf-8')) + GCM_TAG_SIZE
+    assert encrypted[0] != encrypted[2]
+    decrypter = Decrypter('abcd', 1234)
+    assert [decrypter.decrypt(encrypted_secret)
+            for encrypted_secret in reversed(encrypted)] == list(reversed(secrets))
+
+
+def test_legacy_format():
+    """Tests that the secrets of a record in the legacy CBC format are still decrypted.
+    Expects base64 strings and the original secrets."""
+
+    encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_LEGACY)
+    secrets = ['secret1', 'pin1', 'a' * 40]
+    encrypted = [encrypter.encrypt(secret) for secret in secrets]
+    assert all(isinstance(encrypted_secret, str)
+               for encrypted_secret in encrypted)
+    assert Decrypter('abcd', 1234).decrypt_secrets(encrypted) == secrets
+
+
+def test_legacy_format_decrypts_in_any_order():
+    """Tests a record in the legacy format holding dozens of secrets, decrypted in reverse order with the initialization vectors read from the record.
+    Expects the original secrets, and the same secrets when the same Decrypter decrypts the record again."""
+
+    encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_LEGACY)
+    secrets = [create_random_string(MAX_STRING_LENGTH * 4)
+               for _ in range(RECORD_SECRET_COUNT)]
+    encrypted = [encrypter.encrypt(secret) for secret in secrets]
+    decrypter = Decrypter('abcd', 1234)
+    ivs = [None] + [base64.b64decode(encrypted_secret)[-AES.block_size:]
+                    for encrypted_secret in encrypted[:-1]]
+    assert [decrypter.decrypt(encrypted_secret, iv) for encrypted_secret, iv in reversed(
+        list(zip(encrypted, ivs)))] == list(reversed(secrets))
+    assert decrypter.decrypt_secrets(encrypted) == secrets
+    assert decrypter.decrypt_secrets(encrypted) == secrets
+
+
+def test_decrypt_secrets_of_mixed_records():
+    """Tests a Decrypter reused for records holding dozens of secrets in the GCM format, in the legacy format and in both.
+    Expects the original secrets of every record."""
+
+    secrets = [create_random_string(MAX_STRING_LENGTH)
+               for _ in range(RECORD_SECRET_COUNT)]
+    legacy_encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_LEGACY)
+    gcm_encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_GCM)
+    mixed = [gcm_encrypter.encrypt(secret) if index % 3 == 0 else legacy_encrypter.encrypt(secret)
+             for index, secret in enumerate(secrets)]
+    legacy_encrypter = Encrypter('abcd', 1234, SECRET_FORMAT_LEGACY)
+    legacy = [legacy_encrypter.encrypt(secret) for secret in secrets]
+    gcm = [gcm_encrypter.encrypt(secret) for secret in secrets]
+    decrypter = Decrypter('abcd', 1234)
+    for record in [mixed, gcm, legacy, mixed]:
+        assert decrypter.decrypt_secrets(record) == secrets
+
+
+def test_gcm_format_rejects_tampering():
+    """Tests decryption of a GCM secret that was modified, of an unknown version and with another master password.
+    Expects ValueError."""
+
+    encrypted = bytes(Encrypter('abcd', 1234, SECRET_FORMAT_GCM).encrypt('secret1'))
+    tampered = bytearray(encrypted)
+    tampered[1 + GCM_NONCE_SIZE] ^= 1
+    for encrypted_secret, master_password in [(Binary(bytes(tampered)), 'abcd'), (Binary(b'\x02' + encrypted[1:]), 'abcd'), (Binary(encrypted), 'efgh')]:
+        with pytest.raises(ValueError):
+            Decrypter(master_password, 1234).decrypt(encrypted_secret)
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from constants.database import MONGO_WARM_UP_TIMEOUT_SECONDS
+from database.dbclient import create_client_options, create_collection_options, create_event_listeners, WARM_UP_POLL_INTERVAL_SECONDS
+from database.pool_monitor import PoolMonitor
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+class AsyncDbClient:
+    """Creates an instance of the async MongoDB client (Motor) for the async server.
+
+    The collections returned by this client have the same methods as pymongo collections, but the methods that do I/O return awaitables.
+    The indexes are created by the synchronous DbClient, which the async server also creates at startup.
+    The collection handles are created once with their read and write concerns and are shared by all the requests.
+
+    Attributes:
+        database (AsyncIOMotorDatabase): The database object.
+        collection_names (set): Names of the collections of the database. It is loaded by refresh_collections().
+        collections (dict): The collection handles created so far by name.
+        min_pool_size (int): Number of pooled connections opened by warm_up().
+        pool_monitor (PoolMonitor): The monitor of the connection pools of the client.
+    """
+    database = None
+    collection_names = None
+    collections = None
+    min_pool_size = None
+    pool_monitor = None
+
+    def __init__(self, mongo_uri, database, client_options=None):
+        """
+        Args:
+            mongo_uri (str): Uri of the MongoDB database.
+            database (str): Name of the database.
+            client_options (dict, optional): Connection pool options created by create_client_options(). Defaults to the configured options.
+        """
+        if client_options == None:
+            client_options = create_client_options()
+        self.min_pool_size = client_options['minPoolSize']
+        self.pool_monitor = PoolMonitor('async', client_options['maxPoolSize'])
+        client = AsyncIOMotorClient(
+            mongo_uri, event_listeners=create_event_listeners(self.pool_monitor), **client_options)
+        self.database = client[database]
+        self.collections = {}
+
+    async def refresh_collections(self):
+        """Loads the names of the collections of the database. It must be awaited before get_collection() is called,
+        and again to use the collections created at runtime. The handles of the collections that were dropped are discarded.
+        """
+        self.__set_collection_names(set(await self.database.list_collection_names()))
+
+    async def warm_up(self, timeout=MONGO_WARM_UP_TIMEOUT_SECONDS):
+        """Waits until the client has opened the minimum number of pooled connections, which it does in the background.
+        It must be awaited after refresh_collections(), which opens the first connection.
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to MONGO_WARM_UP_TIMEOUT_SECONDS.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            open_connections = self.pool_monitor.get_open_connections()
+            if open_connections == None or open_connections >= self.min_pool_size:
+                return
+            await asyncio.sleep(WARM_UP_POLL_INTERVAL_SECONDS)
+
+    def get_collection(self, collection):
+        """Returns the handle of a collection. The handle is created on the first call and returned by all the later calls.
+        If the collection is unknown, the collection names are refreshed once in case it was created after the client.
+        The processors get their collections synchronously, so the names are listed with the pymongo database underlying the Motor one.
+        It blocks the calling thread, so the async server creates the processors in its thread pool with run_blocking().
+        Args:
+            collection (str): Name of the collection to get.
+        Returns:
+            AsyncIOMotorCollection: The collection by name.
+        """
+        handle = self.collections.get(collection)
+        if handle != None:
+            return handle
+        if self.collection_names == None or collection not in self.collection_names:
+            self.__set_collection_names(
+                set(self.database.delegate.list_collection_names()))
+        assert collection in self.collection_names
+        handle = self.database.get_collection(
+            collection, **create_collection_options(collection))
+        self.collections[collection] = handle
+        return handle
+
+    def __set_collection_names(self, collection_names):
+        """Replaces the names of the collections and discards the handles of the collections that were dropped.
+        Args:
+            collection_names (set): Names of the collections of the database.
+        """
+        self.collection_names = collection_names
+        self.collections = {name: handle for name, handle in self.collections.items()
+                            if name in collection_names}
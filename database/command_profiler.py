@@ -0,0 +1,205 @@
+import contextvars
+import logging
+import threading
+import bson
+from constants.database import MONGO_COMMAND_BYTES_ENABLED, MONGO_SLOW_COMMAND_THRESHOLD_SECONDS, MONGO_SLOW_COMMAND_LOGGER_NAME
+from pymongo import monitoring
+
+# Route label of the commands that aren't sent while serving a request, like the index creation at startup.
+NO_ROUTE = 'none'
+# Fields of a command that are logged to the slow command log. They show the shape of the query without the values.
+SLOW_COMMAND_LOGGED_FIELDS = ['filter', 'sort', 'projection', 'limit', 'updates', 'deletes', 'pipeline']
+
+_route = contextvars.ContextVar('command_route', default=NO_ROUTE)
+
+
+def set_command_route(route):
+    """Tags the MongoDB commands sent by the current request with its route.
+    Args:
+        route (str): The route of the request. None stops tagging.
+    """
+    _route.set(route if route != None else NO_ROUTE)
+
+
+class CommandProfiler(monitoring.CommandListener):
+    """A pymongo command listener recording the latency, documents returned and bytes transferred of every MongoDB command.
+
+    The commands are aggregated by the route of the request that sent them, the collection and the command name.
+    Commands slower than the threshold are logged to the slow command log along with the shape of their query.
+    The listener is called in the thread that sends the command, so the route is read from the context of the request.
+    Only the redacted shape of a running command is kept, and only while the slow command log is enabled, so no secret stays in memory.
+    Counting the bytes encodes every command and reply again, so it is opt-in.
+
+    Attributes:
+        threshold (float): Commands taking longer than this many seconds are logged.
+        logger (Logger): The slow command log.
+        count_bytes (bool): Whether the bytes sent and received are counted.
+        started_commands (dict): The route, collection, name, size in bytes and shape of the running commands by connection and request id.
+        stats (dict): Count, failures, seconds, max seconds, documents, bytes sent and bytes received by (route, collection, command).
+        lock (Lock): Guards the running commands and the stats, as the commands are sent by many threads.
+    """
+    threshold = None
+    logger = None
+    count_bytes = None
+    started_commands = None
+    stats = None
+    lock = None
+
+    def __init__(self, threshold=MONGO_SLOW_COMMAND_THRESHOLD_SECONDS, logger=logging.getLogger(MONGO_SLOW_COMMAND_LOGGER_NAME), count_bytes=MONGO_COMMAND_BYTES_ENABLED):
+        """
+        Args:
+            threshold (float, optional): Commands taking longer than this many seconds are logged. Defaults to MONGO_SLOW_COMMAND_THRESHOLD_SECONDS.
+            logger (Logger, optional): The slow command log. Defaults to the logger named MONGO_SLOW_COMMAND_LOGGER_NAME.
+            count_bytes (bool, optional): Whether the bytes sent and received are counted. Defaults to MONGO_COMMAND_BYTES_ENABLED.
+        """
+        self.threshold = threshold
+        self.logger = logger
+        self.count_bytes = count_bytes
+        self.started_commands = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        """Remembers the route, collection, size and shape of a command until it completes.
+        Args:
+            event (CommandStartedEvent): The event of the started command.
+        """
+        collection = event.command.get(event.command_name)
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection')
+        if not isinstance(collection, str):
+            collection = ''
+        bytes_sent = len(bson.encode(event.command)) if self.count_bytes else 0
+        shape = self.__get_shape(event.command) if self.logger.isEnabledFor(
+            logging.WARNING) else None
+        started = (_route.get(), collection, event.command_name,
+                   bytes_sent, shape)
+        with self.lock:
+            self.started_commands[(event.connection_id,
+                                   event.request_id)] = started
+
+    def succeeded(self, event):
+        """
+        Args:
+            event (CommandSucceededEvent): The event of the completed command.
+        """
+        documents = 0
+        cursor = event.reply.get('cursor')
+        if isinstance(cursor, dict):
+            documents = len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+        elif isinstance(event.reply.get('n'), int):
+            documents = event.reply.get('n')
+        self.__complete(event, False, documents,
+                        len(bson.encode(event.reply)) if self.count_bytes else 0)
+
+    def failed(self, event):
+        """
+        Args:
+            event (CommandFailedEvent): The event of the failed command.
+        """
+        self.__complete(event, True, 0, 0)
+
+    def get_stats(self):
+        """
+        Returns:
+            list: The stats of every route, collection and command.
+        """
+        with self.lock:
+            return [dict(zip(['route', 'collection', 'command'], key), **stats) for key, stats in sorted(self.stats.items())]
+
+    def render(self):
+        """
+        Returns:
+            list: The stats as counters in the Prometheus text format. The byte counters are only rendered when the bytes are counted.
+        """
+        counters = [
+            ('pwdmngr_mongo_commands_total', 'Number of MongoDB commands.', 'count'),
+            ('pwdmngr_mongo_command_failures_total', 'Number of failed MongoDB commands.', 'failures'),
+            ('pwdmngr_mongo_command_seconds_total', 'Time spent in MongoDB commands.', 'seconds'),
+            ('pwdmngr_mongo_command_documents_total', 'Documents returned or written by MongoDB commands.', 'documents')
+        ]
+        if self.count_bytes:
+            counters += [
+                ('pwdmngr_mongo_command_sent_bytes_total', 'Bytes of the MongoDB commands.', 'bytes_sent'),
+                ('pwdmngr_mongo_command_received_bytes_total', 'Bytes of the replies of MongoDB commands.', 'bytes_received')
+            ]
+        stats = self.get_stats()
+        lines = []
+        for name, description, field in counters:
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} counter'.format(name))
+            for item in stats:
+                lines.append('{}{{route="{}",collection="{}",command="{}"}} {}'.format(
+                    name, item['route'], item['collection'], item['command'], item[field]))
+        return lines
+
+    def __complete(self, event, failed, documents, bytes_received):
+        """Adds a completed command to the stats and logs it if it is slow.
+        Args:
+            event (CommandSucceededEvent|CommandFailedEvent): The event of the completed command.
+            failed (bool): Whether the command failed.
+            documents (int): Number of documents returned or written.
+            bytes_received (int): Size of the reply in bytes.
+        """
+        seconds = event.duration_micros / 1e6
+        with self.lock:
+            started = self.started_commands.pop(
+                (event.connection_id, event.request_id), None)
+            if started == None:
+                return
+            route, collection, command, bytes_sent, shape = started
+            key = (route, collection, command)
+            if key not in self.stats:
+                self.stats[key] = {'count': 0, 'failures': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                   'documents': 0, 'bytes_sent': 0, 'bytes_received': 0}
+            stats = self.stats[key]
+            stats['count'] += 1
+            stats['failures'] += failed
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['documents'] += documents
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+        if seconds > self.threshold and shape != None:
+            details = '{}, {} documents'.format(
+                'failed' if failed else 'succeeded', documents)
+            if self.count_bytes:
+                details += ', {} bytes sent, {} bytes received'.format(
+                    bytes_sent, bytes_received)
+            self.logger.warning('Slow MongoDB command %s on %s from route %s took %.1f ms (%s): %s',
+                                command, collection, route, seconds * 1000, details, shape)
+
+    def __get_shape(self, command):
+        """
+        Args:
+            command (dict): The command document.
+        Returns:
+            dict: The logged fields of the command with every value that could have user data replaced by ?.
+        """
+        shape = {}
+        for field in SLOW_COMMAND_LOGGED_FIELDS:
+            if field in command:
+                value = command[field]
+                if field == 'updates':
+                    value = [update.get('q') for update in value]
+                shape[field] = _redact(value)
+        return shape
+
+
+def _redact(value):
+    """
+    Args:
+        value (object): A value of a command.
+    Returns:
+        object: The value with the strings, binaries and object ids replaced by ?. Numbers, booleans and the structure are kept.
+    """
+    if isinstance(value, dict):
+        return {key: _redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(item) for item in value]
+    if isinstance(value, (bool, int, float)) or value == None:
+        return value
+    return '?'
+
+
+command_profiler = CommandProfiler()
@@ -1,33 +1,230 @@
+import logging
 import pymongo
+import threading
+import time
+from constants.database import MONGO_COLLECTION_READ_CONCERNS, MONGO_COLLECTION_WRITE_CONCERNS, MONGO_COMMAND_PROFILING_ENABLED, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_WARM_UP_TIMEOUT_SECONDS, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD, UNIQUE_INDEX_DUPLICATES_LOG_LIMIT
+from constants.metrics_config import STAGE_DB
+from constants.response_messages import ERROR_UNIQUE_INDEX_DUPLICATES
+from constants.search_config import SEARCH_NGRAM_BACKFILL_BATCH_SIZE
+from database.command_profiler import command_profiler
+from database.pool_monitor import PoolMonitor
+from pymongo.errors import DuplicateKeyError
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from utils.ngram import generate_ngram_fields
+from utils.request_timing import time_stage
+
+
+def find_at_most(collection, query, limit, projection=None):
+    """Fetches at most limit records matching the query in a single round-trip to the database.
+    Fetching 2 records is enough to decide whether the query matches zero, one or many records without counting them.
+    Args:
+        collection (Collection): The collection to query.
+        query (dict): The query for find().
+        limit (int): Maximum number of records to fetch.
+        projection (dict, optional): The fields to fetch. Defaults to all the fields.
+    Returns:
+        list: The fetched records.
+    """
+    with time_stage(STAGE_DB):
+        return list(collection.find(query, projection).limit(limit))
+
+
+# Seconds between the checks of the number of open connections while warming up the pool.
+WARM_UP_POLL_INTERVAL_SECONDS = 0.05
+
+
+def create_client_options(max_pool_size=MONGO_MAX_POOL_SIZE, min_pool_size=MONGO_MIN_POOL_SIZE, max_idle_time_ms=MONGO_MAX_IDLE_TIME_MS,
+                          connect_timeout_ms=MONGO_CONNECT_TIMEOUT_MS, socket_timeout_ms=MONGO_SOCKET_TIMEOUT_MS,
+                          server_selection_timeout_ms=MONGO_SERVER_SELECTION_TIMEOUT_MS, wait_queue_timeout_ms=MONGO_WAIT_QUEUE_TIMEOUT_MS):
+    """Creates the connection pool options of a MongoDB client. The defaults are read from constants/database.py.
+    A timeout of 0 means no timeout.
+    Args:
+        max_pool_size (int, optional): Maximum number of connections in the pool.
+        min_pool_size (int, optional): Number of connections kept open while idle.
+        max_idle_time_ms (int, optional): Milliseconds a connection can stay idle in the pool. 0 keeps idle connections open.
+        connect_timeout_ms (int, optional): Milliseconds to wait for a new connection.
+        socket_timeout_ms (int, optional): Milliseconds to wait for the reply of a command.
+        server_selection_timeout_ms (int, optional): Milliseconds to wait for a server to become available.
+        wait_queue_timeout_ms (int, optional): Milliseconds to wait for a free connection of the pool.
+    Returns:
+        dict: The keyword arguments of the pymongo and Motor clients.
+    """
+    options = {
+        'maxPoolSize': max_pool_size,
+        'minPoolSize': min_pool_size,
+        'connectTimeoutMS': connect_timeout_ms,
+        'serverSelectionTimeoutMS': server_selection_timeout_ms
+    }
+    for option, value in [('maxIdleTimeMS', max_idle_time_ms), ('socketTimeoutMS', socket_timeout_ms), ('waitQueueTimeoutMS', wait_queue_timeout_ms)]:
+        options[option] = value if value > 0 else None
+    return options
+
+
+def create_event_listeners(pool_monitor):
+    """
+    Args:
+        pool_monitor (PoolMonitor): The monitor of the connection pools of the client.
+    Returns:
+        list: The event listeners of a MongoDB client. It has the command profiler if profiling is enabled.
+    """
+    listeners = [pool_monitor]
+    if MONGO_COMMAND_PROFILING_ENABLED:
+        listeners.append(command_profiler)
+    return listeners
+
+
+def create_collection_options(collection, read_concerns=MONGO_COLLECTION_READ_CONCERNS, write_concerns=MONGO_COLLECTION_WRITE_CONCERNS):
+    """Creates the options that are bound to the handle of a collection.
+    Args:
+        collection (str): Name of the collection.
+        read_concerns (dict, optional): Read concern level by collection name. Defaults to MONGO_COLLECTION_READ_CONCERNS.
+        write_concerns (dict, optional): Write concern options by collection name. Defaults to MONGO_COLLECTION_WRITE_CONCERNS.
+    Returns:
+        dict: The keyword arguments of get_collection() of a pymongo or Motor database.
+    """
+    options = {}
+    if collection in read_concerns:
+        options['read_concern'] = ReadConcern(read_concerns[collection])
+    if collection in write_concerns:
+        options['write_concern'] = WriteConcern(**write_concerns[collection])
+    return options
+
 
 class DbClient:
     """Creates an instance of pymongo client and stores it in a private variable.
 
     The instance of this class is injected as a dependency for request validators and processors.
 
+    The connection pool is warmed up when the client is created, so the first requests don't pay for connecting to the database.
+    The collection handles are created once with their read and write concerns and are shared by all the requests.
+
     Attributes:
         database (Database): The database object.
-        collection_list (list): List of collection names as str.
+        collection_names (set): Names of the collections of the database.
+        collections (dict): The collection handles created so far by name.
+        pool_monitor (PoolMonitor): The monitor of the connection pools of the client.
+        lock (Lock): Guards the refresh of the collection names.
     """
     database = None
-    collection_list = None
+    collection_names = None
+    collections = None
+    pool_monitor = None
+    lock = None
 
-    def __init__(self, mongo_uri, database):
+    def __init__(self, mongo_uri, database, client_options=None, warm_up_timeout=MONGO_WARM_UP_TIMEOUT_SECONDS):
         """
         Args:
             mongo_uri (str): Uri of the MongoDB database.
             database (str): Name of the database.
+            client_options (dict, optional): Connection pool options created by create_client_options(). Defaults to the configured options.
+            warm_up_timeout (float, optional): Maximum number of seconds to wait for the minimum number of pooled connections. Defaults to MONGO_WARM_UP_TIMEOUT_SECONDS.
         """
-        client = pymongo.MongoClient(mongo_uri)
+        if client_options == None:
+            client_options = create_client_options()
+        self.pool_monitor = PoolMonitor('sync', client_options['maxPoolSize'])
+        client = pymongo.MongoClient(
+            mongo_uri, event_listeners=create_event_listeners(self.pool_monitor), **client_options)
         self.database = client[database]
-        self.collection_list = [collection for collection in self.database.collection_names()]
-    
+        self.collection_names = set()
+        self.collections = {}
+        self.lock = threading.Lock()
+        self.refresh_collections()
+        self.__warm_up(client_options['minPoolSize'], warm_up_timeout)
+
     def get_collection(self, collection):
-        """
+        """Returns the handle of a collection. The handle is created on the first call and returned by all the later calls.
+        If the collection is unknown, the collection names are refreshed once in case it was created after the client.
         Args:
             collection (str): Name of the collection to get.
         Returns:
             Collection: The collection by name.
         """
-        assert collection in self.collection_list
-        return self.database[collection]
\ No newline at end of file
+        handle = self.collections.get(collection)
+        if handle != None:
+            return handle
+        if collection not in self.collection_names:
+            self.refresh_collections()
+        assert collection in self.collection_names
+        with self.lock:
+            if collection not in self.collections:
+                self.collections[collection] = self.database.get_collection(
+                    collection, **create_collection_options(collection))
+            return self.collections[collection]
+
+    def refresh_collections(self):
+        """Loads the names of the collections of the database again, so that the collections created at runtime can be used.
+        The handles of the collections that were dropped are discarded. The indexes are created when the password manager collection appears.
+        """
+        collection_names = set(self.database.list_collection_names())
+        with self.lock:
+            added = collection_names - self.collection_names
+            self.collection_names = collection_names
+            self.collections = {name: handle for name, handle in self.collections.items()
+                                if name in collection_names}
+        if PASSWORD_MANAGER_COLLECTION_NAME in added:
+            self.__ensure_unique_index()
+            self.__ensure_search_index()
+
+    def __warm_up(self, min_pool_size, timeout):
+        """Waits until the client has opened the minimum number of pooled connections, which it does in the background.
+        Args:
+            min_pool_size (int): The minimum number of pooled connections.
+            timeout (float): Maximum number of seconds to wait.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            open_connections = self.pool_monitor.get_open_connections()
+            if open_connections == None or open_connections >= min_pool_size:
+                return
+            time.sleep(WARM_UP_POLL_INTERVAL_SECONDS)
+
+    def __ensure_unique_index(self):
+        """Creates the unique compound index on domain and username of password manager collection.
+        Inserts and updates that would duplicate the combination fail with DuplicateKeyError.
+        The index can't be created while the collection holds duplicate combinations. The number of records and the _ids of the duplicates are
+        logged, without their domain and username, and the DuplicateKeyError is raised, as the server relies on the index to reject duplicates."""
+        collection = self.database[PASSWORD_MANAGER_COLLECTION_NAME]
+        try:
+            collection.create_index([
+                (PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, pymongo.ASCENDING),
+                (PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, pymongo.ASCENDING)
+            ], unique=True)
+        except DuplicateKeyError:
+            duplicates = collection.aggregate([
+                {'$group': {
+                    '_id': {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: '$' + PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD,
+                            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: '$' + PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD},
+                    'count': {'$sum': 1},
+                    'ids': {'$push': '$_id'}
+                }},
+                {'$match': {'count': {'$gt': 1}}},
+                {'$limit': UNIQUE_INDEX_DUPLICATES_LOG_LIMIT}
+            ], allowDiskUse=True)
+            logging.getLogger(__name__).error(ERROR_UNIQUE_INDEX_DUPLICATES, '; '.join('{} records with _id {}'.format(
+                duplicate['count'], ', '.join(str(record_id) for record_id in duplicate['ids'])) for duplicate in duplicates))
+            raise
+
+    def __ensure_search_index(self):
+        """Creates the indexes on the n-gram fields of password manager collection.
+        The records that were inserted before the search index existed are backfilled with their n-gram fields."""
+        collection = self.database[PASSWORD_MANAGER_COLLECTION_NAME]
+        collection.create_index(PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD)
+        collection.create_index(PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD)
+        cursor = collection.find({
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD: {'$exists': False}
+        }, {
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 1,
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 1
+        })
+        requests = []
+        for record in cursor:
+            requests.append(pymongo.UpdateOne({'_id': record['_id']}, {
+                '$set': generate_ngram_fields(record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD],
+                                              record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD])
+            }))
+            if len(requests) == SEARCH_NGRAM_BACKFILL_BATCH_SIZE:
+                collection.bulk_write(requests, ordered=False)
+                requests = []
+        if len(requests) > 0:
+            collection.bulk_write(requests, ordered=False)
@@ -0,0 +1,152 @@
+import threading
+import time
+import weakref
+from pymongo import monitoring
+
+_monitors = weakref.WeakSet()
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """A pymongo connection pool listener keeping track of the utilisation of the connection pools of a MongoDB client.
+
+    Attributes:
+        client (str): Label of the client whose pools are monitored.
+        max_pool_size (int): Maximum number of connections in a pool of the client.
+        pools (dict): Stats of the pool of every server address.
+        checkout_starts (local): The time the current thread started waiting for a connection.
+        lock (Lock): Guards the stats, as the connections are checked out by many threads.
+    """
+    client = None
+    max_pool_size = None
+    pools = None
+    checkout_starts = None
+    lock = None
+
+    def __init__(self, client, max_pool_size):
+        """
+        Args:
+            client (str): Label of the client whose pools are monitored.
+            max_pool_size (int): Maximum number of connections in a pool of the client.
+        """
+        self.client = client
+        self.max_pool_size = max_pool_size
+        self.pools = {}
+        self.checkout_starts = threading.local()
+        self.lock = threading.Lock()
+        _monitors.add(self)
+
+    def get_open_connections(self):
+        """
+        Returns:
+            int: Number of open connections in all the pools, None if no pool was created.
+        """
+        with self.lock:
+            if len(self.pools) == 0:
+                return None
+            return sum(pool['open'] for pool in self.pools.values())
+
+    def get_stats(self):
+        """
+        Returns:
+            list: The stats of the pool of every server address.
+        """
+        with self.lock:
+            return [dict(pool, client=self.client, address=address, max_size=self.max_pool_size) for address, pool in sorted(self.pools.items())]
+
+    def pool_created(self, event):
+        """Starts the stats of a new pool."""
+        self.__update(event, 'open', 0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        """Drops the stats of a closed pool."""
+        with self.lock:
+            self.pools.pop(self.__get_address(event), None)
+
+    def connection_created(self, event):
+        self.__update(event, 'open', 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.__update(event, 'open', -1)
+
+    def connection_check_out_started(self, event):
+        """Counts the thread as waiting for a connection until the check out succeeds or fails."""
+        self.checkout_starts.value = time.monotonic()
+        self.__update(event, 'waiting', 1)
+
+    def connection_check_out_failed(self, event):
+        self.__update(event, 'waiting', -1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self.__update(event, 'waiting', -1, in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self.__update(event, 'in_use', -1)
+
+    def __update(self, event, field, change, **changes):
+        """Changes the stats of the pool of the address of the event.
+        The time waited for a connection is added when the wait ends in the thread that started it.
+        Args:
+            event (object): The connection pool event.
+            field (str): The stat to change.
+            change (int): The change of the stat.
+            changes (dict): Changes of other stats.
+        """
+        changes[field] = changes.get(field, 0) + change
+        wait = 0.0
+        if 'waiting' in changes and changes['waiting'] < 0 and getattr(self.checkout_starts, 'value', None) != None:
+            wait = time.monotonic() - self.checkout_starts.value
+            self.checkout_starts.value = None
+        with self.lock:
+            address = self.__get_address(event)
+            if address not in self.pools:
+                self.pools[address] = {'open': 0, 'in_use': 0, 'max_in_use': 0, 'waiting': 0,
+                                       'checkouts': 0, 'checkout_failures': 0, 'checkout_wait_seconds': 0.0}
+            pool = self.pools[address]
+            for name, value in changes.items():
+                pool[name] += value
+            pool['max_in_use'] = max(pool['max_in_use'], pool['in_use'])
+            pool['checkout_wait_seconds'] += wait
+
+    def __get_address(self, event):
+        """
+        Args:
+            event (object): The connection pool event.
+        Returns:
+            str: The server address of the pool as host:port.
+        """
+        return '{}:{}'.format(*event.address)
+
+
+def render_pool_metrics():
+    """
+    Returns:
+        list: The stats of the pools of all the MongoDB clients in the Prometheus text format.
+    """
+    metrics = [
+        ('pwdmngr_mongo_pool_max_size', 'gauge', 'Maximum number of connections in the pool.', 'max_size'),
+        ('pwdmngr_mongo_pool_open_connections', 'gauge', 'Number of open connections in the pool.', 'open'),
+        ('pwdmngr_mongo_pool_in_use_connections', 'gauge', 'Number of connections checked out of the pool.', 'in_use'),
+        ('pwdmngr_mongo_pool_max_in_use_connections', 'gauge', 'Maximum number of connections checked out of the pool at once.', 'max_in_use'),
+        ('pwdmngr_mongo_pool_waiting_requests', 'gauge', 'Number of threads waiting for a connection.', 'waiting'),
+        ('pwdmngr_mongo_pool_checkouts_total', 'counter', 'Number of connections checked out of the pool.', 'checkouts'),
+        ('pwdmngr_mongo_pool_checkout_failures_total', 'counter', 'Number of failed check outs, like wait queue timeouts.', 'checkout_failures'),
+        ('pwdmngr_mongo_pool_checkout_wait_seconds_total', 'counter', 'Time spent waiting for a connection.', 'checkout_wait_seconds')
+    ]
+    stats = [item for monitor in list(_monitors) for item in monitor.get_stats()]
+    lines = []
+    for name, metric_type, description, field in metrics:
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+        for item in stats:
+            lines.append('{}{{client="{}",address="{}"}} {}'.format(
+                name, item['client'], item['address'], item[field]))
+    return lines
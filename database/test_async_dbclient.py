@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_NAME
+from database.async_dbclient import AsyncDbClient
+from mock import AsyncMock, MagicMock, Mock, patch
+
+
+def create_async_dbclient(collection_names):
+    """
+    Args:
+        collection_names (list): Names of the collections of the database.
+    Returns:
+        (AsyncDbClient, MagicMock): The client of a mock Motor database whose collections are loaded, and the mock database.
+    """
+    database = MagicMock()
+    database.list_collection_names = AsyncMock(return_value=collection_names)
+    database.delegate.list_collection_names = Mock(
+        return_value=collection_names)
+    database.get_collection = Mock(side_effect=lambda name, **options: Mock())
+    client = Mock()
+    client.__getitem__ = Mock(return_value=database)
+    with patch('database.async_dbclient.AsyncIOMotorClient', Mock(return_value=client)):
+        dbclient = AsyncDbClient('mongodb://localhost:27017', 'test')
+    asyncio.run(dbclient.refresh_collections())
+    return dbclient, database
+
+
+def test_get_collection_refreshes_unknown_collection():
+    """Tests get_collection() for a collection created after the async client loaded the collection names.
+    Expects the collection names to be reloaded once and the handle to be memoized."""
+
+    dbclient, database = create_async_dbclient(
+        [MASTER_PASSWORD_COLLECTION_NAME])
+    database.delegate.list_collection_names.return_value = [
+        MASTER_PASSWORD_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_NAME]
+    collection = dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME)
+    assert dbclient.get_collection(
+        PASSWORD_MANAGER_COLLECTION_NAME) is collection
+    assert database.delegate.list_collection_names.call_count == 1
+
+
+def test_get_collection_of_missing_collection():
+    """Tests get_collection() for a collection that doesn't exist.
+    Expects an AssertionError after the collection names are reloaded."""
+
+    dbclient, database = create_async_dbclient(
+        [MASTER_PASSWORD_COLLECTION_NAME])
+    with pytest.raises(AssertionError):
+        dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME)
+    assert database.delegate.list_collection_names.call_count == 1
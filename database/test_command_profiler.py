@@ -0,0 +1,99 @@
+from database.command_profiler import CommandProfiler, set_command_route, NO_ROUTE
+from mock import Mock
+
+
+def create_started_event(command_name, command, request_id=1):
+    """Creates a mock CommandStartedEvent.
+    Args:
+        command_name (str): Name of the command.
+        command (dict): The command document.
+        request_id (int, optional): Request id of the command. Defaults to 1.
+    Returns:
+        Mock: Mock CommandStartedEvent object.
+    """
+    return Mock(command_name=command_name, command=command, connection_id=('localhost', 27017), request_id=request_id)
+
+
+def create_completed_event(reply=None, duration_micros=1000, request_id=1):
+    """Creates a mock CommandSucceededEvent or CommandFailedEvent.
+    Args:
+        reply (dict, optional): The reply of a succeeded command. Defaults to None.
+        duration_micros (int, optional): Duration of the command in microseconds. Defaults to 1000.
+        request_id (int, optional): Request id of the command. Defaults to 1.
+    Returns:
+        Mock: Mock completed event object.
+    """
+    return Mock(reply=reply, duration_micros=duration_micros, connection_id=('localhost', 27017), request_id=request_id)
+
+
+def test_command_profiler_records_stats_by_route_and_collection():
+    """Tests the CommandProfiler class with a find and a getMore of a request and an insert outside of a request.
+    Expects the stats to be aggregated by route, collection and command."""
+
+    profiler = CommandProfiler(threshold=10, count_bytes=True)
+    set_command_route('query')
+    profiler.started(create_started_event(
+        'find', {'find': 'pwdmngr', 'filter': {'domain': 'abc.com'}}, request_id=1))
+    profiler.succeeded(create_completed_event(
+        {'cursor': {'firstBatch': [{'a': 1}, {'a': 2}], 'id': 5}, 'ok': 1}, request_id=1))
+    profiler.started(create_started_event(
+        'getMore', {'getMore': 5, 'collection': 'pwdmngr'}, request_id=2))
+    profiler.succeeded(create_completed_event(
+        {'cursor': {'nextBatch': [{'a': 3}], 'id': 0}, 'ok': 1}, request_id=2))
+    set_command_route(None)
+    profiler.started(create_started_event(
+        'insert', {'insert': 'auth', 'documents': [{'key': 'abc'}]}, request_id=3))
+    profiler.failed(create_completed_event(request_id=3))
+
+    stats = {(item['route'], item['collection'], item['command']): item for item in profiler.get_stats()}
+    assert stats[('query', 'pwdmngr', 'find')]['documents'] == 2
+    assert stats[('query', 'pwdmngr', 'find')]['seconds'] == 0.001
+    assert stats[('query', 'pwdmngr', 'find')]['bytes_sent'] > 0
+    assert stats[('query', 'pwdmngr', 'getMore')]['documents'] == 1
+    assert stats[(NO_ROUTE, 'auth', 'insert')]['failures'] == 1
+    assert 'pwdmngr_mongo_commands_total{route="query",collection="pwdmngr",command="find"} 1' in profiler.render()
+
+
+def test_command_profiler_logs_slow_commands():
+    """Tests the CommandProfiler class with a command slower than the threshold.
+    Expects the command to be logged with the shape of its query but without the values."""
+
+    logger = Mock()
+    profiler = CommandProfiler(threshold=0.5, logger=logger)
+    profiler.started(create_started_event('find', {'find': 'pwdmngr', 'filter': {
+        'domain': {'$regex': 'secret-domain'}}, 'sort': {'domain': 1}, 'limit': 3}))
+    profiler.succeeded(create_completed_event(
+        {'cursor': {'firstBatch': [], 'id': 0}, 'ok': 1}, duration_micros=600000))
+    profiler.started(create_started_event(
+        'find', {'find': 'pwdmngr', 'filter': {}}, request_id=2))
+    profiler.succeeded(create_completed_event(
+        {'cursor': {'firstBatch': [], 'id': 0}, 'ok': 1}, duration_micros=400000, request_id=2))
+
+    assert logger.warning.call_count == 1
+    args = logger.warning.call_args[0]
+    assert args[-1] == {'filter': {'domain': {'$regex': '?'}},
+                        'sort': {'domain': 1}, 'limit': 3}
+    assert 'secret-domain' not in str(args)
+
+
+def test_command_profiler_keeps_no_command():
+    """Tests the CommandProfiler class while a command runs, without counting bytes and with the slow command log disabled.
+    Expects no secret to be kept, no bytes to be counted or rendered and nothing to be logged."""
+
+    logger = Mock()
+    profiler = CommandProfiler(threshold=0.5, logger=logger)
+    profiler.started(create_started_event('update', {'update': 'pwdmngr', 'updates': [
+        {'q': {'domain': 'abc.com'}, 'u': {'$set': {'secrets': ['secret-value']}}}]}))
+    assert 'secret-value' not in str(profiler.started_commands)
+    assert 'abc.com' not in str(profiler.started_commands)
+    profiler.succeeded(create_completed_event({'n': 1, 'ok': 1}))
+    assert profiler.get_stats()[0]['bytes_sent'] == 0
+    assert not any('bytes' in line for line in profiler.render())
+
+    logger.isEnabledFor = Mock(return_value=False)
+    profiler.started(create_started_event(
+        'find', {'find': 'pwdmngr', 'filter': {}}, request_id=2))
+    assert profiler.started_commands[(('localhost', 27017), 2)][-1] == None
+    profiler.succeeded(create_completed_event(
+        {'cursor': {'firstBatch': [], 'id': 0}, 'ok': 1}, duration_micros=600000, request_id=2))
+    logger.warning.assert_not_called()
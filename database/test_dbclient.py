@@ -0,0 +1,113 @@
+import logging
+import pytest
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD
+from database.dbclient import DbClient, create_collection_options
+from mock import MagicMock, Mock, patch
+from pymongo.errors import DuplicateKeyError
+
+
+def create_mock_database(collection_names):
+    """
+    Args:
+        collection_names (list): Names of the collections of the database.
+    Returns:
+        MagicMock: Mock database whose get_collection() returns a new mock collection on every call.
+    """
+    database = MagicMock()
+    database.list_collection_names = Mock(return_value=collection_names)
+    database.get_collection = Mock(side_effect=lambda name, **options: Mock())
+    return database
+
+
+def create_dbclient(database):
+    """
+    Args:
+        database (MagicMock): The mock database.
+    Returns:
+        DbClient: The client of the mock database.
+    """
+    client = Mock()
+    client.__getitem__ = Mock(return_value=database)
+    with patch('database.dbclient.pymongo.MongoClient', Mock(return_value=client)):
+        return DbClient('mongodb://localhost:27017', 'test', warm_up_timeout=0)
+
+
+def test_get_collection_memoizes_handle():
+    """Tests get_collection() called twice for the same collection.
+    Expects the same handle and the collection to be created once."""
+
+    database = create_mock_database([MASTER_PASSWORD_COLLECTION_NAME])
+    dbclient = create_dbclient(database)
+    collection = dbclient.get_collection(MASTER_PASSWORD_COLLECTION_NAME)
+    assert dbclient.get_collection(
+        MASTER_PASSWORD_COLLECTION_NAME) is collection
+    assert database.get_collection.call_count == 1
+
+
+def test_get_collection_refreshes_unknown_collection():
+    """Tests get_collection() for a collection created after the client.
+    Expects the collection names to be reloaded and the indexes to be created for the password manager collection."""
+
+    database = create_mock_database([MASTER_PASSWORD_COLLECTION_NAME])
+    dbclient = create_dbclient(database)
+    database.list_collection_names.return_value = [
+        MASTER_PASSWORD_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_NAME]
+    assert dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME) != None
+    assert database.list_collection_names.call_count == 2
+    database[PASSWORD_MANAGER_COLLECTION_NAME].create_index.assert_called()
+
+
+def test_unique_index_with_duplicates(caplog):
+    """Tests the creation of the unique index when the password manager collection holds duplicate domain and username combinations.
+    Expects the _ids of the duplicates to be logged without their domain and username, and the client creation to fail."""
+
+    database = create_mock_database(
+        [MASTER_PASSWORD_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_NAME])
+    collection = database[PASSWORD_MANAGER_COLLECTION_NAME]
+    collection.create_index = Mock(side_effect=DuplicateKeyError('E11000 duplicate key error'))
+    collection.aggregate = Mock(return_value=[{'_id': {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+                                                       PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}, 'count': 2, 'ids': ['id1', 'id2']}])
+    with caplog.at_level(logging.ERROR):
+        with pytest.raises(DuplicateKeyError):
+            create_dbclient(database)
+    assert '2 records with _id id1, id2' in caplog.text
+    assert 'abc.com' not in caplog.text
+    assert 'user1' not in caplog.text
+
+
+def test_get_collection_of_missing_collection():
+    """Tests get_collection() for a collection that doesn't exist.
+    Expects an AssertionError after the collection names are reloaded."""
+
+    database = create_mock_database([MASTER_PASSWORD_COLLECTION_NAME])
+    dbclient = create_dbclient(database)
+    try:
+        dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME)
+        assert False
+    except AssertionError:
+        pass
+    assert database.list_collection_names.call_count == 2
+
+
+def test_refresh_collections_discards_dropped_collections():
+    """Tests refresh_collections() after a collection with a handle is dropped.
+    Expects the handle to be discarded."""
+
+    database = create_mock_database([MASTER_PASSWORD_COLLECTION_NAME])
+    dbclient = create_dbclient(database)
+    dbclient.get_collection(MASTER_PASSWORD_COLLECTION_NAME)
+    database.list_collection_names.return_value = []
+    dbclient.refresh_collections()
+    assert dbclient.collections == {}
+
+
+def test_create_collection_options():
+    """Tests create_collection_options() for a configured and a not configured collection.
+    Expects the read and write concerns of the configured collection only."""
+
+    options = create_collection_options(MASTER_PASSWORD_COLLECTION_NAME, {MASTER_PASSWORD_COLLECTION_NAME: 'majority'}, {
+                                        MASTER_PASSWORD_COLLECTION_NAME: {'w': 'majority', 'j': True}})
+    assert options['read_concern'].level == 'majority'
+    assert options['write_concern'].document == {'w': 'majority', 'j': True}
+    assert create_collection_options(
+        PASSWORD_MANAGER_COLLECTION_NAME, {}, {}) == {}
@@ -0,0 +1,87 @@
+from database.dbclient import DbClient, create_client_options
+from database.pool_monitor import PoolMonitor, render_pool_metrics
+from mock import Mock, patch
+
+ADDRESS = ('localhost', 27017)
+
+
+def create_event():
+    """
+    Returns:
+        Mock: Mock connection pool event of the test server address.
+    """
+    return Mock(address=ADDRESS)
+
+
+def create_mock_mongo_client(open_connections):
+    """Creates a function replacing pymongo.MongoClient, which opens the given number of connections in the pool of the client.
+    Args:
+        open_connections (int): Number of connections to open.
+    Returns:
+        function: The function creating a mock client.
+    """
+    def mongo_client(mongo_uri, event_listeners, **options):
+        monitor = event_listeners[0]
+        monitor.pool_created(create_event())
+        for _ in range(open_connections):
+            monitor.connection_created(create_event())
+        client = Mock()
+        client.__getitem__ = Mock(return_value=Mock(
+            list_collection_names=Mock(return_value=[])))
+        return client
+    return mongo_client
+
+
+def test_pool_monitor_tracks_connections_and_check_outs():
+    """Tests the PoolMonitor class with connections opened, checked out, checked in and a failed check out.
+    Expects the number of open, in use and waiting connections and the check out counters of the pool."""
+
+    monitor = PoolMonitor('test', 2)
+    assert monitor.get_open_connections() == None
+    monitor.pool_created(create_event())
+    for _ in range(2):
+        monitor.connection_created(create_event())
+        monitor.connection_check_out_started(create_event())
+        monitor.connection_checked_out(create_event())
+    monitor.connection_check_out_started(create_event())
+    assert monitor.get_stats()[0]['waiting'] == 1
+    monitor.connection_check_out_failed(create_event())
+    monitor.connection_checked_in(create_event())
+
+    stats = monitor.get_stats()[0]
+    assert monitor.get_open_connections() == 2
+    assert stats['address'] == 'localhost:27017'
+    assert stats['in_use'] == 1
+    assert stats['max_in_use'] == 2
+    assert stats['waiting'] == 0
+    assert stats['checkouts'] == 2
+    assert stats['checkout_failures'] == 1
+    assert 'pwdmngr_mongo_pool_in_use_connections{client="test",address="localhost:27017"} 1' in render_pool_metrics()
+
+
+def test_create_client_options():
+    """Tests create_client_options() with timeouts of 0.
+    Expects the options of the pymongo client with no timeout for them."""
+
+    options = create_client_options(
+        max_pool_size=50, min_pool_size=5, socket_timeout_ms=0, wait_queue_timeout_ms=0)
+    assert options['maxPoolSize'] == 50
+    assert options['minPoolSize'] == 5
+    assert options['socketTimeoutMS'] == None
+    assert options['waitQueueTimeoutMS'] == None
+
+
+def test_dbclient_warm_up():
+    """Tests that DbClient is created once the minimum number of pooled connections is open,
+    and that it doesn't wait more than the warm up timeout otherwise."""
+
+    options = create_client_options(min_pool_size=3)
+    with patch('database.dbclient.pymongo.MongoClient', create_mock_mongo_client(3)):
+        dbclient = DbClient('', 'test', client_options=options,
+                            warm_up_timeout=60)
+    assert dbclient.pool_monitor.get_open_connections() == 3
+
+    with patch('database.dbclient.pymongo.MongoClient', create_mock_mongo_client(1)):
+        dbclient = DbClient('', 'test', client_options=options,
+                            warm_up_timeout=0.1)
+    assert dbclient.pool_monitor.get_open_connections() == 1
@@ -0,0 +1,110 @@
+from auth.auth import Authenticator
+from constants.metrics_config import STAGE_AUTH, STAGE_FIELD_VALIDATION, METRICS_NOT_FOUND_ENDPOINT
+from constants.request_parameters import HEADERS_AUTH_KEY_PARAM, HEADERS_SERVER_TIMING_PARAM
+from constants.response_messages import UNAUTHORIZED_RESPONSE_CODE, INVALID_REQUEST_RESPONSE_CODE
+from constants.url_paths import METRICS_PATH
+from database.command_profiler import set_command_route
+from functools import wraps
+from middleware.request_context import RequestContext, REQUEST_CONTEXT_ATTRIBUTE
+from quart import abort
+from quart import g
+from quart import request
+from utils.async_executor import run_blocking
+from utils.request_timing import time_stage, start_request, get_request_timings, finish_request, format_server_timing
+
+FORM_REQUEST_ATTRIBUTE = 'form_request'
+
+
+class FormRequest:
+    """Holds the awaited form and files of an async request.
+
+    The validators and processors read the form and files of this object the same way as of a flask request.
+
+    Attributes:
+        form (MultiDict): The parsed form of the request.
+        files (MultiDict): The uploaded files of the request.
+    """
+    form = None
+    files = None
+
+    def __init__(self, form, files):
+        """
+        Args:
+            form (MultiDict): The parsed form of the request.
+            files (MultiDict): The uploaded files of the request.
+        """
+        self.form = form
+        self.files = files
+
+
+def async_auth_required(dbclient):
+    """Authenticates the requests of the async server. The auth key cache is read in the thread pool as it may query the database.
+    The form of an authenticated request is parsed once and stored in quart g along with the request context.
+    Args:
+        dbclient (DbClient): The database client object.
+    """
+    authenticator = Authenticator(dbclient)
+
+    def async_auth_required_wrapper(f):
+        @wraps(f)
+        async def wrap(*args, **kwargs):
+            key = request.headers.get(HEADERS_AUTH_KEY_PARAM)
+            if key == None:
+                abort(UNAUTHORIZED_RESPONSE_CODE)
+            with time_stage(STAGE_AUTH):
+                authenticated = await run_blocking(authenticator.authenticate, key)
+            if not authenticated:
+                abort(UNAUTHORIZED_RESPONSE_CODE)
+            form_request = FormRequest(await request.form, await request.files)
+            setattr(g, FORM_REQUEST_ATTRIBUTE, form_request)
+            setattr(g, REQUEST_CONTEXT_ATTRIBUTE, RequestContext(form_request))
+            return await f(*args, **kwargs)
+        return wrap
+    return async_auth_required_wrapper
+
+
+def validate_async_request(validator, dbclient, usage):
+    """Validates the requests of the async server. The validator runs in the thread pool as it may query the database.
+    Args:
+        validator (class): The request validator class. It is created with the form request, the database client and the request context as keyword argument.
+        dbclient (DbClient): The database client object.
+        usage (str): The usage of the command that is sent along with the error message.
+    """
+    def validate_async(f):
+        @wraps(f)
+        async def wrap(*args, **kwargs):
+            form_request = g.get(FORM_REQUEST_ATTRIBUTE)
+            context = g.get(REQUEST_CONTEXT_ATTRIBUTE)
+            with time_stage(STAGE_FIELD_VALIDATION):
+                valid, message = await run_blocking(lambda: validator(form_request, dbclient, context=context).isValid())
+            if not valid:
+                return '{}\n{}'.format(message, usage), INVALID_REQUEST_RESPONSE_CODE
+            else:
+                return await f(*args, **kwargs)
+        return wrap
+    return validate_async
+
+
+def register_async_request_timing(app):
+    """Same as register_request_timing() for the quart app. The hooks are coroutines, so that they run in the context of the request.
+    Args:
+        app (Quart): The quart app.
+    """
+    @app.before_request
+    async def start_timing():
+        set_command_route(request.endpoint)
+        if request.path != METRICS_PATH:
+            start_request()
+
+    @app.after_request
+    async def add_server_timing(response):
+        timings = get_request_timings()
+        if timings != None:
+            response.headers[HEADERS_SERVER_TIMING_PARAM] = format_server_timing(
+                timings)
+        return response
+
+    @app.teardown_request
+    async def finish_timing(error=None):
+        finish_request(request.endpoint or METRICS_NOT_FOUND_ENDPOINT)
+        set_command_route(None)
@@ -1,21 +1,29 @@
 from auth.auth import Authenticator
+from constants.metrics_config import STAGE_AUTH
 from constants.request_parameters import HEADERS_AUTH_KEY_PARAM
 from constants.response_messages import UNAUTHORIZED_RESPONSE_CODE
 from flask import abort
 from flask import request
 from functools import wraps
+from middleware.request_context import create_request_context
+from utils.request_timing import time_stage
 
 
 def auth_required(dbclient):
+    authenticator = Authenticator(dbclient)
+
     def auth_required_wrapper(f):
         @wraps(f)
         def wrap(*args, **kwargs):
             if request.headers.get(HEADERS_AUTH_KEY_PARAM) == None:
                 abort(UNAUTHORIZED_RESPONSE_CODE)
             key = request.headers[HEADERS_AUTH_KEY_PARAM]
-            if not Authenticator(dbclient).authenticate(key):
+            with time_stage(STAGE_AUTH):
+                authenticated = authenticator.authenticate(key)
+            if not authenticated:
                 abort(UNAUTHORIZED_RESPONSE_CODE)
             else:
+                create_request_context(request)
                 return f(*args, **kwargs)
         return wrap
     return auth_required_wrapper
@@ -0,0 +1,22 @@
+from constants.metrics_config import STAGE_FIELD_VALIDATION
+from constants.response_messages import VALID_BULK_INSERT_COMMAND, INVALID_REQUEST_RESPONSE_CODE
+from flask import abort
+from flask import request
+from functools import wraps
+from utils.request_timing import time_stage
+from validator.bulk_insert_request_validator import BulkInsertRequestValidator
+
+
+def validate_bulk_insert_request(dbclient):
+    def validate_bulk_insert(f):
+        @wraps(f)
+        def wrap(*args, **kwargs):
+            with time_stage(STAGE_FIELD_VALIDATION):
+                valid, message = BulkInsertRequestValidator(
+                    request, dbclient).isValid()
+            if not valid:
+                return '{}\n{}'.format(message, VALID_BULK_INSERT_COMMAND), INVALID_REQUEST_RESPONSE_CODE
+            else:
+                return f(*args, **kwargs)
+        return wrap
+    return validate_bulk_insert
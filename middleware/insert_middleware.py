@@ -1,7 +1,9 @@
+from constants.metrics_config import STAGE_FIELD_VALIDATION
 from constants.response_messages import VALID_INSERT_COMMAND, INVALID_REQUEST_RESPONSE_CODE
 from flask import abort
 from flask import request
 from functools import wraps
+from utils.request_timing import time_stage
 from validator.insert_request_validator import InsertRequestValidator
 
 
@@ -9,8 +11,9 @@ def validate_insert_request(dbclient):
     def validate_insert(f):
         @wraps(f)
         def wrap(*args, **kwargs):
-            valid, message = InsertRequestValidator(
-                request, dbclient).isValid()
+            with time_stage(STAGE_FIELD_VALIDATION):
+                valid, message = InsertRequestValidator(
+                    request, dbclient).isValid()
             if not valid:
                 return '{}\n{}'.format(message, VALID_INSERT_COMMAND), INVALID_REQUEST_RESPONSE_CODE
             else:
@@ -1,7 +1,9 @@
-from constants.response_messages import VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND, INVALID_REQUEST_RESPONSE_CODE
+from constants.metrics_config import STAGE_FIELD_VALIDATION
+from constants.response_messages import VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND, VALID_GET_MULTIPLE_SECRETS_QUERY_TYPE_COMMAND, INVALID_REQUEST_RESPONSE_CODE
 from flask import abort
 from flask import request
 from functools import wraps
+from utils.request_timing import time_stage
 from validator.query_request_validator import QueryRequestValidator
 
 
@@ -9,10 +11,11 @@ def validate_query_request(dbclient):
     def validate_query(f):
         @wraps(f)
         def wrap(*args, **kwargs):
-            valid, message = QueryRequestValidator(request, dbclient).isValid()
+            with time_stage(STAGE_FIELD_VALIDATION):
+                valid, message = QueryRequestValidator(request, dbclient).isValid()
             if not valid:
-                return '{}\n{}\nOR\n{}'.format(
-                    message, VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND), INVALID_REQUEST_RESPONSE_CODE
+                return '{}\n{}\nOR\n{}\nOR\n{}'.format(
+                    message, VALID_SEARCH_QUERY_TYPE_COMMAND, VALID_GET_SECRETS_QUERY_TYPE_COMMAND, VALID_GET_MULTIPLE_SECRETS_QUERY_TYPE_COMMAND), INVALID_REQUEST_RESPONSE_CODE
             else:
                 return f(*args, **kwargs)
         return wrap
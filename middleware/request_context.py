@@ -0,0 +1,43 @@
+from flask import g
+
+REQUEST_CONTEXT_ATTRIBUTE = 'request_context'
+
+
+class RequestContext:
+    """Holds the data loaded while authenticating and validating a request, so that the processor doesn't load it again.
+
+    The context is created once per request by the auth middleware and is stored in flask g.
+
+    Attributes:
+        form (MultiDict): The parsed form of the request.
+        record_id (ObjectId): The _id of the password manager record matched by the validator.
+    """
+    form = None
+    record_id = None
+
+    def __init__(self, request):
+        """
+        Args:
+            request (Request): The flask request object received from the client.
+        """
+        self.form = request.form
+
+
+def create_request_context(request):
+    """Creates the context of the current request and stores it in flask g.
+    Args:
+        request (Request): The flask request object received from the client.
+    Returns:
+        RequestContext: The context of the request.
+    """
+    context = RequestContext(request)
+    setattr(g, REQUEST_CONTEXT_ATTRIBUTE, context)
+    return context
+
+
+def get_request_context():
+    """
+    Returns:
+        RequestContext: The context of the current request, None if it wasn't created.
+    """
+    return g.get(REQUEST_CONTEXT_ATTRIBUTE)
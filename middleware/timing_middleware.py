@@ -0,0 +1,34 @@
+from constants.metrics_config import METRICS_NOT_FOUND_ENDPOINT
+from constants.request_parameters import HEADERS_SERVER_TIMING_PARAM
+from constants.url_paths import METRICS_PATH
+from database.command_profiler import set_command_route
+from flask import request
+from utils.request_timing import start_request, get_request_timings, finish_request, format_server_timing
+
+
+def register_request_timing(app):
+    """Records the time spent in the stages of every request of the flask app, except the requests for metrics.
+    The MongoDB commands sent by a request are tagged with its endpoint for the command profiler.
+    The stages recorded until the response is created are sent in the Server-Timing header.
+    The histograms are updated when the request is torn down, which is after a streamed response is sent.
+    Args:
+        app (Flask): The flask app.
+    """
+    @app.before_request
+    def start_timing():
+        set_command_route(request.endpoint)
+        if request.path != METRICS_PATH:
+            start_request()
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = get_request_timings()
+        if timings != None:
+            response.headers[HEADERS_SERVER_TIMING_PARAM] = format_server_timing(
+                timings)
+        return response
+
+    @app.teardown_request
+    def finish_timing(error=None):
+        finish_request(request.endpoint or METRICS_NOT_FOUND_ENDPOINT)
+        set_command_route(None)
@@ -1,7 +1,10 @@
+from constants.metrics_config import STAGE_FIELD_VALIDATION
 from constants.response_messages import VALID_UPDATE_COMMAND, INVALID_REQUEST_RESPONSE_CODE
 from flask import abort
 from flask import request
 from functools import wraps
+from utils.request_timing import time_stage
+from middleware.request_context import get_request_context
 from validator.update_request_validator import UpdateRequestValidator
 
 
@@ -9,8 +12,9 @@ def validate_update_request(dbclient):
     def validate_update(f):
         @wraps(f)
         def wrap(*args, **kwargs):
-            valid, message = UpdateRequestValidator(
-                request, dbclient).isValid()
+            with time_stage(STAGE_FIELD_VALIDATION):
+                valid, message = UpdateRequestValidator(
+                    request, dbclient, get_request_context()).isValid()
             if not valid:
                 return '{}\n{}'.format(message, VALID_UPDATE_COMMAND), INVALID_REQUEST_RESPONSE_CODE
             else:
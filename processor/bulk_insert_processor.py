@@ -0,0 +1,162 @@
+from constants.bulk_config import BULK_INSERT_BATCH_SIZE
+from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.metrics_config import STAGE_DB
+from constants.request_parameters import BODY_RECORDS_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, RECORD_DOMAIN_FIELD, RECORD_USERNAME_FIELD, RECORD_SECRETS_FIELD
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_USERNAME, ERROR_INVALID_RECORD, ERROR_MALFORMED_RECORDS, ERROR_RECORD_WRITE_FAILED, RECORD_STATUS_INSERTED, RECORD_STATUS_DUPLICATE, RECORD_STATUS_INVALID, RECORD_STATUS_FAILED
+from crypto.crypto_pool import crypto_pool
+from pymongo.errors import BulkWriteError
+from utils.json_stream import iterate_json_objects
+from utils.ngram import generate_ngram_fields
+from utils.request_timing import time_stage
+
+# Error code of MongoDB for a write that violates a unique index.
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+class BulkInsertProcessor:
+    """A wrapper class for processing bulk insert requests
+
+    The records file is streamed, so only a single batch of records is held in memory at a time.
+    The secrets of a batch are encrypted by the crypto pool in a single call, which splits the work among its worker processes.
+
+    Attributes:
+        collection (Collection): The password manager collection object.
+        records (file): The binary stream of the records file.
+        master_password (str): Master password for key generation.
+        master_key (int): Master key for key generation.
+        batch_size (int): Number of records written in a single insert_many().
+    """
+    collection = None
+    records = None
+    master_password = None
+    master_key = None
+    batch_size = None
+
+    def __init__(self, request, dbclient, batch_size=BULK_INSERT_BATCH_SIZE):
+        """
+        Args:
+            request (Request): The flask request object received from the client.
+            dbclient (DbClient): The database client object.
+            batch_size (int, optional): Number of records written in a single insert_many(). Defaults to BULK_INSERT_BATCH_SIZE.
+        """
+        self.collection = dbclient.get_collection(
+            PASSWORD_MANAGER_COLLECTION_NAME)
+        self.records = request.files.get(BODY_RECORDS_PARAM).stream
+        self.master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
+        self.master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
+        self.batch_size = batch_size
+
+    def process(self):
+        """Inserts the records to the password manager collection in batches using unordered insert_many().
+        Invalid records are skipped. Records whose domain and username combination already exists are reported as duplicates.
+        If a JSON array is malformed, the records before the malformed part are still inserted and an error message is added.
+        Returns:
+            dict: The number of records per status, a report having the status of every record and an error message if any.
+        """
+        report = []
+        batch = []
+        message = None
+        try:
+            for index, record in enumerate(iterate_json_objects(self.records)):
+                if not self.__isValidRecord(record):
+                    report.append(self.__report(
+                        index, record, RECORD_STATUS_INVALID, ERROR_INVALID_RECORD))
+                    continue
+                batch.append((index, record))
+                if len(batch) == self.batch_size:
+                    report.extend(self.__insert_batch(batch))
+                    batch = []
+        except ValueError:
+            message = ERROR_MALFORMED_RECORDS
+        if len(batch) > 0:
+            report.extend(self.__insert_batch(batch))
+        report.sort(key=lambda item: item['index'])
+
+        summary = {status: 0 for status in [
+            RECORD_STATUS_INSERTED, RECORD_STATUS_DUPLICATE, RECORD_STATUS_INVALID, RECORD_STATUS_FAILED]}
+        for item in report:
+            summary[item['status']] += 1
+        summary['records'] = report
+        if message != None:
+            summary['message'] = message
+        return summary
+
+    def __isValidRecord(self, record):
+        """Checks that the record has non-empty domain and username and a non-empty list of non-empty secrets.
+        Args:
+            record (object): The decoded record. It is a ValueError if the record was malformed.
+        Returns:
+            bool: True if the record is valid, False otherwise.
+        """
+        if not isinstance(record, dict):
+            return False
+        for field in [RECORD_DOMAIN_FIELD, RECORD_USERNAME_FIELD]:
+            if not isinstance(record.get(field), str) or len(record.get(field)) == 0:
+                return False
+        secrets = record.get(RECORD_SECRETS_FIELD)
+        if not isinstance(secrets, list) or len(secrets) == 0:
+            return False
+        for secret in secrets:
+            if not isinstance(secret, str) or len(secret) == 0:
+                return False
+        return True
+
+    def __insert_batch(self, batch):
+        """Encrypts and inserts a batch of valid records.
+        Args:
+            batch (list): List of (index, record) of the valid records.
+        Returns:
+            list: Report of every record in the batch.
+        """
+        encrypted_secrets = crypto_pool.encrypt_records(self.master_password, self.master_key, [
+            record[RECORD_SECRETS_FIELD] for _, record in batch])
+        documents = []
+        for (_, record), secrets in zip(batch, encrypted_secrets):
+            document = {
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: record[RECORD_DOMAIN_FIELD],
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: record[RECORD_USERNAME_FIELD],
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: secrets
+            }
+            document.update(generate_ngram_fields(
+                record[RECORD_DOMAIN_FIELD], record[RECORD_USERNAME_FIELD]))
+            documents.append(document)
+
+        write_errors = {}
+        try:
+            with time_stage(STAGE_DB):
+                self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                write_errors[error['index']] = error['code']
+
+        report = []
+        for position, (index, record) in enumerate(batch):
+            if position not in write_errors:
+                report.append(self.__report(
+                    index, record, RECORD_STATUS_INSERTED))
+            elif write_errors[position] == DUPLICATE_KEY_ERROR_CODE:
+                report.append(self.__report(
+                    index, record, RECORD_STATUS_DUPLICATE, ERROR_DUPLICATE_DOMAIN_USERNAME))
+            else:
+                report.append(self.__report(
+                    index, record, RECORD_STATUS_FAILED, ERROR_RECORD_WRITE_FAILED))
+        return report
+
+    def __report(self, index, record, status, message=None):
+        """Creates the report of a record.
+        Args:
+            index (int): Position of the record in the records file.
+            record (object): The decoded record.
+            status (str): Status of the record.
+            message (str, optional): Error message for the record.
+        Returns:
+            dict: The report of the record.
+        """
+        item = {'index': index, 'status': status}
+        if isinstance(record, dict):
+            for field in [RECORD_DOMAIN_FIELD, RECORD_USERNAME_FIELD]:
+                if isinstance(record.get(field), str):
+                    item[field] = record.get(field)
+        if message != None:
+            item['message'] = message
+        return item
@@ -0,0 +1,5 @@
+class DuplicateRecordError(Exception):
+    """Raised by the processors when the unique index on domain and username rejects a write.
+
+    The message is the error message returned to the client.
+    """
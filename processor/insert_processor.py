@@ -1,6 +1,13 @@
 from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
 from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM
-from crypto.encrypter import Encrypter
+from constants.metrics_config import STAGE_DB
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_USERNAME
+from crypto.crypto_pool import crypto_pool
+from processor.duplicate_record_error import DuplicateRecordError
+from pymongo.errors import DuplicateKeyError
+from utils.async_executor import run_blocking
+from utils.request_timing import time_stage
+from utils.ngram import generate_ngram_fields
 
 
 class InsertProcessor:
@@ -11,13 +18,15 @@ class InsertProcessor:
         domain (str): The domain for the record.
         username (str): The username for the record.
         secrets (list): The secrets for the record.
-        encrypter (Encrypter): The Encrypter object to encrypt all the secrets.
+        master_password (str): Master password to encrypt the secrets.
+        master_key (int): Master key to encrypt the secrets.
     """
     collection = None
     domain = None
     username = None
     secrets = None
-    encrypter = None
+    master_password = None
+    master_key = None
 
     def __init__(self, request, dbclient):
         """
@@ -27,27 +36,50 @@ class InsertProcessor:
         """
         self.collection = dbclient.get_collection(
             PASSWORD_MANAGER_COLLECTION_NAME)
-        master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
-        master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
+        self.master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
+        self.master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
         self.domain = request.form.get(BODY_DOMAIN_PARAM)
         self.username = request.form.get(BODY_USERNAME_PARAM)
         self.secrets = request.form.getlist(BODY_SECRET_PARAM)
-        self.encrypter = Encrypter(master_password, master_key)
 
     def process(self):
-        """Inserts the record to the password manager collection."""
-        encrypted_secrets = self.__encrypt_secrets(self.secrets)
-        self.collection.insert_one({
+        """Inserts the record to the password manager collection along with its search index fields.
+        The unique index on domain and username rejects a duplicate combination, which is raised as a DuplicateRecordError with an error message."""
+        record = self.create_record()
+        try:
+            with time_stage(STAGE_DB):
+                self.collection.insert_one(record)
+        except DuplicateKeyError:
+            raise DuplicateRecordError(ERROR_DUPLICATE_DOMAIN_USERNAME)
+
+    async def process_async(self):
+        """Same as process() for a collection of the async client. The secrets are encrypted in the thread pool of the async server."""
+        record = await run_blocking(self.create_record)
+        try:
+            with time_stage(STAGE_DB):
+                await self.collection.insert_one(record)
+        except DuplicateKeyError:
+            raise DuplicateRecordError(ERROR_DUPLICATE_DOMAIN_USERNAME)
+
+    def create_record(self):
+        """Creates the record to insert having the encrypted secrets and the search index fields.
+        Returns:
+            dict: The record.
+        """
+        record = {
             PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain,
             PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: self.username,
-            PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: encrypted_secrets
-        })
+            PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: self.__encrypt_secrets(
+                self.secrets)
+        }
+        record.update(generate_ngram_fields(self.domain, self.username))
+        return record
 
     def __encrypt_secrets(self, secrets):
-        """Encrypts all the secrets in a list.
+        """Encrypts all the secrets in a list using the crypto pool.
         Args:
             secrets (list): List of secrets to encrypt.
         Returns:
             list: List of corresponding encrypted secrets.
         """
-        return [self.encrypter.encrypt(secret) for secret in secrets]
+        return crypto_pool.encrypt_records(self.master_password, self.master_key, [secrets])[0]
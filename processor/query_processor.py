@@ -1,7 +1,14 @@
-from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
-from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_KEY_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
-from constants.response_messages import ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS, ERROR_NO_RECORD_FOUND
-from crypto.decrypter import Decrypter
+from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD
+from constants.metrics_config import STAGE_DB
+from constants.request_parameters import BODY_INDENT_PARAM, BODY_LIMIT_PARAM, BODY_PAGE_TOKEN_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_QUERY_TYPE_PARAM, BODY_MASTER_KEY_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE
+from constants.search_config import QUERY_RESPONSE_DEFAULT_INDENT
+from constants.response_messages import ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS, ERROR_NO_RECORD_FOUND, ERROR_DECRYPTION_FAILED, QUERY_RESULTS_FIELD, QUERY_ERRORS_FIELD, QUERY_ERROR_MESSAGE_FIELD
+from crypto.crypto_pool import crypto_pool
+from utils.async_executor import run_blocking
+from utils.hash import generate_credentials_hash
+from utils.ngram import generate_search_query
+from utils.page_token import encode_page_token, decode_page_token, generate_page_query
+from utils.request_timing import time_stage, time_iteration, time_async_iteration
 
 
 class QueryProcessor:
@@ -11,14 +18,32 @@ class QueryProcessor:
         collection (Collection): The password manager collection object.
         domain (str): The domain for the record.
         username (str): The username for the record.
-        decrypter (Decrypter): The Decrypter object to decrypt the secrets. Only initialized if query type is QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE.
+        selectors (list): List of (domain, username) of the records. Only initialized if query type is QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE.
+        master_password (str): Master password to decrypt the secrets. Only initialized if query type decrypts secrets.
+        master_key (int): Master key to decrypt the secrets. Only initialized if query type decrypts secrets.
+        credentials_hash (str): Hash of the master password and master key, which selects the secrets of a rotation that were encrypted with them.
         query_type (str): The type of query.
+        indent (int): Indentation of the JSON response. None gives compact JSON.
+        limit (int): Maximum number of results in a page of QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE. None means all the results.
+        page_token ((str, str)): Domain and username of the last record of the previous page. None for the first page.
+        next_page_token (str): The page token of the next page. It is set after the results are read, None if there are no more results.
+        scanned (int): Number of records of the page scanned so far.
+        last_scanned (dict): The last record of the page scanned so far.
     """
     collection = None
     domain = None
     username = None
-    decrypter = None
+    selectors = None
+    master_password = None
+    master_key = None
+    credentials_hash = None
     query_type = None
+    indent = None
+    limit = None
+    page_token = None
+    next_page_token = None
+    scanned = None
+    last_scanned = None
 
     def __init__(self, request, dbclient):
         """
@@ -29,80 +54,258 @@ class QueryProcessor:
         self.collection = dbclient.get_collection(
             PASSWORD_MANAGER_COLLECTION_NAME)
         self.query_type = request.form.get(BODY_QUERY_TYPE_PARAM)
-        if self.query_type == QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE:
-            master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
-            master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
-            self.decrypter = Decrypter(master_password, master_key)
+        if self.query_type in [QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE]:
+            self.master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
+            self.master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
+            self.credentials_hash = generate_credentials_hash(
+                self.master_password, self.master_key)
+        if self.query_type == QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE:
+            self.selectors = list(zip(request.form.getlist(
+                BODY_DOMAIN_PARAM), request.form.getlist(BODY_USERNAME_PARAM)))
 
         self.domain = request.form.get(BODY_DOMAIN_PARAM)
         self.username = request.form.get(BODY_USERNAME_PARAM)
+        self.indent = QUERY_RESPONSE_DEFAULT_INDENT
+        if request.form.get(BODY_INDENT_PARAM) != None:
+            self.indent = int(request.form.get(BODY_INDENT_PARAM)) or None
+        self.scanned = 0
+        if request.form.get(BODY_LIMIT_PARAM) != None:
+            self.limit = int(request.form.get(BODY_LIMIT_PARAM))
+        if request.form.get(BODY_PAGE_TOKEN_PARAM) != None:
+            self.page_token = decode_page_token(
+                request.form.get(BODY_PAGE_TOKEN_PARAM))
 
     def process(self):
         """Queries the password manager collection.
-        If query type is QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, it filters the records by domain (and username).
+        If query type is QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, it looks up the records in the search index in the order of domain and username.
+        If a limit is specified, a single page of results is returned and next_page_token is set if there are more results.
         If query type is QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, it decrypts the secrets and returns them if and only if a single record is found for requested domain (and username).
+        If query type is QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE, it fetches all the requested records in a single query and decrypts their secrets.
+        """
+        with time_stage(STAGE_DB):
+            records = list(self.__find().limit(self.__get_limit()))
+        return self.create_result(records)
+
+    async def process_async(self):
+        """Same as process() for a collection of the async client. The secrets are decrypted in the thread pool of the async server."""
+        with time_stage(STAGE_DB):
+            records = await self.__find().limit(self.__get_limit()).to_list(length=None)
+        return await run_blocking(self.create_result, records)
+
+    def iterate_results(self):
+        """Iterates over the results of QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE while reading the cursor, so that the results are never held in memory together.
+        Yields:
+            dict: The domain and username of a matching record.
+        """
+        assert self.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE
+        for record in time_iteration(self.__find().limit(self.__get_limit()), STAGE_DB):
+            result = self.__scan(record)
+            if result != None:
+                yield result
+
+    async def iterate_results_async(self):
+        """Same as iterate_results() for a collection of the async client.
+        Yields:
+            dict: The domain and username of a matching record.
+        """
+        assert self.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE
+        async for record in time_async_iteration(self.__find().limit(self.__get_limit()), STAGE_DB):
+            result = self.__scan(record)
+            if result != None:
+                yield result
+
+    def create_result(self, records):
+        """Creates the result of the query from the fetched records.
+        Args:
+            records (Cursor|list): The records fetched by the query.
+        Returns:
+            list|dict: The result of the query.
         """
         if self.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE:
-            cursor = self.collection.find()
-            return self.__filter_by_domain_and_username(cursor)
+            return self.__filter_by_domain_and_username(records)
         elif self.query_type == QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE:
-            cursor = None
-            if self.username == None:
-                cursor = self.collection.find({
-                    PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain
-                })
-            else:
-                cursor = self.collection.find({
-                    PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain,
-                    PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: self.username
-                })
-            if cursor.count() > 1:
+            records = list(records)
+            if len(records) > 1:
                 raise Exception(
                     ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS)
-            elif cursor.count() == 0:
+            elif len(records) == 0:
                 raise Exception(ERROR_NO_RECORD_FOUND)
             else:
-                record = cursor.next()
+                record = records[0]
                 return {
                     PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD],
                     PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD],
-                    PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: self.__decrypt_secrets(
-                        record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD])
+                    PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: self.__decrypt_records(
+                        [self.__get_encrypted_secrets(record)])[0]
                 }
+        elif self.query_type == QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE:
+            return self.__get_secrets_for_selectors(records)
+
+    def __find(self):
+        """Starts the query of the query type on the password manager collection.
+        For QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, the records are looked up in the search index. A page (a limit, with an optional page token) is sorted
+        by domain and username, and the records of a page token are the ones after its domain and username in that order, so a page never skips
+        or repeats a record. The sort is limited to one record more than the page, so the server keeps only those records in memory.
+        Without a page, the results are streamed unsorted, as sorting them would hold all the matches in the memory of the server.
+        For QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, the records matching domain (and username) are fetched.
+        For QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE, the records of all the selectors are fetched using a single $or query on the unique domain and username index.
+        Returns:
+            Cursor: The cursor of the query.
+        """
+        if self.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE:
+            query = generate_search_query(self.domain, self.username)
+            if self.page_token != None:
+                query = {'$and': [query, generate_page_query(*self.page_token)]}
+            cursor = self.collection.find(query, {
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 1,
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 1
+            })
+            if self.limit == None:
+                return cursor
+            return cursor.sort([(PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, 1), (PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, 1)])
+        elif self.query_type == QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE:
+            query = {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain}
+            if self.username != None:
+                query[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] = self.username
+            return self.collection.find(query)
+        else:
+            return self.collection.find({'$or': [{
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
+            } for domain, username in dict.fromkeys(self.selectors)]})
+
+    def __get_limit(self):
+        """
+        Returns:
+            int: Maximum number of records to fetch. 2 records are enough to decide if a single record matches for QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+            one record more than the limit is enough to decide if there is a next page for QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, 0 means no limit.
+        """
+        if self.query_type == QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE:
+            return 2
+        if self.query_type == QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE and self.limit != None:
+            return self.limit + 1
+        return 0
+
+    def __get_secrets_for_selectors(self, cursor):
+        """Decrypts the records of all the selectors in a single batch.
+        If the batch fails, the records are decrypted one at a time, so that only the records that can't be decrypted are errors.
+        Args:
+            cursor (Cursor|list): The records fetched for the selectors.
+        Returns:
+            dict: The decrypted records in the order of the selectors and the errors for selectors that matched no record or failed to decrypt.
+        """
+        selectors = list(dict.fromkeys(self.selectors))
+        records = {}
+        for record in cursor:
+            records[(record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD],
+                     record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD])] = record
+
+        found = [selector for selector in selectors if selector in records]
+        encrypted_secrets = [self.__get_encrypted_secrets(
+            records[selector]) for selector in found]
+        try:
+            decrypted_secrets = self.__decrypt_records(encrypted_secrets)
+        except ValueError:
+            decrypted_secrets = [self.__decrypt_record(
+                secrets) for secrets in encrypted_secrets]
+        secrets_by_selector = dict(zip(found, decrypted_secrets))
+
+        result = {QUERY_RESULTS_FIELD: [], QUERY_ERRORS_FIELD: []}
+        for domain, username in selectors:
+            if secrets_by_selector.get((domain, username)) == None:
+                result[QUERY_ERRORS_FIELD].append({
+                    PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+                    PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username,
+                    QUERY_ERROR_MESSAGE_FIELD: ERROR_NO_RECORD_FOUND if (
+                        domain, username) not in secrets_by_selector else ERROR_DECRYPTION_FAILED
+                })
+                continue
+            result[QUERY_RESULTS_FIELD].append({
+                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username,
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: secrets_by_selector[(
+                    domain, username)]
+            })
+        return result
 
     def __filter_by_domain_and_username(self, cursor):
         """Filters the cursor by domain (and username if specified in request).
-        For a match, the lowercase of paramater in request must be a substring of the corresponding field in collection.
         Args:
-            cursor (Cursor): The cursor object which is a result of find()/find_one() on a collection object.
+            cursor (Cursor|list): The records which are a result of find() on a collection object.
         Returns:
             list: A list of filtered objects having domain and username.
         """
         result = []
-        for _ in range(cursor.count()):
-            record = cursor.next()
-            domain = record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD]
-            username = record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]
-            if self.domain.lower() in domain.lower():
-                if self.username != None:
-                    if self.username.lower() in username.lower():
-                        result.append({
-                            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
-                            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
-                        })
-                else:
-                    result.append({
-                        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
-                        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
-                    })
+        for record in cursor:
+            match = self.__scan(record)
+            if match != None:
+                result.append(match)
         return result
 
-    def __decrypt_secrets(self, secrets):
-        """Decrypts all the secrets in a list.
+    def __scan(self, record):
+        """Scans the next record of a page. The record after the limit isn't a result, it sets the next page token to the last result.
+        Args:
+            record (dict): The record having domain and username.
+        Returns:
+            dict: The domain and username of the record if it is a result, None otherwise.
+        """
+        if self.limit != None and self.scanned == self.limit:
+            self.next_page_token = encode_page_token(
+                self.last_scanned[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD], self.last_scanned[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD])
+            return None
+        self.scanned += 1
+        self.last_scanned = record
+        return self.__match_domain_and_username(record)
+
+    def __match_domain_and_username(self, record):
+        """Matches a record by domain (and username if specified in request).
+        For a match, the lowercase of paramater in request must be a substring of the corresponding field in collection.
+        Args:
+            record (dict): The record having domain and username.
+        Returns:
+            dict: The domain and username of the record if it matches, None otherwise.
+        """
+        domain = record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD]
+        username = record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]
+        if self.domain.lower() not in domain.lower():
+            return None
+        if self.username != None and self.username.lower() not in username.lower():
+            return None
+        return {
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
+        }
+
+    def __get_encrypted_secrets(self, record):
+        """Returns the secrets of a record encrypted with the master password and master key of the request.
+        While the master credentials are rotated, the secrets encrypted with the new ones are kept next to the current secrets.
+        Args:
+            record (dict): The record of the password manager collection.
+        Returns:
+            list: The encrypted secrets.
+        """
+        if record.get(PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD) == self.credentials_hash:
+            return record[PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD]
+        return record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD]
+
+    def __decrypt_records(self, records):
+        """Decrypts the secrets of records in a single batch using the crypto pool.
+        Args:
+            records (list): List of encrypted secrets of every record.
+        Returns:
+            list: List of decrypted secrets of every record.
+        """
+        assert self.master_password != None and self.master_key != None
+        return crypto_pool.decrypt_records(self.master_password, self.master_key, records)
+
+    def __decrypt_record(self, secrets):
+        """Decrypts the secrets of a single record.
         Args:
-            secrets (list): List of encrypted secrets to decrypt.
+            secrets (list): The encrypted secrets of the record.
         Returns:
-            list: List of corresponding decrypted secrets.
+            list: The decrypted secrets, None if they can't be decrypted.
         """
-        assert self.decrypter != None
-        return [self.decrypter.decrypt(secret) for secret in secrets]
+        try:
+            return self.__decrypt_records([secrets])[0]
+        except ValueError:
+            return None
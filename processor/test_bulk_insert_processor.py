@@ -0,0 +1,86 @@
+import json
+from constants.database import PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_USERNAME, ERROR_INVALID_RECORD, ERROR_MALFORMED_RECORDS, RECORD_STATUS_INSERTED, RECORD_STATUS_DUPLICATE, RECORD_STATUS_INVALID
+from crypto.decrypter import Decrypter
+from mock import Mock
+from processor.bulk_insert_processor import BulkInsertProcessor, DUPLICATE_KEY_ERROR_CODE
+from pymongo.errors import BulkWriteError
+from utils.test import create_mock_request, create_mock_dbclient
+
+
+def create_records_file(records):
+    """Creates the content of a newline delimited JSON records file.
+    Args:
+        records (list): The records.
+    Returns:
+        bytes: The content of the file.
+    """
+    return '\n'.join(json.dumps(record) for record in records).encode('utf-8')
+
+
+def test_bulk_insert_processor_inserts_in_batches():
+    """Tests the BulkInsertProcessor class with valid records.
+    Expects the records to be inserted in batches with secrets that decrypt independently per record."""
+
+    records = [{'domain': 'abc.com', 'username': 'user{}'.format(index), 'secrets': ['secret{}'.format(index), 'pin']}
+               for index in range(5)]
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  records=create_records_file(records))
+    collection = Mock()
+    result = BulkInsertProcessor(
+        request, create_mock_dbclient(collection), batch_size=2).process()
+    assert collection.insert_many.call_count == 3
+    assert result[RECORD_STATUS_INSERTED] == 5
+    assert [item['status'] for item in result['records']] == [
+        RECORD_STATUS_INSERTED] * 5
+    documents = [document for call in collection.insert_many.call_args_list
+                 for document in call[0][0]]
+    for index, document in enumerate(documents):
+        decrypter = Decrypter('abcd', 1234)
+        assert [decrypter.decrypt(secret) for secret in document[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD]] == [
+            'secret{}'.format(index), 'pin']
+
+
+def test_bulk_insert_processor_reports_duplicates_and_invalid_records():
+    """Tests the BulkInsertProcessor class with a duplicate record and invalid records.
+    Expects every record to be reported with its status in the order of the records file."""
+
+    records = [{'domain': 'abc.com', 'username': 'user1', 'secrets': ['secret']},
+               {'domain': 'abc.com', 'username': '', 'secrets': ['secret']},
+               {'domain': 'abc.com', 'username': 'user2', 'secrets': ['secret']},
+               {'domain': 'abc.com', 'username': 'user3', 'secrets': []}]
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  records=create_records_file(records) + b'\nnot json')
+    collection = Mock()
+    collection.insert_many = Mock(side_effect=BulkWriteError({
+        'writeErrors': [{'index': 1, 'code': DUPLICATE_KEY_ERROR_CODE, 'errmsg': 'duplicate'}]
+    }))
+    result = BulkInsertProcessor(
+        request, create_mock_dbclient(collection)).process()
+    assert [(item['index'], item['status']) for item in result['records']] == [
+        (0, RECORD_STATUS_INSERTED),
+        (1, RECORD_STATUS_INVALID),
+        (2, RECORD_STATUS_DUPLICATE),
+        (3, RECORD_STATUS_INVALID),
+        (4, RECORD_STATUS_INVALID)]
+    assert result['records'][2]['message'] == ERROR_DUPLICATE_DOMAIN_USERNAME
+    assert result['records'][1]['message'] == ERROR_INVALID_RECORD
+    assert result[RECORD_STATUS_INSERTED] == 1
+    assert result[RECORD_STATUS_DUPLICATE] == 1
+    assert result[RECORD_STATUS_INVALID] == 3
+
+
+def test_bulk_insert_processor_malformed_json_array():
+    """Tests the BulkInsertProcessor class with a malformed JSON array.
+    Expects the records before the malformed part to be inserted and an error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  records=b'[{"domain": "abc.com", "username": "user1", "secrets": ["secret"]}, {"domain"')
+    collection = Mock()
+    result = BulkInsertProcessor(
+        request, create_mock_dbclient(collection)).process()
+    assert result[RECORD_STATUS_INSERTED] == 1
+    assert result['message'] == ERROR_MALFORMED_RECORDS
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from constants.database import PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_USERNAME
+from crypto.decrypter import Decrypter
+from mock import AsyncMock, Mock
+from processor.duplicate_record_error import DuplicateRecordError
+from processor.insert_processor import InsertProcessor
+from pymongo.errors import DuplicateKeyError
+from utils.ngram import generate_ngrams
+from utils.test import create_mock_request, create_mock_dbclient
+
+
+def test_insert_processor_inserts_record():
+    """Tests the InsertProcessor class with a valid request.
+    Expects the record to be inserted with encrypted secrets and search index fields."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username',
+                                  secret=['some_secret'])
+    collection = Mock()
+    InsertProcessor(request, create_mock_dbclient(collection)).process()
+    record = collection.insert_one.call_args[0][0]
+    assert record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD] == 'some_domain'
+    assert record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] == 'some_username'
+    assert Decrypter('abcd', 1234).decrypt(
+        record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD][0]) == 'some_secret'
+    assert record[PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD] == generate_ngrams(
+        'some_domain')
+    assert record[PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD] == generate_ngrams(
+        'some_username')
+
+
+def test_insert_processor_duplicate_domain_and_username():
+    """Tests the InsertProcessor class with domain and username already existing in password manager collection.
+    Expects the duplicate key error of unique index to be raised with correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username',
+                                  secret=['some_secret'])
+    collection = Mock()
+    collection.insert_one = Mock(side_effect=DuplicateKeyError('duplicate'))
+    with pytest.raises(DuplicateRecordError) as e:
+        InsertProcessor(request, create_mock_dbclient(collection)).process()
+    assert e.value.args[0] == ERROR_DUPLICATE_DOMAIN_USERNAME
+
+
+def test_insert_processor_process_async_duplicate_domain_and_username():
+    """Tests process_async() of the InsertProcessor class with a collection of the async client.
+    Expects the record to be inserted and the duplicate key error to be raised with correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username',
+                                  secret=['some_secret'])
+    collection = Mock()
+    collection.insert_one = AsyncMock(side_effect=DuplicateKeyError('duplicate'))
+    with pytest.raises(DuplicateRecordError) as e:
+        asyncio.run(InsertProcessor(
+            request, create_mock_dbclient(collection)).process_async())
+    assert e.value.args[0] == ERROR_DUPLICATE_DOMAIN_USERNAME
+    record = collection.insert_one.call_args[0][0]
+    assert Decrypter('abcd', 1234).decrypt(
+        record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD][0]) == 'some_secret'
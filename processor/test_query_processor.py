@@ -0,0 +1,279 @@
+from bson.binary import Binary
+from constants.database import PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD
+from constants.request_parameters import QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE
+from constants.response_messages import ERROR_DECRYPTION_FAILED, ERROR_NO_RECORD_FOUND, ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS, QUERY_RESULTS_FIELD, QUERY_ERRORS_FIELD, QUERY_ERROR_MESSAGE_FIELD
+from crypto.encrypter import Encrypter
+from mock import AsyncMock, Mock
+import asyncio
+from processor.query_processor import QueryProcessor
+import pytest
+from utils.hash import generate_credentials_hash
+from utils.page_token import encode_page_token, decode_page_token
+from utils.test import create_mock_request, create_mock_dbclient, create_mock_collection, create_mock_cursor
+
+
+def create_encrypted_record(domain, username, secrets):
+    """Creates a record of password manager collection with secrets encrypted using master password 'abcd' and master key 1234.
+    Args:
+        domain (str): Domain of the record.
+        username (str): Username of the record.
+        secrets (list): Secrets of the record.
+    Returns:
+        dict: The record.
+    """
+    encrypter = Encrypter('abcd', 1234)
+    return {
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username,
+        PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: [encrypter.encrypt(secret) for secret in secrets]
+    }
+
+
+def test_query_processor_multiple_records():
+    """Tests the QueryProcessor class with query for decrypting secrets of many records.
+    Expects a single query, the decrypted records in the order of the selectors and errors for missing records."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE,
+                                  domain=['abc.com', 'xyz.com',
+                                          'abc.com', 'abc.com'],
+                                  username=['user1', 'user2', 'user3', 'user1'])
+    collection = create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=[
+        create_encrypted_record('xyz.com', 'user2', ['secret2', 'pin2']),
+        create_encrypted_record('abc.com', 'user1', ['secret1', 'pin1'])
+    ]))
+    result = QueryProcessor(request, create_mock_dbclient(collection)).process()
+    assert collection.find.call_count == 1
+    assert result[QUERY_RESULTS_FIELD] == [{
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1',
+        PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: ['secret1', 'pin1']
+    }, {
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'xyz.com',
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user2',
+        PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: ['secret2', 'pin2']
+    }]
+    assert result[QUERY_ERRORS_FIELD] == [{
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user3',
+        QUERY_ERROR_MESSAGE_FIELD: ERROR_NO_RECORD_FOUND
+    }]
+
+
+def test_query_processor_multiple_records_with_undecryptable_record():
+    """Tests the QueryProcessor class with query for decrypting secrets of many records, one of which has a tampered secret.
+    Expects the other records to be decrypted and an error for the tampered record."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE,
+                                  domain=['abc.com', 'xyz.com', 'def.com'],
+                                  username=['user1', 'user2', 'user3'])
+    tampered = create_encrypted_record('xyz.com', 'user2', ['secret2'])
+    secret = bytearray(tampered[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD][0])
+    secret[-1] ^= 1
+    tampered[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] = [Binary(bytes(secret))]
+    collection = create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=[
+        create_encrypted_record('abc.com', 'user1', ['secret1']),
+        tampered,
+        create_encrypted_record('def.com', 'user3', ['secret3'])
+    ]))
+    result = QueryProcessor(request, create_mock_dbclient(collection)).process()
+    assert [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in result[QUERY_RESULTS_FIELD]] == [
+        ['secret1'], ['secret3']]
+    assert result[QUERY_ERRORS_FIELD] == [{
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'xyz.com',
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user2',
+        QUERY_ERROR_MESSAGE_FIELD: ERROR_DECRYPTION_FAILED
+    }]
+
+
+def test_query_processor_single_record():
+    """Tests the QueryProcessor class with query for decrypting secrets of a single record.
+    Expects at most 2 records to be fetched and the decrypted secrets."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc.com',
+                                  username='user1')
+    cursor = create_mock_cursor(cursor_values=[
+        create_encrypted_record('abc.com', 'user1', ['secret1', 'pin1'])
+    ])
+    cursor.limit = Mock(wraps=cursor.limit)
+    collection = create_mock_collection(find_return_value1=cursor)
+    result = QueryProcessor(request, create_mock_dbclient(collection)).process()
+    cursor.limit.assert_called_once_with(2)
+    assert result[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] == ['secret1', 'pin1']
+
+
+def test_query_processor_single_record_during_rotation():
+    """Tests the QueryProcessor class with query for decrypting secrets of a record whose secrets are re-encrypted by a rotation.
+    Expects the current secrets to be decrypted with the old credentials and the re-encrypted secrets with the new ones."""
+
+    record = create_encrypted_record('abc.com', 'user1', ['secret1', 'pin1'])
+    encrypter = Encrypter('efgh', 5678)
+    record[PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD] = [
+        encrypter.encrypt(secret) for secret in ['secret1', 'pin1']]
+    record[PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD] = generate_credentials_hash(
+        'efgh', 5678)
+    for master_password, master_key in [('abcd', '1234'), ('efgh', '5678')]:
+        request = create_mock_request(master_password=master_password,
+                                      master_key=master_key,
+                                      query_type=QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+                                      domain='abc.com',
+                                      username='user1')
+        collection = create_mock_collection(
+            find_return_value1=create_mock_cursor(cursor_values=[record]))
+        result = QueryProcessor(
+            request, create_mock_dbclient(collection)).process()
+        assert result[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] == [
+            'secret1', 'pin1']
+
+
+def test_query_processor_single_record_multiple_match():
+    """Tests the QueryProcessor class with query for decrypting secrets of a single record that matches many records.
+    Expects the correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc.com')
+    collection = create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=[
+        create_encrypted_record('abc.com', 'user1', ['secret1']),
+        create_encrypted_record('abc.com', 'user2', ['secret2']),
+        create_encrypted_record('abc.com', 'user3', ['secret3'])
+    ]))
+    with pytest.raises(Exception) as e:
+        QueryProcessor(request, create_mock_dbclient(collection)).process()
+    assert e.value.args[0] == ERROR_MULTIPLE_RECORDS_FOUND_FOR_DECRYPTING_SECRETS
+
+
+def test_query_processor_process_async():
+    """Tests process_async() of the QueryProcessor class with a collection of the async client.
+    Expects at most 2 records to be fetched and the decrypted secrets."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc.com')
+    cursor = Mock()
+    cursor.limit = Mock(return_value=cursor)
+    cursor.to_list = AsyncMock(return_value=[
+        create_encrypted_record('abc.com', 'user1', ['secret1'])
+    ])
+    collection = create_mock_collection(find_return_value1=cursor)
+    result = asyncio.run(QueryProcessor(
+        request, create_mock_dbclient(collection)).process_async())
+    cursor.limit.assert_called_once_with(2)
+    assert result[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] == ['secret1']
+
+
+def test_query_processor_iterate_results():
+    """Tests iterate_results() of the QueryProcessor class with query for searching records.
+    Expects the records matching domain and username to be yielded one at a time and the indent to be read from the request."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='ABC',
+                                  username='user1',
+                                  indent='0')
+    collection = create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=[
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user2'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'xyz.abc',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'USER1'}
+    ]))
+    processor = QueryProcessor(request, create_mock_dbclient(collection))
+    results = processor.iterate_results()
+    assert next(results) == {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+                             PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}
+    assert list(results) == [{PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'xyz.abc',
+                              PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'USER1'}]
+    assert processor.indent == None
+
+
+def test_query_processor_paginated_search():
+    """Tests the QueryProcessor class with query for searching records with a limit and a page token.
+    Expects the query to start after the page token, one record more than the limit to be fetched and the next page token
+    to point at the last result of the page."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc',
+                                  limit='2',
+                                  page_token=encode_page_token('abc.com', 'user1'))
+    cursor = create_mock_cursor(cursor_values=[
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user2'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.net',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.org',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.xyz',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}
+    ])
+    collection = create_mock_collection(find_return_value1=cursor)
+    processor = QueryProcessor(request, create_mock_dbclient(collection))
+    result = processor.process()
+    assert result == [{PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+                       PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user2'},
+                      {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.net',
+                       PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}]
+    assert len(cursor.cursor_values) == 3
+    assert decode_page_token(processor.next_page_token) == (
+        'abc.net', 'user1')
+    query = collection.find.call_args[0][0]
+    assert query['$and'][1] == {'$or': [
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: {'$gt': 'abc.com'}},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: {'$gt': 'user1'}}
+    ]}
+
+
+def test_query_processor_paginated_search_last_page():
+    """Tests iterate_results() of the QueryProcessor class with a limit that isn't reached.
+    Expects all the results and no next page token."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc',
+                                  limit='2')
+    collection = create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=[
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.net',
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}
+    ]))
+    processor = QueryProcessor(request, create_mock_dbclient(collection))
+    assert len(list(processor.iterate_results())) == 2
+    assert processor.next_page_token == None
+
+
+def test_query_processor_unpaged_search_is_not_sorted():
+    """Tests the QueryProcessor class with query for searching records without a limit, and with a limit.
+    Expects the unpaged results to be streamed without sorting, and a page to be sorted by domain and username."""
+
+    for limit, sorted_page in [(None, False), ('2', True)]:
+        request = create_mock_request(master_password='abcd',
+                                      master_key='1234',
+                                      query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                      domain='.com',
+                                      limit=limit)
+        cursor = create_mock_cursor(cursor_values=[
+            {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'xyz.com',
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'},
+            {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 'abc.com',
+                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'user1'}
+        ])
+        cursor.sort = Mock(return_value=cursor)
+        processor = QueryProcessor(request, create_mock_dbclient(
+            create_mock_collection(find_return_value1=cursor)))
+        assert len(list(processor.iterate_results())) == 2
+        assert cursor.sort.called == sorted_page
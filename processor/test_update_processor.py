@@ -0,0 +1,62 @@
+import pytest
+from constants.database import PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
+from middleware.request_context import RequestContext
+from mock import Mock
+from processor.duplicate_record_error import DuplicateRecordError
+from processor.update_processor import UpdateProcessor
+from pymongo.errors import DuplicateKeyError
+from utils.ngram import generate_ngrams
+from utils.test import create_mock_request, create_mock_dbclient
+
+
+def test_update_processor_updates_username():
+    """Tests the UpdateProcessor class with a new username.
+    Expects the username and its search index field to be replaced."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username',
+                                  new_username='some_new_username',
+                                  new_secret=[])
+    collection = Mock()
+    UpdateProcessor(request, create_mock_dbclient(collection)).process()
+    new_values = collection.update_one.call_args[0][1]['$set']
+    assert new_values == {
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 'some_new_username',
+        PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD: generate_ngrams(
+            'some_new_username')
+    }
+
+
+def test_update_processor_duplicate_domain_and_new_username():
+    """Tests the UpdateProcessor class with domain and new username combination already existing in the password manager collection.
+    Expects the duplicate key error of unique index to be raised with correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username',
+                                  new_username='some_new_username',
+                                  new_secret=[])
+    collection = Mock()
+    collection.update_one = Mock(side_effect=DuplicateKeyError('duplicate'))
+    with pytest.raises(DuplicateRecordError) as e:
+        UpdateProcessor(request, create_mock_dbclient(collection)).process()
+    assert e.value.args[0] == ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
+
+
+def test_update_processor_updates_by_record_id():
+    """Tests the UpdateProcessor class with a request context having the _id of the record matched by the validator.
+    Expects the record to be updated by _id."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  new_secret=['some_secret'])
+    context = RequestContext(request)
+    context.record_id = 1
+    collection = Mock()
+    UpdateProcessor(request, create_mock_dbclient(collection), context).process()
+    assert collection.update_one.call_args[0][0] == {'_id': 1}
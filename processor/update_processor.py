@@ -1,6 +1,13 @@
-from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD
 from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_NEW_USERNAME_PARAM, BODY_NEW_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM
-from crypto.encrypter import Encrypter
+from constants.metrics_config import STAGE_DB
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
+from crypto.crypto_pool import crypto_pool
+from processor.duplicate_record_error import DuplicateRecordError
+from pymongo.errors import DuplicateKeyError
+from utils.async_executor import run_blocking
+from utils.request_timing import time_stage
+from utils.ngram import generate_ngrams
 
 
 class UpdateProcessor:
@@ -8,57 +15,91 @@ class UpdateProcessor:
 
     Attributes:
         collection (Collection): The password manager collection object.
+        record_id (ObjectId): The _id of the record matched by the validator. It is None if no request context was given.
         domain (str): The domain for the record.
         username (str): The username for the record.
         new_username (str): New username for the record.
         new_secrets (list): New secrets for the record.
-        encrypter (Encrypter): The Encrypter object to encrypt the secrets. It is initialized only if atleast one new secret is specified.
+        master_password (str): Master password to encrypt the new secrets.
+        master_key (int): Master key to encrypt the new secrets.
     """
     collection = None
+    record_id = None
     domain = None
     username = None
     new_username = None
     new_secrets = None
-    encrypter = None
+    master_password = None
+    master_key = None
 
-    def __init__(self, request, dbclient):
+    def __init__(self, request, dbclient, context=None):
         """
         Args:
             request (Request): The flask request object received from the client.
             dbclient (DbClient): The database client object.
+            context (RequestContext, optional): The context of the request filled by the validator. Defaults to None.
         """
         self.collection = dbclient.get_collection(
             PASSWORD_MANAGER_COLLECTION_NAME)
-        self.domain = request.form.get(BODY_DOMAIN_PARAM)
-        self.username = request.form.get(BODY_USERNAME_PARAM)
-        self.new_username = request.form.get(BODY_NEW_USERNAME_PARAM)
-        self.new_secrets = request.form.getlist(BODY_NEW_SECRET_PARAM)
-        if self.new_secrets != None:
-            master_password = request.form.get(BODY_MASTER_PASSWORD_PARAM)
-            master_key = int(request.form.get(BODY_MASTER_KEY_PARAM))
-            self.encrypter = Encrypter(master_password, master_key)
+        form = request.form
+        if context != None:
+            form = context.form
+            self.record_id = context.record_id
+        self.domain = form.get(BODY_DOMAIN_PARAM)
+        self.username = form.get(BODY_USERNAME_PARAM)
+        self.new_username = form.get(BODY_NEW_USERNAME_PARAM)
+        self.new_secrets = form.getlist(BODY_NEW_SECRET_PARAM)
+        self.master_password = form.get(BODY_MASTER_PASSWORD_PARAM)
+        self.master_key = int(form.get(BODY_MASTER_KEY_PARAM))
 
     def process(self):
         """Updates a single record.
-        If new username is specified then the existing username is replaced.
-        If new secrets are specified, then the existing secrets are replaced."""
-        query = {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain}
-        if self.username != None:
-            query[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] = self.username
+        The record is updated by the _id matched by the validator. Without it, the record is matched by domain (and username if specified).
+        If new username is specified then the existing username and its search index field are replaced.
+        If new secrets are specified, then the existing secrets are replaced.
+        The unique index on domain and username rejects a duplicate combination, which is raised as a DuplicateRecordError with an error message."""
+        query, update = self.create_update()
+        try:
+            with time_stage(STAGE_DB):
+                self.collection.update_one(query, update)
+        except DuplicateKeyError:
+            raise DuplicateRecordError(ERROR_DUPLICATE_DOMAIN_NEW_USERNAME)
+
+    async def process_async(self):
+        """Same as process() for a collection of the async client. The new secrets are encrypted in the thread pool of the async server."""
+        query, update = await run_blocking(self.create_update)
+        try:
+            with time_stage(STAGE_DB):
+                await self.collection.update_one(query, update)
+        except DuplicateKeyError:
+            raise DuplicateRecordError(ERROR_DUPLICATE_DOMAIN_NEW_USERNAME)
+
+    def create_update(self):
+        """Creates the arguments of update_one() having the encrypted new secrets.
+        Returns:
+            (dict, dict): The query matching the record, The update to apply.
+        """
+        if self.record_id != None:
+            query = {'_id': self.record_id}
+        else:
+            query = {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.domain}
+            if self.username != None:
+                query[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] = self.username
         new_values = {}
         if self.new_username != None:
             new_values[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] = self.new_username
+            new_values[PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD] = generate_ngrams(
+                self.new_username)
         if self.new_secrets != None and len(self.new_secrets) > 0:
             new_values[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] = self.__encrypt_secrets(
                 self.new_secrets)
-        self.collection.update_one(query, {'$set': new_values})
+        return query, {'$set': new_values}
 
     def __encrypt_secrets(self, secrets):
-        """Encrypts all the secrets in a list.
+        """Encrypts all the secrets in a list using the crypto pool.
         Args:
             secrets (list): List of secrets to encrypt.
         Returns:
             list: List of corresponding encrypted secrets.
         """
-        assert self.encrypter != None
-        return [self.encrypter.encrypt(secret) for secret in secrets]
+        return crypto_pool.encrypt_records(self.master_password, self.master_key, [secrets])[0]
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import runpy
+import threading
+from constants.response_messages import ERROR_DUPLICATE_DOMAIN_USERNAME, ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
+from constants.url_paths import INSERT_PATH, QUERY_PATH, UPDATE_PATH
+from database import async_dbclient, dbclient
+from mock import AsyncMock, Mock, patch
+from processor.duplicate_record_error import DuplicateRecordError
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_spawned_workers_do_not_start_the_servers():
+    """Tests the import of app.py and async_app.py as __mp_main__, the way the spawned workers of the crypto pool import the main module.
+    Expects no database client to be created and no thread to be started."""
+
+    for name in ['app.py', 'async_app.py']:
+        threads = threading.active_count()
+        with patch.object(dbclient, 'DbClient', Mock()) as db_client, \
+                patch.object(async_dbclient, 'AsyncDbClient', Mock()) as async_db_client:
+            module = runpy.run_path(os.path.join(
+                ROOT, name), run_name='__mp_main__')
+        assert 'create_app' in module
+        db_client.assert_not_called()
+        async_db_client.assert_not_called()
+        assert threading.active_count() == threads
+
+
+def test_create_app():
+    """Tests the creation of the Flask and Quart servers.
+    Expects the database clients to be created with the given database and the routes to be registered."""
+
+    for name in ['app.py', 'async_app.py']:
+        create_app = runpy.run_path(os.path.join(
+            ROOT, name), run_name='__mp_main__')['create_app']
+        db_client = Mock()
+        with patch.dict(create_app.__globals__, {'DbClient': db_client, 'AsyncDbClient': Mock(),
+                                                 'get_auth_key_cache': Mock(), 'get_master_credential_cache': Mock()}):
+            app = create_app(database='test')
+        assert db_client.call_args.kwargs['database'] == 'test'
+        assert '/metrics' in [rule.rule for rule in app.url_map.iter_rules()]
+
+
+def test_insert_and_update_errors():
+    """Tests insert and update requests whose processor rejects a duplicate record or fails with another error.
+    Expects a 400 with the error message and the usage for the duplicate, and a 500 for the other error."""
+
+    for name in ['app.py', 'async_app.py']:
+        create_app = runpy.run_path(os.path.join(
+            ROOT, name), run_name='__mp_main__')['create_app']
+        for processor_name, path, message in [('InsertProcessor', INSERT_PATH, ERROR_DUPLICATE_DOMAIN_USERNAME),
+                                              ('UpdateProcessor', UPDATE_PATH, ERROR_DUPLICATE_DOMAIN_NEW_USERNAME)]:
+            processor = Mock()
+            processor.return_value.process = Mock(side_effect=[
+                DuplicateRecordError(message), RuntimeError('No servers available')])
+            processor.return_value.process_async = AsyncMock(side_effect=[
+                DuplicateRecordError(message), RuntimeError('No servers available')])
+            with patch.dict(create_app.__globals__, {'DbClient': Mock(), 'AsyncDbClient': Mock(),
+                                                     'get_auth_key_cache': Mock(), 'get_master_credential_cache': Mock(),
+                                                     'auth_required': lambda dbclient: lambda f: f,
+                                                     'validate_insert_request': lambda dbclient: lambda f: f,
+                                                     'validate_update_request': lambda dbclient: lambda f: f,
+                                                     'async_auth_required': lambda dbclient: lambda f: f,
+                                                     'validate_async_request': lambda validator, dbclient, usage: lambda f: f,
+                                                     processor_name: processor}):
+                app = create_app()
+                statuses = [post(app, path) for _ in range(2)]
+            assert statuses[0][0] == 400
+            assert statuses[0][1].startswith(message)
+            assert statuses[1][0] == 500
+
+
+
+def test_async_query_processor_is_created_in_thread_pool():
+    """Tests a query request to the async server.
+    Expects the QueryProcessor, which gets its collection synchronously, to be created outside of the thread of the event loop."""
+
+    create_app = runpy.run_path(os.path.join(
+        ROOT, 'async_app.py'), run_name='__mp_main__')['create_app']
+    threads = []
+
+    def create_processor(*args):
+        threads.append(threading.current_thread())
+        processor = Mock(query_type=None, indent=None)
+        processor.process_async = AsyncMock(return_value=[])
+        return processor
+
+    with patch.dict(create_app.__globals__, {'DbClient': Mock(), 'AsyncDbClient': Mock(),
+                                             'get_auth_key_cache': Mock(), 'get_master_credential_cache': Mock(),
+                                             'async_auth_required': lambda dbclient: lambda f: f,
+                                             'validate_async_request': lambda validator, dbclient, usage: lambda f: f,
+                                             'QueryProcessor': Mock(side_effect=create_processor)}):
+        status, body = post(create_app(), QUERY_PATH)
+    assert status == 200, body
+    assert threads != [threading.main_thread()]
+
+
+def post(app, path):
+    """
+    Args:
+        app (Flask|Quart): The server.
+        path (str): The path of the request.
+    Returns:
+        (int, str): The status code and the body of the response.
+    """
+    client = app.test_client()
+    if not asyncio.iscoroutinefunction(client.post):
+        response = client.post(path)
+        return response.status_code, response.get_data(as_text=True)
+
+    async def send():
+        response = await client.post(path)
+        return response.status_code, await response.get_data(as_text=True)
+    return asyncio.run(send())
@@ -0,0 +1,22 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from constants.async_config import ASYNC_EXECUTOR_MAX_WORKERS
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_MAX_WORKERS)
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Runs a blocking function in the thread pool of the async server, so that the event loop keeps serving other requests.
+    The function runs in a copy of the context of the caller, so it sees the context variables of the request, like its timings.
+    Args:
+        function (function): The blocking function.
+        args: Positional arguments of the function.
+        kwargs: Keyword arguments of the function.
+    Returns:
+        object: The value returned by the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, function, *args, **kwargs))
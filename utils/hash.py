@@ -9,3 +9,14 @@ def generate_hash(text):
         str: SHA2 string as hex characters
     """
     return hashlib.sha256(text.encode()).hexdigest()
+
+
+def generate_credentials_hash(master_password, master_key):
+    """Generates the hash identifying a master password and master key together.
+    Args:
+        master_password (str): Master password.
+        master_key (int): Master key.
+    Returns:
+        str: SHA2 string as hex characters
+    """
+    return generate_hash('{}:{}'.format(generate_hash(master_password), generate_hash(str(master_key))))
@@ -0,0 +1,254 @@
+import codecs
+import json
+from constants.bulk_config import BULK_RECORDS_READ_CHUNK_SIZE
+from constants.search_config import QUERY_RESPONSE_CHUNK_SIZE
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\r\n'
+# Number of characters at the end of the buffer in which a decode error may come from a value cut by the end of the chunk,
+# like the prefix of a literal, a number or a \uXXXX escape. An error before them is a syntax error.
+_incomplete_tail = 16
+
+
+def iterate_json_objects(stream, chunk_size=BULK_RECORDS_READ_CHUNK_SIZE):
+    """Iterates over the JSON values of a binary stream without reading it fully into memory.
+    The stream can either be a JSON array of values or newline delimited JSON (one value per line).
+    A malformed line of newline delimited JSON is yielded as a ValueError, so that the remaining lines can still be read.
+    A malformed JSON array raises a ValueError as the rest of it can't be read.
+    Args:
+        stream (file): Binary stream having utf-8 encoded JSON.
+        chunk_size (int, optional): Number of bytes read at a time. Defaults to BULK_RECORDS_READ_CHUNK_SIZE.
+    Yields:
+        object|ValueError: The decoded value, or the error for a malformed line.
+    """
+    chunks = _read_text_chunks(stream, chunk_size)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer.lstrip(_whitespace)) > 0:
+            break
+    buffer = buffer.lstrip(_whitespace)
+    if buffer.startswith('['):
+        yield from _iterate_array(buffer[1:], chunks)
+    else:
+        yield from _iterate_lines(buffer, chunks)
+
+
+def _read_text_chunks(stream, chunk_size):
+    """Reads the binary stream as utf-8 text in chunks.
+    Args:
+        stream (file): Binary stream having utf-8 encoded text.
+        chunk_size (int): Number of bytes read at a time.
+    Yields:
+        str: The decoded chunks.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def _iterate_lines(buffer, chunks):
+    """Iterates over newline delimited JSON. Blank lines are skipped.
+    Args:
+        buffer (str): Text that is already read.
+        chunks (generator): The remaining text chunks.
+    Yields:
+        object|ValueError: The decoded value, or the error for a malformed line.
+    """
+    while True:
+        index = buffer.find('\n')
+        if index < 0:
+            chunk = next(chunks, None)
+            if chunk == None:
+                break
+            buffer += chunk
+            continue
+        line, buffer = buffer[:index], buffer[index + 1:]
+        if len(line.strip()) > 0:
+            yield _decode_line(line)
+    if len(buffer.strip()) > 0:
+        yield _decode_line(buffer)
+
+
+def _decode_line(line):
+    """Decodes a single line of newline delimited JSON.
+    Args:
+        line (str): The line.
+    Returns:
+        object|ValueError: The decoded value, or the error if the line is malformed.
+    """
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+def _iterate_array(buffer, chunks):
+    """Iterates over the values of a JSON array whose opening bracket is already consumed.
+    A value cut by the end of the buffer is decoded again once the buffer has at least doubled, so a large value is decoded a bounded number of times.
+    A syntax error is raised without reading the rest of the stream.
+    Args:
+        buffer (str): Text that is already read.
+        chunks (generator): The remaining text chunks.
+    Yields:
+        object: The decoded value.
+    """
+    expect_value = True
+    while True:
+        buffer = buffer.lstrip(_whitespace)
+        if len(buffer) == 0:
+            chunk = next(chunks, None)
+            if chunk == None:
+                raise ValueError('Unterminated JSON array')
+            buffer = chunk
+            continue
+        if buffer[0] == ']':
+            return
+        if not expect_value:
+            if buffer[0] != ',':
+                raise ValueError('Expected , or ] in JSON array')
+            buffer = buffer[1:]
+            expect_value = True
+            continue
+        try:
+            value, end = _decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if e.pos < len(buffer) - _incomplete_tail and not e.msg.startswith('Unterminated string'):
+                raise
+            size = len(buffer)
+            parts = [buffer]
+            while size < 2 * len(buffer):
+                chunk = next(chunks, None)
+                if chunk == None:
+                    break
+                parts.append(chunk)
+                size += len(chunk)
+            if len(parts) == 1:
+                raise
+            buffer = ''.join(parts)
+            continue
+        if end == len(buffer) and not isinstance(value, (dict, list, str)):
+            # A number or literal at the end of the buffer may continue in the next chunk.
+            chunk = next(chunks, None)
+            if chunk != None and len(chunk) > 0:
+                buffer += chunk
+                continue
+        yield value
+        buffer = buffer[end:]
+        expect_value = False
+
+
+def generate_json_chunks(values, ndjson=False, indent=None, chunk_size=QUERY_RESPONSE_CHUNK_SIZE):
+    """Encodes the values as a JSON array or as newline delimited JSON without holding all of them in memory.
+    The JSON array is the same text as json.dumps() of the list of values with the same indent.
+    Args:
+        values (iterable): The values to encode.
+        ndjson (bool, optional): Whether to encode newline delimited JSON instead of a JSON array. Defaults to False.
+        indent (int, optional): Indentation of the JSON array. None gives compact JSON. Defaults to None.
+        chunk_size (int, optional): Minimum number of characters in a chunk, except the last one. Defaults to QUERY_RESPONSE_CHUNK_SIZE.
+    Yields:
+        str: The encoded chunks.
+    """
+    encoder = _JsonChunkEncoder(ndjson, indent, chunk_size)
+    for value in values:
+        chunk = encoder.encode(value)
+        if chunk != None:
+            yield chunk
+    yield encoder.end()
+
+
+async def generate_json_chunks_async(values, ndjson=False, indent=None, chunk_size=QUERY_RESPONSE_CHUNK_SIZE):
+    """Same as generate_json_chunks() for values of an async iterator.
+    Args:
+        values (async iterable): The values to encode.
+        ndjson (bool, optional): Whether to encode newline delimited JSON instead of a JSON array. Defaults to False.
+        indent (int, optional): Indentation of the JSON array. None gives compact JSON. Defaults to None.
+        chunk_size (int, optional): Minimum number of characters in a chunk, except the last one. Defaults to QUERY_RESPONSE_CHUNK_SIZE.
+    Yields:
+        str: The encoded chunks.
+    """
+    encoder = _JsonChunkEncoder(ndjson, indent, chunk_size)
+    async for value in values:
+        chunk = encoder.encode(value)
+        if chunk != None:
+            yield chunk
+    yield encoder.end()
+
+
+class _JsonChunkEncoder:
+    """Encodes values one at a time and buffers the text until a chunk is full.
+
+    Attributes:
+        ndjson (bool): Whether to encode newline delimited JSON instead of a JSON array.
+        indent (int): Indentation of the JSON array. None gives compact JSON.
+        chunk_size (int): Minimum number of characters in a chunk.
+        count (int): Number of values encoded.
+        buffer (list): The text that is not sent yet.
+        size (int): Number of characters in the buffer.
+    """
+    ndjson = None
+    indent = None
+    chunk_size = None
+    count = None
+    buffer = None
+    size = None
+
+    def __init__(self, ndjson, indent, chunk_size):
+        """
+        Args:
+            ndjson (bool): Whether to encode newline delimited JSON instead of a JSON array.
+            indent (int): Indentation of the JSON array. None gives compact JSON.
+            chunk_size (int): Minimum number of characters in a chunk.
+        """
+        self.ndjson = ndjson
+        self.indent = indent
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.buffer = [] if ndjson else ['[']
+        self.size = len(self.buffer)
+
+    def encode(self, value):
+        """Encodes a value.
+        Args:
+            value (object): The value to encode.
+        Returns:
+            str: A full chunk, None if the buffer is not full yet.
+        """
+        if self.ndjson:
+            text = json.dumps(value) + '\n'
+        elif self.indent == None:
+            text = (', ' if self.count > 0 else '') + json.dumps(value)
+        else:
+            # Strings are escaped by json.dumps(), so every newline belongs to the indentation.
+            prefix = '\n' + ' ' * self.indent
+            text = (',' if self.count > 0 else '') + prefix + \
+                json.dumps(value, indent=self.indent).replace('\n', prefix)
+        self.count += 1
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size < self.chunk_size:
+            return None
+        return self.__flush()
+
+    def end(self):
+        """
+        Returns:
+            str: The remaining text including the end of the JSON array.
+        """
+        if not self.ndjson:
+            self.buffer.append('\n]' if self.indent != None and self.count > 0 else ']')
+        return self.__flush()
+
+    def __flush(self):
+        """
+        Returns:
+            str: The buffered text. The buffer is emptied.
+        """
+        chunk = ''.join(self.buffer)
+        self.buffer = []
+        self.size = 0
+        return chunk
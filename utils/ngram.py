@@ -0,0 +1,66 @@
+import re
+from constants.database import PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD
+from constants.search_config import SEARCH_NGRAM_LENGTH
+
+
+def generate_ngrams(text):
+    """Generates the distinct n-grams of the lowercase text. The n-grams are of length SEARCH_NGRAM_LENGTH.
+    Args:
+        text (str): The text whose n-grams are to be generated.
+    Returns:
+        list: Sorted list of distinct n-grams. Empty if the text is shorter than SEARCH_NGRAM_LENGTH.
+    """
+    text = text.lower()
+    ngrams = set()
+    for index in range(len(text) - SEARCH_NGRAM_LENGTH + 1):
+        ngrams.add(text[index: index + SEARCH_NGRAM_LENGTH])
+    return sorted(ngrams)
+
+
+def generate_ngram_fields(domain, username):
+    """Generates the search index fields of a record in password manager collection.
+    Args:
+        domain (str): Domain of the record.
+        username (str): Username of the record.
+    Returns:
+        dict: The n-gram fields for domain and username.
+    """
+    return {
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD: generate_ngrams(domain),
+        PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD: generate_ngrams(username)
+    }
+
+
+def generate_search_query(domain, username=None):
+    """Generates a query that selects the records whose domain (and username) contain the given text, ignoring case.
+    The field must match an escaped case-insensitive regex of the text.
+    If the text is at least SEARCH_NGRAM_LENGTH long, the n-gram field must also contain all the n-grams of the text, so that the query can use the n-gram index.
+    As the query is exact, it can be sorted and limited without checking the records afterwards.
+    Args:
+        domain (str): Text to search in the domain.
+        username (str, optional): Text to search in the username.
+    Returns:
+        dict: The query for find().
+    """
+    query = _generate_field_query(
+        domain, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD)
+    if username != None:
+        query.update(_generate_field_query(
+            username, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD))
+    return query
+
+
+def _generate_field_query(text, field, ngrams_field):
+    """Generates the query for a single field.
+    Args:
+        text (str): Text to search in the field.
+        field (str): Name of the field.
+        ngrams_field (str): Name of the n-gram field for the field.
+    Returns:
+        dict: The query for the field.
+    """
+    query = {field: {'$regex': re.escape(text), '$options': 'i'}}
+    ngrams = generate_ngrams(text)
+    if len(ngrams) > 0:
+        query[ngrams_field] = {'$all': ngrams}
+    return query
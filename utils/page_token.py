@@ -0,0 +1,49 @@
+import base64
+import binascii
+import json
+from constants.database import PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD
+
+
+def encode_page_token(domain, username):
+    """Encodes the position of a search page as an opaque token. The next page starts after the record with the domain and username.
+    Args:
+        domain (str): Domain of the last record of the page.
+        username (str): Username of the last record of the page.
+    Returns:
+        str: The url-safe page token.
+    """
+    return base64.urlsafe_b64encode(json.dumps([domain, username]).encode('utf-8')).decode('ascii')
+
+
+def decode_page_token(page_token):
+    """Decodes a page token generated by encode_page_token().
+    Args:
+        page_token (str): The page token.
+    Returns:
+        (str, str): Domain and username of the last record of the previous page.
+    Raises:
+        ValueError: If the page token is malformed.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(
+            page_token.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Malformed page token')
+    if not isinstance(position, list) or len(position) != 2 or not all(isinstance(value, str) for value in position):
+        raise ValueError('Malformed page token')
+    return position[0], position[1]
+
+
+def generate_page_query(domain, username):
+    """Generates a query that selects the records after the given domain and username in the order of the unique domain and username index.
+    Args:
+        domain (str): Domain of the last record of the previous page.
+        username (str): Username of the last record of the previous page.
+    Returns:
+        dict: The query for find().
+    """
+    return {'$or': [
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: {'$gt': domain}},
+        {PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: {'$gt': username}}
+    ]}
@@ -0,0 +1,289 @@
+import contextlib
+import contextvars
+import threading
+import time
+from constants.metrics_config import METRICS_ENABLED, METRICS_HISTOGRAM_BUCKETS, STAGE_TOTAL
+
+_timings = contextvars.ContextVar('request_timings', default=None)
+_null_stage = contextlib.nullcontext()
+_end = object()
+
+
+class RequestTimings:
+    """Records the time spent in every stage of a request.
+
+    Stages can be nested, like the key derivation done while encrypting. The time of a stage excludes the time of the stages nested in it,
+    so the stages add up to the time spent in the request.
+
+    Attributes:
+        start (float): The performance counter when the request started.
+        durations (dict): Seconds spent by stage.
+        stack (list): The stages that are running as [stage, start, seconds spent in the stages nested in it].
+    """
+    start = None
+    durations = None
+    stack = None
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+        self.stack = []
+
+    def enter(self, stage):
+        """
+        Args:
+            stage (str): The stage that starts.
+        """
+        self.stack.append([stage, time.perf_counter(), 0.0])
+
+    def exit(self):
+        """Ends the last stage that started."""
+        stage, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.durations[stage] = self.durations.get(
+            stage, 0.0) + elapsed - nested
+        if len(self.stack) > 0:
+            self.stack[-1][2] += elapsed
+
+    def get_total(self):
+        """
+        Returns:
+            float: Seconds since the request started.
+        """
+        return time.perf_counter() - self.start
+
+
+class _Stage:
+    """Context manager recording a stage of a request. It can be entered again after it exits.
+
+    Attributes:
+        timings (RequestTimings): The timings of the request.
+        stage (str): The stage.
+    """
+    timings = None
+    stage = None
+
+    def __init__(self, timings, stage):
+        """
+        Args:
+            timings (RequestTimings): The timings of the request.
+            stage (str): The stage.
+        """
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.timings.enter(self.stage)
+
+    def __exit__(self, *args):
+        self.timings.exit()
+
+
+class Histogram:
+    """A Prometheus histogram of durations having a single label.
+
+    Attributes:
+        name (str): Name of the metric.
+        description (str): Help text of the metric.
+        label (str): Name of the label.
+        buckets (list): Upper bounds of the buckets in seconds.
+        counts (dict): Number of observations per bucket (the last one is +Inf) by label value.
+        sums (dict): Sum of the observations by label value.
+        lock (Lock): Guards the counts and sums, as the requests are served by many threads.
+    """
+    name = None
+    description = None
+    label = None
+    buckets = None
+    counts = None
+    sums = None
+    lock = None
+
+    def __init__(self, name, description, label, buckets=METRICS_HISTOGRAM_BUCKETS):
+        """
+        Args:
+            name (str): Name of the metric.
+            description (str): Help text of the metric.
+            label (str): Name of the label.
+            buckets (list, optional): Upper bounds of the buckets in seconds. Defaults to METRICS_HISTOGRAM_BUCKETS.
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self.counts = {}
+        self.sums = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        """
+        Args:
+            value (str): Value of the label.
+            seconds (float): The observed duration.
+        """
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self.lock:
+            if value not in self.counts:
+                self.counts[value] = [0] * (len(self.buckets) + 1)
+                self.sums[value] = 0.0
+            self.counts[value][index] += 1
+            self.sums[value] += seconds
+
+    def render(self):
+        """
+        Returns:
+            list: The lines of the metric in the Prometheus text format.
+        """
+        lines = ['# HELP {} {}'.format(self.name, self.description),
+                 '# TYPE {} histogram'.format(self.name)]
+        with self.lock:
+            for value in sorted(self.counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ['+Inf'], self.counts[value]):
+                    cumulative += count
+                    lines.append('{}_bucket{{{}="{}",le="{}"}} {}'.format(
+                        self.name, self.label, value, bound, cumulative))
+                lines.append('{}_sum{{{}="{}"}} {}'.format(
+                    self.name, self.label, value, self.sums[value]))
+                lines.append('{}_count{{{}="{}"}} {}'.format(
+                    self.name, self.label, value, cumulative))
+        return lines
+
+
+stage_histogram = Histogram('pwdmngr_request_stage_seconds',
+                            'Time spent by requests in each stage, excluding the stages nested in it.', 'stage')
+request_histogram = Histogram('pwdmngr_request_duration_seconds',
+                              'Time spent by requests in total.', 'endpoint')
+
+
+def start_request():
+    """Starts recording the stages of the current request, if metrics are enabled.
+    Returns:
+        RequestTimings: The timings of the request, None if metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return None
+    timings = RequestTimings()
+    _timings.set(timings)
+    return timings
+
+
+def get_request_timings():
+    """
+    Returns:
+        RequestTimings: The timings of the current request, None if they aren't recorded.
+    """
+    return _timings.get()
+
+
+def finish_request(endpoint):
+    """Stops recording the stages of the current request and adds them to the histograms.
+    Args:
+        endpoint (str): Name of the endpoint that served the request.
+    """
+    timings = _timings.get()
+    if timings == None:
+        return
+    _timings.set(None)
+    request_histogram.observe(endpoint, timings.get_total())
+    for stage, seconds in timings.durations.items():
+        stage_histogram.observe(stage, seconds)
+
+
+def time_stage(stage):
+    """Records the time spent in the with block as a stage of the current request. Nothing is recorded outside of a request.
+    Args:
+        stage (str): The stage.
+    Returns:
+        context manager: The context manager recording the stage.
+    """
+    timings = _timings.get()
+    if timings == None:
+        return _null_stage
+    return _Stage(timings, stage)
+
+
+def time_iteration(iterable, stage):
+    """Records the time spent in getting every value of the iterable as a stage of the current request.
+    The time spent by the consumer of the values isn't recorded.
+    Args:
+        iterable (iterable): The values.
+        stage (str): The stage.
+    Returns:
+        iterable: The same values.
+    """
+    timings = _timings.get()
+    if timings == None:
+        return iterable
+    return _time_iteration(iter(iterable), _Stage(timings, stage))
+
+
+def _time_iteration(iterator, stage):
+    """
+    Args:
+        iterator (iterator): The values.
+        stage (_Stage): The stage recording the time spent in next().
+    Yields:
+        object: The same values.
+    """
+    while True:
+        with stage:
+            value = next(iterator, _end)
+        if value is _end:
+            return
+        yield value
+
+
+def time_async_iteration(iterable, stage):
+    """Same as time_iteration() for an async iterable.
+    Args:
+        iterable (async iterable): The values.
+        stage (str): The stage.
+    Returns:
+        async iterable: The same values.
+    """
+    timings = _timings.get()
+    if timings == None:
+        return iterable
+    return _time_async_iteration(iterable.__aiter__(), _Stage(timings, stage))
+
+
+async def _time_async_iteration(iterator, stage):
+    """
+    Args:
+        iterator (async iterator): The values.
+        stage (_Stage): The stage recording the time spent in __anext__().
+    Yields:
+        object: The same values.
+    """
+    while True:
+        with stage:
+            try:
+                value = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+        yield value
+
+
+def format_server_timing(timings):
+    """
+    Args:
+        timings (RequestTimings): The timings of a request.
+    Returns:
+        str: The value of the Server-Timing header. The durations are in milliseconds.
+    """
+    durations = list(timings.durations.items()) + \
+        [(STAGE_TOTAL, timings.get_total())]
+    return ', '.join('{};dur={:.3f}'.format(stage, seconds * 1000) for stage, seconds in durations)
+
+
+def render_metrics():
+    """
+    Returns:
+        str: The histograms in the Prometheus text format.
+    """
+    return '\n'.join(stage_histogram.render() + request_histogram.render()) + '\n'
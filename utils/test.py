@@ -1,10 +1,12 @@
-from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_QUERY_TYPE_PARAM, BODY_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_NEW_USERNAME_PARAM, BODY_NEW_SECRET_PARAM
+from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_QUERY_TYPE_PARAM, BODY_SECRET_PARAM, BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM, BODY_NEW_USERNAME_PARAM, BODY_NEW_SECRET_PARAM, BODY_RECORDS_PARAM, BODY_INDENT_PARAM, BODY_LIMIT_PARAM, BODY_PAGE_TOKEN_PARAM
 from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, AUTH_COLLECTION_KEY_FIELD
 from crypto.cipher_key import CipherKey
+import io
 from mock import Mock
 import random
 import string
 from utils.hash import generate_hash
+from werkzeug.datastructures import FileStorage
 
 
 def create_cipher_key(master_password, master_key):
@@ -43,27 +45,70 @@ def create_random_master_key(max_value):
     return random.randint(0, max_value)
 
 
-def create_mock_request(domain=None, username=None, query_type=None, secret=None, master_password=None, master_key=None, new_username=None, new_secret=None):
+def create_mock_clock(now=0):
+    """Creates a mock clock that returns the current time when called. The time only changes when the now attribute is set.
+    Args:
+        now (float, optional): The initial time in seconds.
+    Returns:
+        MockClock: Mock clock object.
+    """
+    class MockClock:
+        """Mock class for clock functions such as time.monotonic.
+
+        Attributes:
+            now (float): Current time in seconds.
+        """
+        now = None
+
+        def __init__(self, now):
+            self.now = now
+
+        def __call__(self):
+            """This method mocks the call to the clock function."""
+            return self.now
+
+    return MockClock(now)
+
+
+def create_mock_request(domain=None, username=None, query_type=None, secret=None, master_password=None, master_key=None, new_username=None, new_secret=None, records=None, indent=None, limit=None, page_token=None):
     """Creates a mock flask Request object that returns the provided value when get() or getlist() is called on form attribute.
+    Domain and username can be lists to specify repeated parameters. get() returns the first of them.
+    The records file is returned when get() is called on files attribute.
     Defaults to returning None.
     Args:
-        domain (str, optional): The domain body parameter in the request.
-        username (str, optional): The username body parameter in the request.
+        domain (str|list, optional): The domain body parameter(s) in the request.
+        username (str|list, optional): The username body parameter(s) in the request.
         query_type (str, optional): The query-type body parameter in the request.
         secret (list, optional): The secret body parameter in the request.
         master_password (str, optional): The master-password body parameter in the request.
         master_key (str, optional): The master key body parameter in the request.
         new-username (str, optional): The new-username body parameter in the request.
         new-secret (list, optional): The new-secret body parameter in the request.
+        records (bytes, optional): The content of records file in the request.
+        indent (str, optional): The indent body parameter in the request.
+        limit (str, optional): The limit body parameter in the request.
+        page_token (str, optional): The page-token body parameter in the request.
     Returns:
         Mock: Mock Request object.
     """
+    def first(value):
+        """Returns the first of repeated parameters."""
+        if isinstance(value, list):
+            return value[0] if len(value) > 0 else None
+        return value
+
+    def as_list(value):
+        """Returns the parameter as list of repeated parameters."""
+        if value == None:
+            return []
+        return value if isinstance(value, list) else [value]
+
     def request_form_get(param):
         """This method stubs the request.form.get() method."""
         if param == BODY_DOMAIN_PARAM:
-            return domain
+            return first(domain)
         elif param == BODY_USERNAME_PARAM:
-            return username
+            return first(username)
         elif param == BODY_NEW_USERNAME_PARAM:
             return new_username
         elif param == BODY_QUERY_TYPE_PARAM:
@@ -72,6 +117,12 @@ def create_mock_request(domain=None, username=None, query_type=None, secret=None
             return master_password
         elif param == BODY_MASTER_KEY_PARAM:
             return master_key
+        elif param == BODY_INDENT_PARAM:
+            return indent
+        elif param == BODY_LIMIT_PARAM:
+            return limit
+        elif param == BODY_PAGE_TOKEN_PARAM:
+            return page_token
         else:
             return None
 
@@ -79,14 +130,26 @@ def create_mock_request(domain=None, username=None, query_type=None, secret=None
         """This method stubs the request.form.getlist() method."""
         if param == BODY_SECRET_PARAM:
             return secret
+        elif param == BODY_DOMAIN_PARAM:
+            return as_list(domain)
+        elif param == BODY_USERNAME_PARAM:
+            return as_list(username)
         elif param == BODY_NEW_SECRET_PARAM:
             return new_secret
         else:
             return None
 
+    def request_files_get(param):
+        """This method stubs the request.files.get() method."""
+        if param == BODY_RECORDS_PARAM and records != None:
+            return FileStorage(stream=io.BytesIO(records))
+        else:
+            return None
+
     request = Mock()
     request.form.get = Mock(side_effect=request_form_get)
     request.form.getlist = Mock(side_effect=request_form_getlist)
+    request.files.get = Mock(side_effect=request_files_get)
     return request
 
 
@@ -154,9 +217,19 @@ def create_mock_cursor(cursor_values=[]):
             self.current_index = 0
             self.cursor_values = cursor_values
 
-        def count(self):
-            """This methods mocks the count() method of cursor."""
-            return len(self.cursor_values)
+        def limit(self, limit):
+            """This methods mocks the limit() method of cursor. A limit of 0 means no limit."""
+            if limit > 0:
+                self.cursor_values = self.cursor_values[0: limit]
+            return self
+
+        def sort(self, key_or_list):
+            """This methods mocks the sort() method of cursor. The values are expected to be in the sorted order already."""
+            return self
+
+        def batch_size(self, batch_size):
+            """This methods mocks the batch_size() method of cursor."""
+            return self
 
         def next(self):
             """This methods mocks the next() method of cursor."""
@@ -166,6 +239,16 @@ def create_mock_cursor(cursor_values=[]):
                 self.current_index += 1
                 return self.cursor_values[self.current_index - 1]
 
+        def __iter__(self):
+            """This methods mocks iteration over the cursor."""
+            return self
+
+        def __next__(self):
+            """This methods mocks the next() builtin on the cursor."""
+            if self.current_index >= len(self.cursor_values):
+                raise StopIteration
+            return self.next()
+
     cursor = MockCursor(cursor_values)
     return cursor
 
@@ -202,6 +285,7 @@ def create_mock_dbclient_with_master_and_password_manager_collection(master_pass
     password_manager_collection = None
     if domain and username:
         password_manager_collection = create_mock_cursor(cursor_values=[{
+            '_id': 1,
             PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
             PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
         }])
@@ -232,6 +316,7 @@ def create_mock_dbclient_with_master_and_multiple_password_manager_collection(ma
     password_manager_collection1 = None
     if domain1 and username1:
         password_manager_collection1 = create_mock_cursor(cursor_values=[{
+            '_id': 1,
             PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain1,
             PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username1
         }])
@@ -240,6 +325,7 @@ def create_mock_dbclient_with_master_and_multiple_password_manager_collection(ma
     password_manager_collection2 = None
     if domain2 and username2:
         password_manager_collection2 = create_mock_cursor(cursor_values=[{
+            '_id': 2,
             PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain2,
             PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username2
         }])
@@ -250,17 +336,17 @@ def create_mock_dbclient_with_master_and_multiple_password_manager_collection(ma
 
 def create_mock_dbclient_with_auth_collection(key):
     """Creates a mock DbClient with a mock auth collection.
-    The auth collection is returned as a result of find()/find_one().
+    The auth collection is returned as a result of first and second find()/find_one().
+    The first find()/find_one() loads all the keys and the second one looks up a single key.
     Args:
         key (str): The key which is hashed as stored in auth collection.
     Returns:
         Mock: Mock DbClient object.
     """
-    auth_collection = None
+    cursor_values = []
     if key != None:
-        auth_collection = create_mock_cursor(cursor_values=[{
+        cursor_values = [{
             AUTH_COLLECTION_KEY_FIELD: generate_hash(key)
-        }])
-    else:
-        auth_collection = create_mock_cursor()
-    return create_mock_dbclient(collection=create_mock_collection(find_return_value1=auth_collection))
+        }]
+    return create_mock_dbclient(collection=create_mock_collection(find_return_value1=create_mock_cursor(cursor_values=cursor_values),
+                                                                  find_return_value2=create_mock_cursor(cursor_values=cursor_values)))
@@ -0,0 +1,120 @@
+import io
+import json
+import pytest
+from utils.json_stream import iterate_json_objects, generate_json_chunks, generate_json_chunks_async
+import asyncio
+
+RECORDS = [{'domain': 'abc.com', 'username': 'user{}'.format(index), 'secrets': ['sécret', 12.5, None]}
+           for index in range(50)]
+
+
+def test_iterate_json_array_small_chunks():
+    """Tests that a JSON array read a few bytes at a time yields every value."""
+
+    stream = io.BytesIO(json.dumps(RECORDS, indent=2).encode('utf-8'))
+    assert list(iterate_json_objects(stream, chunk_size=3)) == RECORDS
+
+
+def test_iterate_json_array_trailing_number_split_across_chunks():
+    """Tests that a number at the end of a chunk is not yielded before the rest of it is read."""
+
+    stream = io.BytesIO(b'[1234567, 89]')
+    assert list(iterate_json_objects(stream, chunk_size=4)) == [1234567, 89]
+
+
+def test_iterate_empty_json_array():
+    """Tests that an empty JSON array yields nothing."""
+
+    assert list(iterate_json_objects(io.BytesIO(b' [ ] '))) == []
+
+
+def test_iterate_malformed_json_array():
+    """Tests that a malformed JSON array raises ValueError after yielding the values before it."""
+
+    values = iterate_json_objects(io.BytesIO(b'[{"a": 1} {"b": 2}]'))
+    assert next(values) == {'a': 1}
+    with pytest.raises(ValueError):
+        next(values)
+
+
+def test_iterate_malformed_json_array_stops_reading():
+    """Tests that a syntax error in a value of a large JSON array is raised without reading the rest of the stream."""
+
+    data = b'[{"a": 1}, {"b" 2}, ' + json.dumps(RECORDS * 1000).encode('utf-8')[1:]
+    stream = io.BytesIO(data)
+    values = iterate_json_objects(stream, chunk_size=1024)
+    assert next(values) == {'a': 1}
+    with pytest.raises(ValueError):
+        next(values)
+    assert stream.tell() <= 1024
+
+
+def test_iterate_json_array_large_value():
+    """Tests that a value much larger than a chunk, whose strings and escapes are cut by the chunks, is yielded."""
+
+    value = {'secrets': ['\u00e9\n"' * 1000, 'x' * 10000], 'flags': [True, False, None, -1.5e-3]}
+    stream = io.BytesIO(json.dumps([value, value]).encode('utf-8'))
+    assert list(iterate_json_objects(stream, chunk_size=7)) == [value, value]
+
+
+def test_iterate_newline_delimited_json_small_chunks():
+    """Tests that newline delimited JSON read a few bytes at a time yields every value and skips blank lines."""
+
+    text = '\n'.join(json.dumps(record) for record in RECORDS) + '\n\n'
+    stream = io.BytesIO(text.encode('utf-8'))
+    assert list(iterate_json_objects(stream, chunk_size=5)) == RECORDS
+
+
+def test_iterate_newline_delimited_json_malformed_line():
+    """Tests that a malformed line is yielded as ValueError and the following lines are still read."""
+
+    values = list(iterate_json_objects(
+        io.BytesIO(b'{"a": 1}\n{"b": \n{"c": 3}')))
+    assert values[0] == {'a': 1}
+    assert isinstance(values[1], ValueError)
+    assert values[2] == {'c': 3}
+
+
+def test_iterate_empty_stream():
+    """Tests that an empty stream yields nothing."""
+
+    assert list(iterate_json_objects(io.BytesIO(b''))) == []
+
+
+def test_generate_json_array_same_as_json_dumps():
+    """Tests that the streamed JSON array is the same text as json.dumps() of the list for every indent."""
+
+    for values in [[], RECORDS[:1], RECORDS]:
+        for indent in [None, 0, 2, 4]:
+            chunks = list(generate_json_chunks(
+                iter(values), indent=indent, chunk_size=100))
+            assert ''.join(chunks) == json.dumps(values, indent=indent)
+
+
+def test_generate_json_chunks_bounded_size():
+    """Tests that the values are sent in chunks as soon as the buffer is full, rather than at the end."""
+
+    chunks = list(generate_json_chunks(iter(RECORDS), indent=2, chunk_size=256))
+    assert len(chunks) > 10
+    assert all(len(chunk) < 512 for chunk in chunks)
+
+
+def test_generate_ndjson():
+    """Tests that newline delimited JSON has one compact value per line and can be read back."""
+
+    text = ''.join(generate_json_chunks(iter(RECORDS), ndjson=True, indent=2))
+    assert text.count('\n') == len(RECORDS)
+    assert list(iterate_json_objects(io.BytesIO(text.encode('utf-8')))) == RECORDS
+
+
+def test_generate_json_chunks_async():
+    """Tests that the values of an async iterator are encoded the same way."""
+
+    async def values():
+        for value in RECORDS:
+            yield value
+
+    async def encode():
+        return ''.join([chunk async for chunk in generate_json_chunks_async(values(), indent=2, chunk_size=100)])
+
+    assert asyncio.run(encode()) == json.dumps(RECORDS, indent=2)
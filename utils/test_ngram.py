@@ -0,0 +1,81 @@
+import random
+import re
+from constants.database import PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD
+from utils.ngram import generate_ngrams, generate_ngram_fields, generate_search_query
+from utils.test import create_random_string
+
+TEST_ITERATION_COUNT = 200
+MAX_STRING_LENGTH = 12
+
+
+def matches_search_query(record, query):
+    """Evaluates the subset of MongoDB query operators generated by generate_search_query() against a record.
+    Args:
+        record (dict): Record having domain, username and their n-gram fields.
+        query (dict): Query generated by generate_search_query().
+    Returns:
+        bool: True if the record is selected by the query, False otherwise.
+    """
+    for field, condition in query.items():
+        if '$all' in condition:
+            if not set(condition['$all']).issubset(record[field]):
+                return False
+        elif re.search(condition['$regex'], record[field], re.IGNORECASE) == None:
+            return False
+    return True
+
+
+def test_generate_ngrams():
+    """Tests that n-grams are distinct, sorted and generated from the lowercase text."""
+
+    assert generate_ngrams('AbCabc') == ['abc', 'bca', 'cab']
+
+
+def test_generate_ngrams_short_text():
+    """Tests that text shorter than the n-gram length has no n-grams."""
+
+    assert generate_ngrams('ab') == []
+
+
+def test_generate_search_query_short_text_uses_regex():
+    """Tests that text shorter than the n-gram length is searched with an escaped case-insensitive regex."""
+
+    query = generate_search_query('.c')
+    assert query == {
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: {'$regex': '\\.c', '$options': 'i'}
+    }
+
+
+def test_generate_search_query_with_username():
+    """Tests that the username condition is added only when username is specified.
+    Text as long as the n-gram length is searched with both the n-grams and the regex."""
+
+    query = generate_search_query('abc.com', 'Xyz')
+    assert query == {
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_NGRAMS_FIELD: {'$all': generate_ngrams('abc.com')},
+        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: {'$regex': 'abc\\.com', '$options': 'i'},
+        PASSWORD_MANAGER_COLLECTION_USERNAME_NGRAMS_FIELD: {'$all': ['xyz']},
+        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: {'$regex': 'Xyz', '$options': 'i'}
+    }
+
+
+def test_search_query_has_no_false_negatives():
+    """This test runs TEST_ITERATION_COUNT times.
+    A random record and a random substring of its domain and username are generated.
+    Assertion is made that the search query selects the record as a candidate.
+    """
+    for _ in range(TEST_ITERATION_COUNT):
+        domain = create_random_string(MAX_STRING_LENGTH)
+        username = create_random_string(MAX_STRING_LENGTH)
+        record = {
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain,
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username
+        }
+        record.update(generate_ngram_fields(domain, username))
+        start = random.randint(0, len(domain) - 1)
+        domain_text = domain[start: random.randint(start + 1, len(domain))]
+        start = random.randint(0, len(username) - 1)
+        username_text = username[start: random.randint(
+            start + 1, len(username))].swapcase()
+        assert matches_search_query(
+            record, generate_search_query(domain_text, username_text))
@@ -0,0 +1,26 @@
+import pytest
+from utils.page_token import encode_page_token, decode_page_token
+from utils.test import create_random_string
+
+TEST_ITERATION_COUNT = 200
+
+
+def test_page_token_round_trip():
+    """Tests that decode_page_token() returns the domain and username passed to encode_page_token().
+    Expects the same domain and username for random and non-ascii strings."""
+
+    cases = [('abc.com', 'abc@xyz.com'), ('', ''), ('dömain', 'ユーザー')]
+    for _ in range(TEST_ITERATION_COUNT):
+        cases.append((create_random_string(12), create_random_string(12)))
+    for domain, username in cases:
+        assert decode_page_token(encode_page_token(
+            domain, username)) == (domain, username)
+
+
+def test_page_token_malformed():
+    """Tests decode_page_token() with tokens that were not generated by encode_page_token().
+    Expects ValueError."""
+
+    for page_token in ['', 'abc', '!!!!', 'WzFd', 'eyJhIjogMX0=', 'ö']:
+        with pytest.raises(ValueError):
+            decode_page_token(page_token)
@@ -0,0 +1,62 @@
+from mock import patch
+from utils.request_timing import Histogram, RequestTimings, start_request, finish_request, get_request_timings, time_stage, time_iteration, format_server_timing
+
+
+def test_request_timings_nested_stages():
+    """Tests RequestTimings with a stage nested in another stage.
+    Expects the time of the nested stage to be excluded from the outer stage."""
+
+    with patch('utils.request_timing.time.perf_counter', side_effect=[0.0, 1.0, 2.0, 5.0, 7.0, 10.0]):
+        timings = RequestTimings()
+        timings.enter('crypto')
+        timings.enter('key_derivation')
+        timings.exit()
+        timings.exit()
+        assert timings.durations == {'crypto': 3.0, 'key_derivation': 3.0}
+        assert format_server_timing(
+            timings) == 'key_derivation;dur=3000.000, crypto;dur=3000.000, total;dur=10000.000'
+
+
+def test_time_stage_outside_of_request():
+    """Tests time_stage() and time_iteration() when no request is recorded.
+    Expects nothing to be recorded and the iterable to be returned as it is."""
+
+    values = [1, 2]
+    with time_stage('db'):
+        pass
+    assert time_iteration(values, 'db') is values
+    assert get_request_timings() == None
+
+
+def test_time_stage_during_request():
+    """Tests time_stage() and time_iteration() between start_request() and finish_request().
+    Expects the stages to be recorded and the request to be cleared when it finishes."""
+
+    timings = start_request()
+    with time_stage('db'):
+        pass
+    assert list(time_iteration([1, 2, 3], 'encode')) == [1, 2, 3]
+    assert get_request_timings() is timings
+    assert set(timings.durations) == {'db', 'encode'}
+    finish_request('query')
+    assert get_request_timings() == None
+
+
+def test_histogram_render():
+    """Tests the Histogram class with observations in different buckets.
+    Expects cumulative bucket counts, sum and count in the Prometheus text format."""
+
+    histogram = Histogram('latency_seconds', 'Latency.',
+                          'stage', buckets=[0.1, 1.0])
+    histogram.observe('db', 0.05)
+    histogram.observe('db', 0.5)
+    histogram.observe('db', 5.0)
+    assert histogram.render() == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{stage="db",le="0.1"} 1',
+        'latency_seconds_bucket{stage="db",le="1.0"} 2',
+        'latency_seconds_bucket{stage="db",le="+Inf"} 3',
+        'latency_seconds_sum{stage="db"} 5.55',
+        'latency_seconds_count{stage="db"} 3'
+    ]
@@ -0,0 +1,42 @@
+from constants.request_parameters import BODY_RECORDS_PARAM
+from constants.response_messages import ERROR_RECORDS_REQUIRED
+from validator.request_validator import RequestValidator
+
+
+class BulkInsertRequestValidator(RequestValidator):
+    """Child class for validation of bulk insert requests.
+
+    isValid() of this class calls isValid() of parent class.
+    The records themselves are validated one by one while the records file is streamed by the processor.
+    """
+
+    def __init__(self, request, dbclient):
+        """
+        Args:
+            request (Request): The flask request received from the client.
+            dbclient (DbClient): The database client object.
+        """
+        super().__init__(request, dbclient)
+
+    def isValid(self):
+        """ Validates the bulk insert requests. Calls into parent's isValid() function.
+        The following validations are performed:
+
+        1. The master password and key aren't being rotated.
+        2. Records file exists in the request.
+        Returns:
+            ((bool, str)): Whether the bulk insert request is valid or not, Error message if any.
+        """
+        try:
+            super().isValid()
+            self.assertNoRotationInProgress()
+            self.__assertRecordsFileExistsInRequest()
+            return True, None
+        except Exception as e:
+            message = e.args[0]
+            return False, message
+
+    def __assertRecordsFileExistsInRequest(self):
+        """Asserts that the records file exists in the request."""
+        assert self.request.files.get(
+            BODY_RECORDS_PARAM) != None, ERROR_RECORDS_REQUIRED
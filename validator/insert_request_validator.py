@@ -1,6 +1,5 @@
 from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM
-from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD
-from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED, ERROR_DUPLICATE_DOMAIN_USERNAME
+from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED
 from validator.request_validator import RequestValidator
 
 
@@ -8,41 +7,38 @@ class InsertRequestValidator(RequestValidator):
     """Child class for validation of insert requests.
 
     isValid() of this class calls isValid() of parent class.
-
-    Attributes:
-        password_manager_collection (Collection): Password manager collection.
     """
-    password_manager_collection = None
 
-    def __init__(self, request, dbclient):
+    def __init__(self, request, dbclient, context=None):
         """
         Args:
             request (Request): The flask request received from the client.
             dbclient (DbClient): The database client object.
+            context (RequestContext, optional): The context of the request. Defaults to None.
         """
-        super().__init__(request, dbclient)
-        self.password_manager_collection = dbclient.get_collection(
-            PASSWORD_MANAGER_COLLECTION_NAME)
+        super().__init__(request, dbclient, context)
 
     def isValid(self):
         """ Validates the insert requests. Calls into parent's isValid() function.
         The following validations are performed:
 
-        1. Domain exists and is non-empty.
-        2. Username exists and is non-empty.
-        3. At one secret exists in the request list.
-        4. All secrets are non-empty.
-        5. The domain and username combination is unique and doesn't already exist in the password manager collection.
+        1. The master password and key aren't being rotated.
+        2. Domain exists and is non-empty.
+        3. Username exists and is non-empty.
+        4. At one secret exists in the request list.
+        5. All secrets are non-empty.
+
+        The uniqueness of domain and username combination is enforced by the unique index when the record is inserted.
         Returns:
             ((bool, str)): Whether the insert request is valid or not, Error message if any.
         """
         try:
             super().isValid()
+            self.assertNoRotationInProgress()
             self.__assertDomainFieldExistsInRequest()
             self.__assertUsernameFieldExistsInRequest()
             self.__assertAtleastOneSecretFieldExistsInRequest()
             self.__assertAllSecretsAreValid()
-            self.__assertUniqueDomainAndUsername()
             return True, None
         except Exception as e:
             message = e.args[0]
@@ -75,12 +71,3 @@ class InsertRequestValidator(RequestValidator):
         for secret in secrets:
             assert secret != None, ERROR_SECRETS_REQUIRED
             assert len(secret) > 0, ERROR_SECRETS_REQUIRED
-
-    def __assertUniqueDomainAndUsername(self):
-        """Asserts that the domain and username combination is unique."""
-        cursor = self.password_manager_collection.find({
-            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.request.form.get(BODY_DOMAIN_PARAM),
-            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: self.request.form.get(
-                BODY_USERNAME_PARAM)
-        })
-        assert cursor.count() == 0, ERROR_DUPLICATE_DOMAIN_USERNAME
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+import weakref
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_CACHE_TTL_SECONDS
+from constants.response_messages import ERROR_MULTIPLE_MASTER_ROWS
+from database.dbclient import find_at_most
+from pymongo.errors import PyMongoError
+
+
+class MasterCredentialCache:
+    """A process-local cache of the single row of master collection that holds the master password and master key hashes.
+
+    The row is fetched again once its time to live expires or after invalidate() is called.
+    If watch_changes() is called, any change to the master collection invalidates the row as soon as it happens.
+
+    Attributes:
+        master_password_collection (Collection): The collection in which master password and master key is stored.
+        ttl (float): Number of seconds the row stays in the cache.
+        clock (function): Returns the current time in seconds.
+        document (dict): The cached row. None if the row is not cached.
+        expiry (float): The time at which the cached row expires.
+        generation (int): Incremented on every invalidation, so that a fetch racing with an invalidation is not cached.
+        lock (Lock): Lock guarding the cached row.
+    """
+    master_password_collection = None
+    ttl = None
+    clock = None
+    document = None
+    expiry = None
+    generation = None
+    lock = None
+
+    def __init__(self, master_password_collection, ttl=MASTER_PASSWORD_CACHE_TTL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            master_password_collection (Collection): The collection in which master password and master key is stored.
+            ttl (float, optional): Number of seconds the row stays in the cache. Defaults to MASTER_PASSWORD_CACHE_TTL_SECONDS.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.master_password_collection = master_password_collection
+        self.ttl = ttl
+        self.clock = clock
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get_document(self):
+        """Returns the row of master collection, fetching it if it is not cached or has expired.
+        The row is not cached if the master collection doesn't have exactly one row.
+        Returns:
+            dict: The row having master password and master key hashes.
+        """
+        with self.lock:
+            if self.document != None and self.clock() < self.expiry:
+                return self.document
+            generation = self.generation
+        documents = find_at_most(self.master_password_collection, {}, 2)
+        assert len(documents) == 1, ERROR_MULTIPLE_MASTER_ROWS
+        document = documents[0]
+        with self.lock:
+            if generation == self.generation:
+                self.document = document
+                self.expiry = self.clock() + self.ttl
+        return document
+
+    def invalidate(self):
+        """Drops the cached row. It must be called whenever the master password and master key are rotated."""
+        with self.lock:
+            self.document = None
+            self.expiry = None
+            self.generation += 1
+
+    def watch_changes(self):
+        """Starts a daemon thread that invalidates the cached row on every change to the master collection.
+        Change streams require a replica set. If they are unavailable the thread exits and the time to live is relied on.
+        Returns:
+            Thread: The started thread.
+        """
+        thread = threading.Thread(target=self.__watch, daemon=True)
+        thread.start()
+        return thread
+
+    def __watch(self):
+        """Invalidates the cached row for every event of the change stream on the master collection."""
+        try:
+            with self.master_password_collection.watch() as stream:
+                for _ in stream:
+                    self.invalidate()
+        except PyMongoError as e:
+            logging.getLogger(__name__).warning(
+                'Master collection change stream unavailable, relying on TTL: %s', e)
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_master_credential_cache(dbclient):
+    """Returns the master credential cache of the database client. The cache is created on the first call.
+    Args:
+        dbclient (DbClient): The database client object.
+    Returns:
+        MasterCredentialCache: The cache shared by all requests using the database client.
+    """
+    with _caches_lock:
+        if dbclient not in _caches:
+            _caches[dbclient] = MasterCredentialCache(
+                dbclient.get_collection(MASTER_PASSWORD_COLLECTION_NAME))
+        return _caches[dbclient]
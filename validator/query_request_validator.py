@@ -1,5 +1,7 @@
-from constants.request_parameters import BODY_QUERY_TYPE_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
-from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED, ERROR_DUPLICATE_DOMAIN_USERNAME, ERROR_QUERY_TYPE_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK
+from constants.request_parameters import BODY_INDENT_PARAM, BODY_LIMIT_PARAM, BODY_PAGE_TOKEN_PARAM, BODY_QUERY_TYPE_PARAM, BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_SECRET_PARAM, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE
+from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED, ERROR_DUPLICATE_DOMAIN_USERNAME, ERROR_QUERY_TYPE_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED, ERROR_TOO_MANY_SELECTORS, ERROR_INVALID_INDENT, ERROR_INVALID_LIMIT, ERROR_INVALID_PAGE_TOKEN, ERROR_PAGE_TOKEN_REQUIRES_LIMIT
+from constants.search_config import QUERY_RESPONSE_MAX_INDENT, QUERY_SEARCH_MAX_LIMIT, MAX_QUERY_SELECTORS
+from utils.page_token import decode_page_token
 from validator.request_validator import RequestValidator
 
 
@@ -15,14 +17,15 @@ class QueryRequestValidator(RequestValidator):
     password_manager_collection = None
     acceptable_query_type = None
 
-    def __init__(self, request, dbclient, acceptable_query_type=[QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE]):
+    def __init__(self, request, dbclient, acceptable_query_type=[QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE], context=None):
         """
         Args:
             request (Request): The flask request received from the client.
             dbclient (DbClient): The database client object.
-            acceptable_query_type (list, optional): By default, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE and QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE are acceptable.
+            acceptable_query_type (list, optional): By default, QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE and QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE are acceptable.
+            context (RequestContext, optional): The context of the request. Defaults to None.
         """
-        super().__init__(request, dbclient)
+        super().__init__(request, dbclient, context=context)
         self.acceptable_query_type = acceptable_query_type
 
     def isValid(self):
@@ -32,6 +35,11 @@ class QueryRequestValidator(RequestValidator):
         1. Query type parameter exists and the query type is acceptable.
         2. Domain exists and is non-empty.
         3. If the username exists in request, then it should be non-empty.
+        4. If the query type is QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE, then every domain is paired with a non-empty username
+           and there are at most MAX_QUERY_SELECTORS pairs.
+        5. If the indent exists in request, then it is an integer from 0 to QUERY_RESPONSE_MAX_INDENT.
+        6. If the limit exists in request, then it is an integer from 1 to QUERY_SEARCH_MAX_LIMIT.
+        7. If the page token exists in request, then it can be decoded and the limit exists too, so that every page is bounded.
         Returns:
             ((bool, str)): Whether the query request is valid or not, Error message if any.
         """
@@ -41,6 +49,10 @@ class QueryRequestValidator(RequestValidator):
             self.__assertQueryTypeIsAcceptable()
             self.__assertDomainFieldExistsInRequest()
             self.__assertIfUsernameExistsThenIsValid()
+            self.__assertIfMultipleQueryTypeThenDomainAndUsernamePaired()
+            self.__assertIfIndentExistsThenIsValid()
+            self.__assertIfLimitExistsThenIsValid()
+            self.__assertIfPageTokenExistsThenIsValid()
             return True, None
         except Exception as e:
             message = e.args[0]
@@ -68,3 +80,40 @@ class QueryRequestValidator(RequestValidator):
         if self.request.form.get(BODY_USERNAME_PARAM) != None:
             assert len(self.request.form.get(BODY_USERNAME_PARAM)
                        ) > 0, ERROR_USERNAME_SPECIFIED_BUT_BLANK
+
+    def __assertIfMultipleQueryTypeThenDomainAndUsernamePaired(self):
+        """Asserts that if the query type is QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE, then every domain parameter
+        has a corresponding non-empty username parameter, and that there are at most MAX_QUERY_SELECTORS pairs."""
+        if self.request.form.get(BODY_QUERY_TYPE_PARAM) == QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE:
+            domains = self.request.form.getlist(BODY_DOMAIN_PARAM)
+            usernames = self.request.form.getlist(BODY_USERNAME_PARAM)
+            assert usernames != None and len(domains) == len(
+                usernames), ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED
+            assert len(domains) <= MAX_QUERY_SELECTORS, ERROR_TOO_MANY_SELECTORS
+            for domain, username in zip(domains, usernames):
+                assert len(domain) > 0, ERROR_DOMAIN_REQUIRED
+                assert len(username) > 0, ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED
+
+    def __assertIfIndentExistsThenIsValid(self):
+        """Asserts that if the indent parameter exists in the request, then it is an integer from 0 to QUERY_RESPONSE_MAX_INDENT."""
+        if self.request.form.get(BODY_INDENT_PARAM) != None:
+            indent = self.request.form.get(BODY_INDENT_PARAM)
+            assert indent.isdecimal(), ERROR_INVALID_INDENT
+            assert int(indent) <= QUERY_RESPONSE_MAX_INDENT, ERROR_INVALID_INDENT
+
+    def __assertIfLimitExistsThenIsValid(self):
+        """Asserts that if the limit parameter exists in the request, then it is an integer from 1 to QUERY_SEARCH_MAX_LIMIT."""
+        if self.request.form.get(BODY_LIMIT_PARAM) != None:
+            limit = self.request.form.get(BODY_LIMIT_PARAM)
+            assert limit.isdecimal(), ERROR_INVALID_LIMIT
+            assert 1 <= int(limit) <= QUERY_SEARCH_MAX_LIMIT, ERROR_INVALID_LIMIT
+
+    def __assertIfPageTokenExistsThenIsValid(self):
+        """Asserts that if the page token parameter exists in the request, then the limit parameter exists too and it is a page token of a previous search response."""
+        if self.request.form.get(BODY_PAGE_TOKEN_PARAM) != None:
+            assert self.request.form.get(
+                BODY_LIMIT_PARAM) != None, ERROR_PAGE_TOKEN_REQUIRES_LIMIT
+            try:
+                decode_page_token(self.request.form.get(BODY_PAGE_TOKEN_PARAM))
+            except ValueError:
+                raise AssertionError(ERROR_INVALID_PAGE_TOKEN)
@@ -1,7 +1,10 @@
+from constants.metrics_config import STAGE_MASTER_VALIDATION
 from constants.request_parameters import BODY_MASTER_PASSWORD_PARAM, BODY_MASTER_KEY_PARAM
-from constants.database import MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD
-from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_MASTER_KEY, ERROR_MULTIPLE_MASTER_ROWS
+from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD
+from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_MASTER_KEY, ERROR_ROTATION_IN_PROGRESS
 from utils.hash import generate_hash
+from utils.request_timing import time_stage
+from validator.master_credential_cache import get_master_credential_cache
 
 
 class RequestValidator:
@@ -9,23 +12,29 @@ class RequestValidator:
 
     This class is extended by all the validators.
     isValid() of this class should be called to validate the master password and master key.
+    The validators of requests that write secrets also call assertNoRotationInProgress().
 
     Attributes:
         request (Request): Flask request object received from the client.
-        master_password_collection (Collection): The collection in which master password and master key is stored.
+        master_credential_cache (MasterCredentialCache): The process-local cache of the master collection row.
+        context (RequestContext): The context of the request where the loaded data is stored for the processor. It can be None.
+        master_document (dict): The master collection row against which the master password and key were validated.
     """
     request = None
-    master_password_collection = None
+    master_credential_cache = None
+    context = None
+    master_document = None
 
-    def __init__(self, request, dbclient):
+    def __init__(self, request, dbclient, context=None):
         """
         Args:
             request (Request): The request object received from the client.
             dbclient (DbClient): The database client object.
+            context (RequestContext, optional): The context of the request. Defaults to None.
         """
         self.request = request
-        self.master_password_collection = dbclient.get_collection(
-            MASTER_PASSWORD_COLLECTION_NAME)
+        self.master_credential_cache = get_master_credential_cache(dbclient)
+        self.context = context
 
     def isValid(self):
         """Asserts if the master password and master key are valid.
@@ -39,6 +48,12 @@ class RequestValidator:
         self.__assertMasterKeyExists()
         self.__assertMasterPasswordAndKeyValid()
 
+    def assertNoRotationInProgress(self):
+        """Asserts that the master password and key aren't being rotated, as the secrets written during a rotation would be encrypted with the old ones.
+        It must be called after isValid()."""
+        assert self.master_document.get(
+            MASTER_PASSWORD_COLLECTION_ROTATION_FIELD) == None, ERROR_ROTATION_IN_PROGRESS
+
     def __assertMasterPasswordExists(self):
         """Asserts that the master password exists in request and is non-empty."""
         assert self.request.form.get(
@@ -56,11 +71,12 @@ class RequestValidator:
     def __assertMasterPasswordAndKeyValid(self):
         """Asserts that the master password and key matches the one present in database.
         Master password and key is stored as SHA2 in a single row in the master collection.
+        The row is read from the master credential cache, so the database is only queried when the cached row expires.
         """
-        cursor = self.master_password_collection.find()
-        assert cursor.count() == 1, ERROR_MULTIPLE_MASTER_ROWS
-        document = cursor.next()
-        assert document[MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD] == generate_hash(
-            self.request.form.get(BODY_MASTER_PASSWORD_PARAM)), ERROR_MASTER_PASSWORD
-        assert document[MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD] == generate_hash(
-            self.request.form.get(BODY_MASTER_KEY_PARAM)), ERROR_MASTER_KEY
+        with time_stage(STAGE_MASTER_VALIDATION):
+            document = self.master_credential_cache.get_document()
+            assert document[MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD] == generate_hash(
+                self.request.form.get(BODY_MASTER_PASSWORD_PARAM)), ERROR_MASTER_PASSWORD
+            assert document[MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD] == generate_hash(
+                self.request.form.get(BODY_MASTER_KEY_PARAM)), ERROR_MASTER_KEY
+        self.master_document = document
@@ -0,0 +1,30 @@
+from validator.bulk_insert_request_validator import BulkInsertRequestValidator
+from constants.response_messages import ERROR_RECORDS_REQUIRED
+from utils.test import create_mock_request, create_mock_dbclient_with_master_collection
+
+
+def test_bulk_insert_request_validator_records_missing():
+    """Tests the BulkInsertRequestValidator class with missing records file.
+    Expects validation failure and correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234')
+    dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                           master_key='1234')
+    valid, message = BulkInsertRequestValidator(request, dbclient).isValid()
+    assert valid == False
+    assert message == ERROR_RECORDS_REQUIRED
+
+
+def test_bulk_insert_request_validator_valid_request():
+    """Tests the BulkInsertRequestValidator class with valid request.
+    Expects validation success and no error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  records=b'[]')
+    dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                           master_key='1234')
+    valid, message = BulkInsertRequestValidator(request, dbclient).isValid()
+    assert valid == True
+    assert message == None
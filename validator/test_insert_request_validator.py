@@ -1,8 +1,9 @@
 from validator.insert_request_validator import InsertRequestValidator
 from constants.request_parameters import QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
-from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD
-from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED, ERROR_DUPLICATE_DOMAIN_USERNAME
-from utils.test import create_mock_request, create_mock_dbclient_with_master_collection, create_mock_dbclient_with_master_and_password_manager_collection
+from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD
+from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_REQUIRED, ERROR_SECRETS_REQUIRED, ERROR_ATLEAST_ONE_SECRET_REQUIRED, ERROR_ROTATION_IN_PROGRESS
+from utils.hash import generate_hash
+from utils.test import create_mock_request, create_mock_dbclient, create_mock_collection, create_mock_cursor, create_mock_dbclient_with_master_collection, create_mock_dbclient_with_master_and_password_manager_collection
 
 
 def test_insert_request_validator_domain_missing():
@@ -64,9 +65,9 @@ def test_insert_request_validator_secrets_invalid():
     assert message == ERROR_SECRETS_REQUIRED
 
 
-def test_insert_request_validator_domain_username_already_exists():
-    """Tests the InsertRequestValidator class with domain and username already existing in password manager collection.
-    Expects validation failure and correct error message."""
+def test_insert_request_validator_valid_request():
+    """Tests the InsertRequestValidator class with valid request.
+    Expects validation success and no error message."""
 
     request = create_mock_request(master_password='abcd',
                                   master_key='1234',
@@ -75,26 +76,29 @@ def test_insert_request_validator_domain_username_already_exists():
                                   secret=['some_secret'])
     dbclient = create_mock_dbclient_with_master_and_password_manager_collection(master_password='abcd',
                                                                                 master_key='1234',
-                                                                                domain='some_domain',
-                                                                                username='some_username')
+                                                                                domain=None,
+                                                                                username=None)
     valid, message = InsertRequestValidator(request, dbclient).isValid()
-    assert valid == False
-    assert message == ERROR_DUPLICATE_DOMAIN_USERNAME
+    assert valid == True
+    assert message == None
 
 
-def test_insert_request_validator_valid_request():
-    """Tests the InsertRequestValidator class with valid request.
-    Expects validation success and no error message."""
+def test_insert_request_validator_rotation_in_progress():
+    """Tests the InsertRequestValidator class with a valid request while the master password and key are being rotated.
+    Expects validation failure and correct error message."""
 
     request = create_mock_request(master_password='abcd',
                                   master_key='1234',
                                   domain='some_domain',
                                   username='some_username',
                                   secret=['some_secret'])
-    dbclient = create_mock_dbclient_with_master_and_password_manager_collection(master_password='abcd',
-                                                                                master_key='1234',
-                                                                                domain=None,
-                                                                                username=None)
+    master_collection = create_mock_cursor(cursor_values=[{
+        MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash('abcd'),
+        MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash('1234'),
+        MASTER_PASSWORD_COLLECTION_ROTATION_FIELD: {'state': 'reencrypting'}
+    }])
+    dbclient = create_mock_dbclient(collection=create_mock_collection(
+        find_return_value1=master_collection))
     valid, message = InsertRequestValidator(request, dbclient).isValid()
-    assert valid == True
-    assert message == None
+    assert valid == False
+    assert message == ERROR_ROTATION_IN_PROGRESS
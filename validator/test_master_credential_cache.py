@@ -0,0 +1,99 @@
+import pytest
+from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD
+from constants.response_messages import ERROR_MULTIPLE_MASTER_ROWS
+from mock import Mock
+from utils.hash import generate_hash
+from utils.test import create_mock_clock, create_mock_cursor, create_mock_dbclient_with_master_collection
+from validator.master_credential_cache import MasterCredentialCache, get_master_credential_cache
+
+
+def create_master_document(master_password, master_key):
+    """Creates a row of master collection.
+    Args:
+        master_password (str): Master password whose hash is stored in the row.
+        master_key (str): Master key whose hash is stored in the row.
+    Returns:
+        dict: The row.
+    """
+    return {
+        MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash(master_password),
+        MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash(master_key)
+    }
+
+
+def create_master_collection(*documents):
+    """Creates a mock master collection whose find() returns a new cursor over the given rows on every call.
+    Args:
+        documents (dict): The rows of the collection.
+    Returns:
+        Mock: Mock Collection object.
+    """
+    collection = Mock()
+    collection.find = Mock(
+        side_effect=lambda *args: create_mock_cursor(cursor_values=list(documents)))
+    return collection
+
+
+def test_master_credential_cache_hit():
+    """Tests that the row is fetched once and served from the cache afterwards."""
+
+    collection = create_master_collection(
+        create_master_document('abcd', '1234'))
+    cache = MasterCredentialCache(collection)
+    assert cache.get_document() == create_master_document('abcd', '1234')
+    assert cache.get_document() == create_master_document('abcd', '1234')
+    assert collection.find.call_count == 1
+
+
+def test_master_credential_cache_ttl_expiry():
+    """Tests that the row is fetched again once it expires."""
+
+    clock = create_mock_clock()
+    collection = create_master_collection(
+        create_master_document('abcd', '1234'))
+    cache = MasterCredentialCache(collection, ttl=30, clock=clock)
+    cache.get_document()
+    clock.now = 29
+    cache.get_document()
+    assert collection.find.call_count == 1
+    clock.now = 30
+    cache.get_document()
+    assert collection.find.call_count == 2
+
+
+def test_master_credential_cache_invalidate():
+    """Tests that the row is fetched again after invalidation."""
+
+    collection = create_master_collection(
+        create_master_document('abcd', '1234'))
+    cache = MasterCredentialCache(collection)
+    cache.get_document()
+    cache.invalidate()
+    cache.get_document()
+    assert collection.find.call_count == 2
+
+
+def test_master_credential_cache_multiple_rows_not_cached():
+    """Tests that an inconsistent master collection fails every lookup and is never cached."""
+
+    collection = create_master_collection(create_master_document(
+        'abcd', '1234'), create_master_document('dcba', '4321'))
+    cache = MasterCredentialCache(collection)
+    for _ in range(2):
+        with pytest.raises(AssertionError) as e:
+            cache.get_document()
+        assert e.value.args[0] == ERROR_MULTIPLE_MASTER_ROWS
+    assert collection.find.call_count == 2
+
+
+def test_get_master_credential_cache_shared_per_dbclient():
+    """Tests that the same cache is returned for a database client and different caches for different clients."""
+
+    dbclient = create_mock_dbclient_with_master_collection(
+        master_password='abcd', master_key='1234')
+    other_dbclient = create_mock_dbclient_with_master_collection(
+        master_password='abcd', master_key='1234')
+    assert get_master_credential_cache(
+        dbclient) is get_master_credential_cache(dbclient)
+    assert get_master_credential_cache(
+        dbclient) is not get_master_credential_cache(other_dbclient)
@@ -1,7 +1,9 @@
 from validator.query_request_validator import QueryRequestValidator
-from constants.request_parameters import QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE
+from constants.request_parameters import QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_DOMAIN_AND_USERNAME_TYPE, QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE
 from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD
-from constants.response_messages import ERROR_QUERY_TYPE_REQUIRED, ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK
+from constants.response_messages import ERROR_QUERY_TYPE_REQUIRED, ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED, ERROR_TOO_MANY_SELECTORS, ERROR_INVALID_INDENT, ERROR_INVALID_LIMIT, ERROR_INVALID_PAGE_TOKEN, ERROR_PAGE_TOKEN_REQUIRES_LIMIT
+from constants.search_config import MAX_QUERY_SELECTORS
+from utils.page_token import encode_page_token
 from utils.test import create_mock_request, create_mock_dbclient_with_master_collection
 
 
@@ -96,3 +98,120 @@ def test_query_request_validator_username_present_and_non_empty():
                                            ]).isValid()
     assert valid == True
     assert message == None
+
+
+def test_query_request_validator_multiple_records_unpaired_domain():
+    """Tests the QueryRequestValidator class with query for many records having a domain without username.
+    Expects validation failure and correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE,
+                                  domain=['abc.com', 'xyz.com'],
+                                  username=['user1'])
+    dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                           master_key='1234')
+    valid, message = QueryRequestValidator(request, dbclient).isValid()
+    assert valid == False
+    assert message == ERROR_DOMAIN_AND_USERNAME_PAIRS_REQUIRED
+
+
+def test_query_request_validator_multiple_records_valid_request():
+    """Tests the QueryRequestValidator class with query for many records having paired domains and usernames.
+    Expects validation success and no error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE,
+                                  domain=['abc.com', 'xyz.com'],
+                                  username=['user1', 'user2'])
+    dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                           master_key='1234')
+    valid, message = QueryRequestValidator(request, dbclient).isValid()
+    assert valid == True
+    assert message == None
+
+
+def test_query_request_validator_multiple_records_too_many_selectors():
+    """Tests the QueryRequestValidator class with query for more than MAX_QUERY_SELECTORS records, and for exactly MAX_QUERY_SELECTORS records.
+    Expects validation failure and correct error message, and validation success."""
+
+    for count, valid_request in [(MAX_QUERY_SELECTORS + 1, False), (MAX_QUERY_SELECTORS, True)]:
+        request = create_mock_request(master_password='abcd',
+                                      master_key='1234',
+                                      query_type=QUERY_GET_SECRETS_FOR_MULTIPLE_DOMAIN_AND_USERNAME_TYPE,
+                                      domain=['abc.com'] * count,
+                                      username=['user{}'.format(index) for index in range(count)])
+        dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                               master_key='1234')
+        valid, message = QueryRequestValidator(request, dbclient).isValid()
+        assert valid == valid_request
+        assert message == (None if valid_request else ERROR_TOO_MANY_SELECTORS)
+
+
+def test_query_request_validator_invalid_indent():
+    """Tests the QueryRequestValidator class with indent that is not an integer from 0 to QUERY_RESPONSE_MAX_INDENT.
+    Expects validation failure and correct error message."""
+
+    for indent in ['-1', 'two', '', '9']:
+        request = create_mock_request(master_password='abcd',
+                                      master_key='1234',
+                                      query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                      domain='abc.com',
+                                      indent=indent)
+        dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                               master_key='1234')
+        valid, message = QueryRequestValidator(request, dbclient).isValid()
+        assert valid == False
+        assert message == ERROR_INVALID_INDENT
+
+
+def test_query_request_validator_invalid_limit():
+    """Tests the QueryRequestValidator class with limit that is not an integer from 1 to QUERY_SEARCH_MAX_LIMIT.
+    Expects validation failure and correct error message."""
+
+    for limit in ['0', '-1', 'ten', '', '1001']:
+        request = create_mock_request(master_password='abcd',
+                                      master_key='1234',
+                                      query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                      domain='abc.com',
+                                      limit=limit)
+        dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                               master_key='1234')
+        valid, message = QueryRequestValidator(request, dbclient).isValid()
+        assert valid == False
+        assert message == ERROR_INVALID_LIMIT
+
+
+def test_query_request_validator_invalid_page_token():
+    """Tests the QueryRequestValidator class with page token that is not a page token of a search response.
+    Expects validation failure and correct error message."""
+
+    for page_token in ['abc', 'WzFd', '']:
+        request = create_mock_request(master_password='abcd',
+                                      master_key='1234',
+                                      query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                      domain='abc.com',
+                                      limit='10',
+                                      page_token=page_token)
+        dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                               master_key='1234')
+        valid, message = QueryRequestValidator(request, dbclient).isValid()
+        assert valid == False
+        assert message == ERROR_INVALID_PAGE_TOKEN
+
+
+def test_query_request_validator_page_token_without_limit():
+    """Tests the QueryRequestValidator class with a page token but no limit.
+    Expects validation failure and correct error message."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  query_type=QUERY_SEARCH_BY_DOMAIN_AND_USERNAME_TYPE,
+                                  domain='abc.com',
+                                  page_token=encode_page_token('abc.com', 'user1'))
+    dbclient = create_mock_dbclient_with_master_collection(master_password='abcd',
+                                                           master_key='1234')
+    valid, message = QueryRequestValidator(request, dbclient).isValid()
+    assert valid == False
+    assert message == ERROR_PAGE_TOKEN_REQUIRES_LIMIT
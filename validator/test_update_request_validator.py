@@ -1,6 +1,7 @@
 from validator.update_request_validator import UpdateRequestValidator
 from constants.database import MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD
-from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_SECRET_SPECIFIED_BUT_BLANK, ERROR_OLD_AND_NEW_USERNAME_SAME, ERROR_DUPLICATE_DOMAIN_NEW_USERNAME, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE
+from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_SECRET_SPECIFIED_BUT_BLANK, ERROR_OLD_AND_NEW_USERNAME_SAME, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE
+from middleware.request_context import RequestContext
 from utils.test import create_mock_request, create_mock_dbclient_with_master_collection, create_mock_dbclient_with_master_and_password_manager_collection, create_mock_dbclient_with_master_and_multiple_password_manager_collection
 
 
@@ -95,25 +96,6 @@ def test_update_request_validator_no_record_match():
     assert message == ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE
 
 
-def test_update_request_validator_domain_and_new_username_already_exists():
-    """Tests the UpdateRequestValidator class with domain and new username combination already existing in the password manager collection.
-    Expects validation failure and correct error message."""
-
-    request = create_mock_request(master_password='abcd',
-                                  master_key='1234',
-                                  domain='some_domain',
-                                  new_username='some_new_username')
-    dbclient = create_mock_dbclient_with_master_and_multiple_password_manager_collection(master_password='abcd',
-                                                                                         master_key='1234',
-                                                                                         domain1='some_domain',
-                                                                                         username1='some_username',
-                                                                                         domain2='some_domain',
-                                                                                         username2='some_new_username')
-    valid, message = UpdateRequestValidator(request, dbclient).isValid()
-    assert valid == False
-    assert message == ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
-
-
 def test_update_request_validator_valid_request():
     """Tests the UpdateRequestValidator class with a valid request.
     Expects validation success and no error message."""
@@ -133,3 +115,21 @@ def test_update_request_validator_valid_request():
     valid, message = UpdateRequestValidator(request, dbclient).isValid()
     assert valid == True
     assert message == None
+
+
+def test_update_request_validator_fills_request_context():
+    """Tests the UpdateRequestValidator class with a request context.
+    Expects the _id of the matched record to be stored in the context."""
+
+    request = create_mock_request(master_password='abcd',
+                                  master_key='1234',
+                                  domain='some_domain',
+                                  username='some_username')
+    dbclient = create_mock_dbclient_with_master_and_password_manager_collection(master_password='abcd',
+                                                                                master_key='1234',
+                                                                                domain='some_domain',
+                                                                                username='some_username')
+    context = RequestContext(request)
+    valid, _ = UpdateRequestValidator(request, dbclient, context).isValid()
+    assert valid == True
+    assert context.record_id == 1
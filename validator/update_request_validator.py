@@ -1,7 +1,7 @@
 from constants.request_parameters import BODY_DOMAIN_PARAM, BODY_USERNAME_PARAM, BODY_NEW_USERNAME_PARAM, BODY_NEW_SECRET_PARAM
 from constants.database import PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD
-from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_SECRET_SPECIFIED_BUT_BLANK, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE, ERROR_DUPLICATE_DOMAIN_NEW_USERNAME, ERROR_OLD_AND_NEW_USERNAME_SAME
-import hashlib
+from constants.response_messages import ERROR_DOMAIN_REQUIRED, ERROR_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_USERNAME_SPECIFIED_BUT_BLANK, ERROR_NEW_SECRET_SPECIFIED_BUT_BLANK, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE, ERROR_OLD_AND_NEW_USERNAME_SAME
+from database.dbclient import find_at_most
 from validator.request_validator import RequestValidator
 
 
@@ -15,13 +15,14 @@ class UpdateRequestValidator(RequestValidator):
     """
     password_manager_collection = None
 
-    def __init__(self, request, dbclient):
+    def __init__(self, request, dbclient, context=None):
         """
         Args:
             request (Request): The flask request received from the client.
             dbclient (DbClient): The database client object.
+            context (RequestContext, optional): The context of the request. The _id of the matched record is stored in it. Defaults to None.
         """
-        super().__init__(request, dbclient)
+        super().__init__(request, dbclient, context)
         self.password_manager_collection = dbclient.get_collection(
             PASSWORD_MANAGER_COLLECTION_NAME)
 
@@ -29,24 +30,26 @@ class UpdateRequestValidator(RequestValidator):
         """ Validates the update requests. Calls into parent's isValid() function.
         The following validations are performed:
 
-        1. Domain exists and is non-empty.
-        2. If username exists, then it is non-empty.
-        3. If new username exists, then it is non-empty.
-        4. All new secrets are valid and non-empty.
-        5. The domain (and username if specified) combination matches exactly one record in the password manager collection.
+        1. The master password and key aren't being rotated.
+        2. Domain exists and is non-empty.
+        3. If username exists, then it is non-empty.
+        4. If new username exists, then it is non-empty.
+        5. All new secrets are valid and non-empty.
+        6. The domain (and username if specified) combination matches exactly one record in the password manager collection.
            If the new username is specified, then the existing username must not be same as the new username.
-        6. If new username exists, the domain and new username combination is unique in the password manager collection.
+
+        The uniqueness of domain and new username combination is enforced by the unique index when the record is updated.
         Returns:
             ((bool, str)): Whether the update request is valid or not, Error message if any.
         """
         try:
             super().isValid()
+            self.assertNoRotationInProgress()
             self.__assertDomainFieldExistsInRequest()
             self.__assertIfUsernameExistsThenIsValid()
             self.__assertIfNewUsernameExistsThenIsValid()
             self.__assertIfNewSecretExistsThenIsValid()
             self.__assertOneRecordForDomainAndUsername()
-            self.__assertIfNewUsernameThenDomainAndNewUsernameUnique()
             return True, None
         except Exception as e:
             message = e.args[0]
@@ -81,29 +84,20 @@ class UpdateRequestValidator(RequestValidator):
 
     def __assertOneRecordForDomainAndUsername(self):
         """Asserts that the domain (and username if exists) matches exatly one record in the password manager collection.
-        Also asserts that the new username is not same as the old username in the record."""
-        cursor = None
-        if self.request.form.get(BODY_USERNAME_PARAM) == None:
-            cursor = self.password_manager_collection.find({
-                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.request.form.get(BODY_DOMAIN_PARAM),
-            })
-        else:
-            cursor = self.password_manager_collection.find({
-                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.request.form.get(BODY_DOMAIN_PARAM),
-                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: self.request.form.get(
-                    BODY_USERNAME_PARAM)
-            })
-        assert cursor.count() == 1, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE
+        Also asserts that the new username is not same as the old username in the record.
+        The _id of the record is stored in the request context, so that the processor updates it without matching it again."""
+        query = {
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.request.form.get(BODY_DOMAIN_PARAM)
+        }
+        if self.request.form.get(BODY_USERNAME_PARAM) != None:
+            query[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] = self.request.form.get(
+                BODY_USERNAME_PARAM)
+        records = find_at_most(self.password_manager_collection, query, 2, {
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 1
+        })
+        assert len(records) == 1, ERROR_SINGLE_RECORD_MATCH_REQUIRED_FOR_UPDATE
         if self.request.form.get(BODY_NEW_USERNAME_PARAM) != None:
-            assert cursor.next()[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] != self.request.form.get(
+            assert records[0][PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD] != self.request.form.get(
                 BODY_NEW_USERNAME_PARAM), ERROR_OLD_AND_NEW_USERNAME_SAME
-
-    def __assertIfNewUsernameThenDomainAndNewUsernameUnique(self):
-        """Asserts that if the new username field exists, then the domain and new username combination is non-empty."""
-        if self.request.form.get(BODY_NEW_USERNAME_PARAM) != None:
-            cursor = self.password_manager_collection.find({
-                PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: self.request.form.get(BODY_DOMAIN_PARAM),
-                PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: self.request.form.get(
-                    BODY_NEW_USERNAME_PARAM)
-            })
-            assert cursor.count() == 0, ERROR_DUPLICATE_DOMAIN_NEW_USERNAME
+        if self.context != None:
+            self.context.record_id = records[0]['_id']
@@ -0,0 +1,196 @@
+import hashlib
+import hmac
+import json
+import os
+import struct
+import zlib
+from Crypto.Cipher import AES
+from constants.vault_config import VAULT_FRAME_SIZE, VAULT_COMPRESSION_LEVEL
+
+# The archive starts with a header of the magic bytes, the format version and the salt of the archive key.
+ARCHIVE_MAGIC = b'PWDVAULT'
+# Version 2 stores a random nonce in every frame. Version 1 used the index of the frame as nonce, which a resumed export could reuse.
+ARCHIVE_VERSION = 2
+ARCHIVE_SALT_SIZE = 16
+ARCHIVE_HEADER = struct.Struct('>8sB16s')
+# Every frame starts with the length of its sealed payload, its flags and its random nonce.
+FRAME_NONCE_SIZE = 12
+FRAME_HEADER = struct.Struct('>IB12s')
+# Flag of the last frame of the archive. An archive without it is truncated.
+FRAME_FLAG_FINAL = 1
+FRAME_TAG_SIZE = 16
+# Context of the derivation of the archive key, so that the cipher key of the vault is never used directly by the archive.
+ARCHIVE_KEY_CONTEXT = b'pwdmngr-vault-archive'
+
+
+def derive_archive_key(cipher_key, salt):
+    """Derives the key of an archive from the cipher key of the vault and the salt of the archive.
+    Args:
+        cipher_key (bytes): The cipher key of the master password and master key.
+        salt (bytes): The salt of the archive.
+    Returns:
+        bytes: The 256 bit AES key of the archive.
+    """
+    return hmac.new(cipher_key, ARCHIVE_KEY_CONTEXT + salt, hashlib.sha256).digest()
+
+
+def read_archive_header(stream):
+    """Reads the header at the start of an archive.
+    Args:
+        stream (file): Binary stream of the archive positioned at its start.
+    Returns:
+        bytes: The header.
+    Raises:
+        ValueError: If the stream isn't an archive of a supported version.
+    """
+    header = stream.read(ARCHIVE_HEADER.size)
+    if len(header) != ARCHIVE_HEADER.size:
+        raise ValueError('Not a vault archive')
+    magic, version, _ = ARCHIVE_HEADER.unpack(header)
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError('Not a vault archive')
+    if version != ARCHIVE_VERSION:
+        raise ValueError('Unsupported vault archive version {}'.format(version))
+    return header
+
+
+def create_frame_cipher(key, header, index, flags, nonce):
+    """Creates the cipher of a frame.
+    The nonce is random rather than derived from the index, as a resumed export writes the frames after its checkpoint again
+    with other records, and a frame written before an interruption may have been copied.
+    The header, index, flags and nonce are authenticated, so frames can't be reordered, moved to another archive or marked as the last one.
+    Args:
+        key (bytes): The key of the archive.
+        header (bytes): The header of the archive.
+        index (int): The index of the frame.
+        flags (int): The flags of the frame.
+        nonce (bytes): The random nonce of the frame.
+    Returns:
+        AESCipher: The AES cipher in GCM mode.
+    """
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(header + struct.pack('>QB', index, flags) + nonce)
+    return cipher
+
+
+class ArchiveWriter:
+    """Writes records to an encrypted archive in frames, so that only a single frame is held in memory.
+
+    A frame holds the newline delimited JSON of whole records, compressed with zlib and encrypted with AES in GCM mode.
+    A frame is written once it holds frame_size bytes of records, so an interrupted export can resume after its last written frame.
+
+    Attributes:
+        stream (file): Binary stream of the archive.
+        key (bytes): The key of the archive.
+        header (bytes): The header of the archive.
+        frame_index (int): Index of the next frame, which is also the number of frames written.
+        frame_size (int): Number of uncompressed bytes of records after which a frame is written.
+        compression_level (int): zlib compression level of the frames.
+        buffer (list): The encoded records of the next frame.
+        buffer_size (int): Number of bytes in the buffer.
+    """
+    stream = None
+    key = None
+    header = None
+    frame_index = None
+    frame_size = None
+    compression_level = None
+    buffer = None
+    buffer_size = None
+
+    def __init__(self, stream, cipher_key, header=None, frame_index=0, frame_size=VAULT_FRAME_SIZE, compression_level=VAULT_COMPRESSION_LEVEL):
+        """
+        Args:
+            stream (file): Binary stream of the archive. It is positioned after the last frame when resuming.
+            cipher_key (bytes): The cipher key of the master password and master key.
+            header (bytes, optional): The header of the archive when resuming. Defaults to None, which writes the header of a new archive.
+            frame_index (int, optional): Number of frames already written when resuming. Defaults to 0.
+            frame_size (int, optional): Number of uncompressed bytes of records after which a frame is written. Defaults to VAULT_FRAME_SIZE.
+            compression_level (int, optional): zlib compression level of the frames. Defaults to VAULT_COMPRESSION_LEVEL.
+        """
+        if header == None:
+            header = ARCHIVE_HEADER.pack(
+                ARCHIVE_MAGIC, ARCHIVE_VERSION, os.urandom(ARCHIVE_SALT_SIZE))
+            stream.write(header)
+        self.stream = stream
+        self.key = derive_archive_key(
+            cipher_key, ARCHIVE_HEADER.unpack(header)[2])
+        self.header = header
+        self.frame_index = frame_index
+        self.frame_size = frame_size
+        self.compression_level = compression_level
+        self.buffer = []
+        self.buffer_size = 0
+
+    def write(self, record):
+        """Adds a record to the next frame and writes the frame if it is full.
+        Args:
+            record (dict): The record to write.
+        Returns:
+            bool: True if a frame was written, so that the record and the ones before it are in the archive.
+        """
+        line = json.dumps(record).encode('utf-8') + b'\n'
+        self.buffer.append(line)
+        self.buffer_size += len(line)
+        if self.buffer_size < self.frame_size:
+            return False
+        self.__write_frame(0)
+        return True
+
+    def close(self):
+        """Writes the remaining records in the last frame of the archive. The stream is not closed."""
+        self.__write_frame(FRAME_FLAG_FINAL)
+
+    def __write_frame(self, flags):
+        """Compresses, encrypts and writes the buffered records as a frame.
+        Args:
+            flags (int): The flags of the frame.
+        """
+        payload = zlib.compress(b''.join(self.buffer), self.compression_level)
+        nonce = os.urandom(FRAME_NONCE_SIZE)
+        cipher = create_frame_cipher(
+            self.key, self.header, self.frame_index, flags, nonce)
+        ciphertext, tag = cipher.encrypt_and_digest(payload)
+        self.stream.write(FRAME_HEADER.pack(
+            len(ciphertext) + FRAME_TAG_SIZE, flags, nonce) + ciphertext + tag)
+        self.frame_index += 1
+        self.buffer = []
+        self.buffer_size = 0
+
+
+def iterate_archive_frames(stream, cipher_key, start_frame=0):
+    """Iterates over the records of an archive written by ArchiveWriter, a frame at a time.
+    Args:
+        stream (file): Binary stream of the archive positioned at its start.
+        cipher_key (bytes): The cipher key of the master password and master key.
+        start_frame (int, optional): Index of the first frame to read. The frames before it are skipped without being decrypted. Defaults to 0.
+    Yields:
+        (int, list): The index of the frame and its records.
+    Raises:
+        ValueError: If the archive is malformed, truncated, tampered with or encrypted with another master password and master key.
+    """
+    header = read_archive_header(stream)
+    key = derive_archive_key(cipher_key, ARCHIVE_HEADER.unpack(header)[2])
+    index = 0
+    while True:
+        frame_header = stream.read(FRAME_HEADER.size)
+        if len(frame_header) != FRAME_HEADER.size:
+            raise ValueError('Truncated vault archive')
+        length, flags, nonce = FRAME_HEADER.unpack(frame_header)
+        if index < start_frame:
+            stream.seek(length, os.SEEK_CUR)
+        else:
+            sealed = stream.read(length)
+            if len(sealed) != length or length < FRAME_TAG_SIZE:
+                raise ValueError('Truncated vault archive')
+            cipher = create_frame_cipher(key, header, index, flags, nonce)
+            try:
+                payload = cipher.decrypt_and_verify(
+                    sealed[:-FRAME_TAG_SIZE], sealed[-FRAME_TAG_SIZE:])
+            except ValueError:
+                raise ValueError(
+                    'Incorrect master credentials or corrupted vault archive')
+            yield index, [json.loads(line) for line in zlib.decompress(payload).splitlines()]
+        if flags & FRAME_FLAG_FINAL:
+            return
+        index += 1
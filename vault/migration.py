@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Migrates the secrets of the password manager collection stored in the legacy format (base64 strings) to the binary format.
+
+The master password and master key are read from the PWDMNGR_MASTER_PASSWORD and PWDMNGR_MASTER_KEY environment variables or prompted for.
+
+    python -m vault.migration
+
+SECRET_FORMAT_VERSION must select the binary format on every server first, so that no server writes legacy secrets anymore
+and every server reads the binary ones. The servers keep serving reads and writes during the migration.
+
+The records having a legacy secret are read in batches in the order of _id. Their secrets are converted by the crypto pool and written
+with bulk_write(). A record is only replaced if its secrets are still the ones that were read, so a concurrent update isn't overwritten.
+Such records are counted as skipped. The converted records no longer match the query, so running the migration again resumes it.
+"""
+import argparse
+import itertools
+import json
+import sys
+from constants.database import MONGO_URI, DATABASE_NAME, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.key_config import SECRET_FORMAT_VERSION
+from constants.response_messages import ERROR_ROTATION_IN_PROGRESS, ERROR_MIGRATION_LEGACY_FORMAT
+from constants.vault_config import VAULT_MIGRATION_BATCH_SIZE
+from crypto.crypto_pool import crypto_pool
+from crypto.secret_format import SECRET_FORMAT_LEGACY
+from database.dbclient import DbClient, create_client_options
+from pymongo import UpdateOne
+from vault.tool import ThroughputReporter, assert_master_credentials, load_master_credentials
+
+
+class SecretFormatMigration:
+    """Converts the secrets in the legacy format to the binary format in batches while the servers keep serving requests.
+
+    Attributes:
+        dbclient (DbClient): The database client object.
+        password_manager_collection (Collection): The collection in which all the secrets are stored.
+        master_password (str): Master password.
+        master_key (str): Master key as sent in requests.
+        batch_size (int): Number of records converted and written at a time.
+        reporter (ThroughputReporter): Reports the progress.
+    """
+    dbclient = None
+    password_manager_collection = None
+    master_password = None
+    master_key = None
+    batch_size = None
+    reporter = None
+
+    def __init__(self, dbclient, master_password, master_key, batch_size=VAULT_MIGRATION_BATCH_SIZE, reporter=None):
+        """
+        Args:
+            dbclient (DbClient): The database client object.
+            master_password (str): Master password.
+            master_key (str): Master key as sent in requests.
+            batch_size (int, optional): Number of records converted and written at a time. Defaults to VAULT_MIGRATION_BATCH_SIZE.
+            reporter (ThroughputReporter, optional): Reports the progress. Defaults to a reporter writing to stderr.
+        """
+        self.dbclient = dbclient
+        self.password_manager_collection = dbclient.get_collection(
+            PASSWORD_MANAGER_COLLECTION_NAME)
+        self.master_password = master_password
+        self.master_key = master_key
+        self.batch_size = batch_size
+        self.reporter = reporter if reporter != None else ThroughputReporter(
+            'migrated')
+
+    def run(self):
+        """Converts the records having a secret in the legacy format.
+        Returns:
+            dict: The number of records converted and skipped, the seconds spent and the throughput in records/s.
+        """
+        assert SECRET_FORMAT_VERSION != SECRET_FORMAT_LEGACY, ERROR_MIGRATION_LEGACY_FORMAT
+        document = assert_master_credentials(
+            self.dbclient, self.master_password, self.master_key)
+        assert document.get(
+            MASTER_PASSWORD_COLLECTION_ROTATION_FIELD) == None, ERROR_ROTATION_IN_PROGRESS
+
+        query = {PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: {'$type': 'string'}}
+        skipped = 0
+        while True:
+            batch = list(itertools.islice(self.password_manager_collection.find(
+                query, {PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: 1}).sort([('_id', 1)]).batch_size(self.batch_size), self.batch_size))
+            if len(batch) == 0:
+                break
+            secrets = crypto_pool.convert_records(self.master_password, int(self.master_key), [
+                record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in batch])
+            result = self.password_manager_collection.bulk_write([UpdateOne({
+                '_id': record['_id'],
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD]
+            }, {'$set': {PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: record_secrets}}) for record, record_secrets in zip(batch, secrets)], ordered=False)
+            skipped += len(batch) - result.modified_count
+            self.reporter.add(result.modified_count)
+            # The skipped records still match the query, so the next batch starts after the last record read.
+            query = {
+                PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: {'$type': 'string'},
+                '_id': {'$gt': batch[-1]['_id']}
+            }
+        result = self.reporter.finish()
+        result['skipped'] = skipped
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Migrates the secrets in the legacy format to the binary format.')
+    parser.add_argument('--mongo-uri', default=MONGO_URI,
+                        help='Uri of the MongoDB server. Defaults to MONGO_URI.')
+    parser.add_argument('--database', default=DATABASE_NAME,
+                        help='Name of the database. Defaults to DATABASE_NAME.')
+    args = parser.parse_args(argv)
+
+    master_password, master_key = load_master_credentials()
+    dbclient = DbClient(args.mongo_uri, args.database,
+                        client_options=create_client_options(min_pool_size=0))
+    try:
+        result = SecretFormatMigration(
+            dbclient, master_password, master_key).run()
+    except AssertionError as e:
+        sys.exit(str(e))
+    finally:
+        crypto_pool.shutdown()
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
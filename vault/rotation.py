@@ -0,0 +1,291 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Rotates the master password and master key, re-encrypting every secret of the password manager collection with the new ones.
+
+The current master password and master key are read from the PWDMNGR_MASTER_PASSWORD and PWDMNGR_MASTER_KEY environment variables,
+the new ones from PWDMNGR_NEW_MASTER_PASSWORD and PWDMNGR_NEW_MASTER_KEY. The ones that are unset are prompted for.
+
+    python -m vault.rotation
+
+The servers keep serving reads during the rotation, while writes are rejected. The rotation runs in these steps:
+
+1. The rotation is recorded in the master collection row, which makes the servers reject writes once their cached row expires.
+2. The records are read in batches in the order of _id. Their secrets are re-encrypted by the crypto pool and written next to
+   the current secrets with bulk_write(), along with the hash of the new credentials. The last _id is recorded after every batch.
+3. The hashes of the master password and master key are replaced in a single update of the master collection row, along with the time of the switch.
+   From then on, the queries made with the new credentials decrypt the secrets written next to the current ones.
+4. Once the cached rows of the servers have expired, the current secrets are replaced by the re-encrypted ones and the rotation is removed.
+   A rotation resumed after the switch waits for the rest of the cache TTL counted from the time of the switch.
+
+An interrupted rotation is resumed by running it again with the same credentials.
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+import uuid
+from constants.database import MONGO_URI, DATABASE_NAME, MASTER_PASSWORD_CACHE_TTL_SECONDS, MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD
+from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_MASTER_KEY, ERROR_MULTIPLE_MASTER_ROWS, ERROR_ROTATION_ALREADY_STARTED, ERROR_ROTATION_NEW_CREDENTIALS
+from constants.vault_config import VAULT_ROTATION_BATCH_SIZE, VAULT_NEW_MASTER_PASSWORD_ENV, VAULT_NEW_MASTER_KEY_ENV
+from crypto.crypto_pool import crypto_pool
+from database.dbclient import DbClient, create_client_options, find_at_most
+from pymongo import UpdateOne
+from utils.hash import generate_hash, generate_credentials_hash
+from vault.tool import ThroughputReporter, load_master_credentials
+
+# Fields of the rotation in the master collection row.
+ROTATION_ID_FIELD = 'id'
+ROTATION_STATE_FIELD = 'state'
+ROTATION_NEW_MASTER_PASSWORD_FIELD = 'new-master-password'
+ROTATION_NEW_MASTER_KEY_FIELD = 'new-master-key'
+ROTATION_LAST_ID_FIELD = 'last-id'
+ROTATION_RECORDS_FIELD = 'records'
+ROTATION_SWITCHED_AT_FIELD = 'switched-at'
+# The secrets are being re-encrypted with the old credentials still in use.
+ROTATION_STATE_REENCRYPTING = 'reencrypting'
+# The new credentials are in use and the re-encrypted secrets are replacing the current ones.
+ROTATION_STATE_SWITCHED = 'switched'
+
+
+def get_rotation_field(field):
+    """
+    Args:
+        field (str): A field of the rotation.
+    Returns:
+        str: The path of the field in the master collection row.
+    """
+    return '{}.{}'.format(MASTER_PASSWORD_COLLECTION_ROTATION_FIELD, field)
+
+
+class MasterCredentialRotation:
+    """Re-encrypts every secret with a new master password and master key while the servers keep serving reads.
+
+    The progress is stored in the master collection row, so that an interrupted rotation is resumed from its last batch.
+
+    Attributes:
+        master_password_collection (Collection): The collection in which master password and master key is stored.
+        password_manager_collection (Collection): The collection in which all the secrets are stored.
+        master_password (str): The current master password.
+        master_key (str): The current master key as sent in requests.
+        new_master_password (str): The new master password.
+        new_master_key (str): The new master key as sent in requests.
+        batch_size (int): Number of records re-encrypted and written at a time.
+        cache_ttl (float): Number of seconds the servers cache the master collection row.
+        sleep (function): Sleeps for the given number of seconds.
+        clock (function): Returns the current time in seconds since the epoch.
+        reporter (ThroughputReporter): Reports the progress.
+    """
+    master_password_collection = None
+    password_manager_collection = None
+    master_password = None
+    master_key = None
+    new_master_password = None
+    new_master_key = None
+    batch_size = None
+    cache_ttl = None
+    sleep = None
+    clock = None
+    reporter = None
+
+    def __init__(self, dbclient, master_password, master_key, new_master_password, new_master_key, batch_size=VAULT_ROTATION_BATCH_SIZE,
+                 cache_ttl=MASTER_PASSWORD_CACHE_TTL_SECONDS, sleep=time.sleep, clock=time.time, reporter=None):
+        """
+        Args:
+            dbclient (DbClient): The database client object.
+            master_password (str): The current master password.
+            master_key (str): The current master key as sent in requests.
+            new_master_password (str): The new master password.
+            new_master_key (str): The new master key as sent in requests.
+            batch_size (int, optional): Number of records re-encrypted and written at a time. Defaults to VAULT_ROTATION_BATCH_SIZE.
+            cache_ttl (float, optional): Number of seconds the servers cache the master collection row. Defaults to MASTER_PASSWORD_CACHE_TTL_SECONDS.
+            sleep (function, optional): Sleeps for the given number of seconds. Defaults to time.sleep.
+            clock (function, optional): Returns the current time in seconds since the epoch. Defaults to time.time.
+            reporter (ThroughputReporter, optional): Reports the progress. Defaults to a reporter writing to stderr.
+        """
+        self.master_password_collection = dbclient.get_collection(
+            MASTER_PASSWORD_COLLECTION_NAME)
+        self.password_manager_collection = dbclient.get_collection(
+            PASSWORD_MANAGER_COLLECTION_NAME)
+        self.master_password = master_password
+        self.master_key = master_key
+        self.new_master_password = new_master_password
+        self.new_master_key = new_master_key
+        self.batch_size = batch_size
+        self.cache_ttl = cache_ttl
+        self.sleep = sleep
+        self.clock = clock
+        self.reporter = reporter if reporter != None else ThroughputReporter(
+            're-encrypted')
+
+    def run(self):
+        """Starts a rotation or resumes the one recorded in the master collection row.
+        Returns:
+            dict: The number of records re-encrypted, the seconds spent and the throughput in records/s.
+        """
+        document = self.__get_master_document()
+        rotation = document.get(MASTER_PASSWORD_COLLECTION_ROTATION_FIELD)
+        if rotation == None:
+            self.__assertCurrentCredentials(document)
+            rotation = self.__start(document)
+        else:
+            assert rotation[ROTATION_NEW_MASTER_PASSWORD_FIELD] == generate_hash(self.new_master_password) and rotation[ROTATION_NEW_MASTER_KEY_FIELD] == generate_hash(
+                self.new_master_key), ERROR_ROTATION_NEW_CREDENTIALS
+            if rotation[ROTATION_STATE_FIELD] == ROTATION_STATE_REENCRYPTING:
+                self.__assertCurrentCredentials(document)
+
+        if rotation[ROTATION_STATE_FIELD] == ROTATION_STATE_REENCRYPTING:
+            # The servers reject writes once their cached row has the rotation.
+            self.sleep(self.cache_ttl)
+            self.__reencrypt(document, rotation)
+            rotation = self.__switch(document, rotation)
+        # The servers accept the old credentials until their cached row has the new ones, and those requests decrypt the current secrets.
+        # A rotation without the time of the switch waits for the whole TTL.
+        switched_at = rotation.get(ROTATION_SWITCHED_AT_FIELD)
+        if switched_at == None:
+            switched_at = self.clock()
+        self.sleep(max(switched_at + self.cache_ttl - self.clock(), 0))
+        self.__promote()
+        self.master_password_collection.update_one({'_id': document['_id']}, {
+            '$unset': {MASTER_PASSWORD_COLLECTION_ROTATION_FIELD: ''}})
+        return self.reporter.finish()
+
+    def __get_master_document(self):
+        """
+        Returns:
+            dict: The row of the master collection.
+        """
+        documents = find_at_most(self.master_password_collection, {}, 2)
+        assert len(documents) == 1, ERROR_MULTIPLE_MASTER_ROWS
+        return documents[0]
+
+    def __assertCurrentCredentials(self, document):
+        """Asserts that the current master password and key match the master collection row.
+        Args:
+            document (dict): The row of the master collection.
+        """
+        assert document[MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD] == generate_hash(
+            self.master_password), ERROR_MASTER_PASSWORD
+        assert document[MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD] == generate_hash(
+            self.master_key), ERROR_MASTER_KEY
+
+    def __start(self, document):
+        """Records a new rotation in the master collection row, unless another one was recorded concurrently.
+        Args:
+            document (dict): The row of the master collection.
+        Returns:
+            dict: The rotation.
+        """
+        rotation = {
+            ROTATION_ID_FIELD: uuid.uuid4().hex,
+            ROTATION_STATE_FIELD: ROTATION_STATE_REENCRYPTING,
+            ROTATION_NEW_MASTER_PASSWORD_FIELD: generate_hash(self.new_master_password),
+            ROTATION_NEW_MASTER_KEY_FIELD: generate_hash(self.new_master_key),
+            ROTATION_LAST_ID_FIELD: None,
+            ROTATION_RECORDS_FIELD: 0
+        }
+        result = self.master_password_collection.update_one({
+            '_id': document['_id'],
+            MASTER_PASSWORD_COLLECTION_ROTATION_FIELD: {'$exists': False}
+        }, {'$set': {MASTER_PASSWORD_COLLECTION_ROTATION_FIELD: rotation}})
+        assert result.modified_count == 1, ERROR_ROTATION_ALREADY_STARTED
+        return rotation
+
+    def __reencrypt(self, document, rotation):
+        """Writes the secrets re-encrypted with the new credentials next to the current secrets of the records after the last recorded _id.
+        Args:
+            document (dict): The row of the master collection.
+            rotation (dict): The rotation.
+        """
+        query = {}
+        if rotation[ROTATION_LAST_ID_FIELD] != None:
+            query = {'_id': {'$gt': rotation[ROTATION_LAST_ID_FIELD]}}
+        cursor = self.password_manager_collection.find(query, {PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: 1}).sort(
+            [('_id', 1)]).batch_size(self.batch_size)
+        credentials_hash = generate_credentials_hash(
+            self.new_master_password, int(self.new_master_key))
+        records = rotation[ROTATION_RECORDS_FIELD]
+        while True:
+            batch = list(itertools.islice(cursor, self.batch_size))
+            if len(batch) == 0:
+                break
+            secrets = crypto_pool.reencrypt_records(self.master_password, int(self.master_key), self.new_master_password, int(self.new_master_key), [
+                record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in batch])
+            self.password_manager_collection.bulk_write([UpdateOne({'_id': record['_id']}, {'$set': {
+                PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD: record_secrets,
+                PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD: credentials_hash
+            }}) for record, record_secrets in zip(batch, secrets)], ordered=False)
+            records += len(batch)
+            self.master_password_collection.update_one({
+                '_id': document['_id'],
+                get_rotation_field(ROTATION_ID_FIELD): rotation[ROTATION_ID_FIELD]
+            }, {'$set': {
+                get_rotation_field(ROTATION_LAST_ID_FIELD): batch[-1]['_id'],
+                get_rotation_field(ROTATION_RECORDS_FIELD): records
+            }})
+            self.reporter.add(len(batch))
+
+    def __switch(self, document, rotation):
+        """Replaces the hashes of the master password and master key in a single update of the master collection row.
+        Args:
+            document (dict): The row of the master collection.
+            rotation (dict): The rotation.
+        Returns:
+            dict: The switched rotation.
+        """
+        rotation = dict(rotation, **{ROTATION_STATE_FIELD: ROTATION_STATE_SWITCHED,
+                                     ROTATION_SWITCHED_AT_FIELD: self.clock()})
+        self.master_password_collection.update_one({
+            '_id': document['_id'],
+            get_rotation_field(ROTATION_ID_FIELD): rotation[ROTATION_ID_FIELD]
+        }, {'$set': {
+            MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: rotation[ROTATION_NEW_MASTER_PASSWORD_FIELD],
+            MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: rotation[ROTATION_NEW_MASTER_KEY_FIELD],
+            get_rotation_field(ROTATION_STATE_FIELD): ROTATION_STATE_SWITCHED,
+            get_rotation_field(ROTATION_SWITCHED_AT_FIELD): rotation[ROTATION_SWITCHED_AT_FIELD]
+        }})
+        return rotation
+
+    def __promote(self):
+        """Replaces the current secrets by the ones re-encrypted with the new credentials. Every record is updated atomically on the server.
+        The re-encrypted secrets left by an abandoned rotation with other credentials are dropped."""
+        self.password_manager_collection.update_many({
+            PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD: generate_credentials_hash(
+                self.new_master_password, int(self.new_master_key))
+        }, [
+            {'$set': {PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: '$' +
+                      PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD}},
+            {'$unset': [PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD,
+                        PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD]}
+        ])
+        self.password_manager_collection.update_many({
+            PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD: {'$exists': True}
+        }, {'$unset': {PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD: '', PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD: ''}})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rotates the master password and master key, re-encrypting every secret with the new ones.')
+    parser.add_argument('--mongo-uri', default=MONGO_URI,
+                        help='Uri of the MongoDB server. Defaults to MONGO_URI.')
+    parser.add_argument('--database', default=DATABASE_NAME,
+                        help='Name of the database. Defaults to DATABASE_NAME.')
+    args = parser.parse_args(argv)
+
+    master_password, master_key = load_master_credentials()
+    new_master_password, new_master_key = load_master_credentials(
+        VAULT_NEW_MASTER_PASSWORD_ENV, VAULT_NEW_MASTER_KEY_ENV, 'New master')
+    dbclient = DbClient(args.mongo_uri, args.database,
+                        client_options=create_client_options(min_pool_size=0))
+    try:
+        result = MasterCredentialRotation(
+            dbclient, master_password, master_key, new_master_password, new_master_key).run()
+    except AssertionError as e:
+        sys.exit(str(e))
+    finally:
+        crypto_pool.shutdown()
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import io
+import pytest
+from utils.test import create_random_string
+from vault.archive import ArchiveWriter, iterate_archive_frames, read_archive_header, ARCHIVE_HEADER, FRAME_HEADER, FRAME_NONCE_SIZE
+
+CIPHER_KEY = b'0123456789abcdef'
+RECORD_COUNT = 200
+
+
+def create_records(count):
+    """
+    Args:
+        count (int): Number of records.
+    Returns:
+        list: Records having random domain, username and secrets.
+    """
+    return [{'domain': create_random_string(20), 'username': create_random_string(20),
+             'secrets': [create_random_string(50) for _ in range(3)]} for _ in range(count)]
+
+
+def write_archive(records, frame_size=1024):
+    """
+    Args:
+        records (list): The records to write.
+        frame_size (int, optional): Number of uncompressed bytes of records after which a frame is written.
+    Returns:
+        bytes: The archive.
+    """
+    stream = io.BytesIO()
+    writer = ArchiveWriter(stream, CIPHER_KEY, frame_size=frame_size)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return stream.getvalue()
+
+
+def read_records(archive, cipher_key=CIPHER_KEY, start_frame=0):
+    """
+    Args:
+        archive (bytes): The archive.
+        cipher_key (bytes, optional): The cipher key of the archive.
+        start_frame (int, optional): Index of the first frame to read.
+    Returns:
+        list: The records of the archive.
+    """
+    records = []
+    for _, frame in iterate_archive_frames(io.BytesIO(archive), cipher_key, start_frame):
+        records.extend(frame)
+    return records
+
+
+def test_archive_round_trip():
+    """Tests that the records written by ArchiveWriter are read by iterate_archive_frames() in frames.
+    Expects the same records in several frames, and an empty archive to have no records."""
+
+    records = create_records(RECORD_COUNT)
+    archive = write_archive(records)
+    assert read_records(archive) == records
+    assert len(list(iterate_archive_frames(io.BytesIO(archive), CIPHER_KEY))) > 1
+    assert read_records(write_archive([])) == []
+
+
+def test_archive_skips_frames():
+    """Tests iterate_archive_frames() with a start frame.
+    Expects the frames before the start frame to be skipped."""
+
+    records = create_records(RECORD_COUNT)
+    archive = write_archive(records)
+    frames = list(iterate_archive_frames(io.BytesIO(archive), CIPHER_KEY))
+    skipped = sum(len(frame) for _, frame in frames[:2])
+    assert read_records(archive, start_frame=2) == records[skipped:]
+
+
+def test_archive_resume():
+    """Tests an ArchiveWriter resuming an archive after its last written frame.
+    Expects the records of both writers to be read."""
+
+    records = create_records(RECORD_COUNT)
+    stream = io.BytesIO()
+    writer = ArchiveWriter(stream, CIPHER_KEY, frame_size=1024)
+    written = 0
+    while not writer.write(records[written]):
+        written += 1
+    written += 1
+    stream.seek(0)
+    header = read_archive_header(stream)
+    stream.seek(0, io.SEEK_END)
+    writer = ArchiveWriter(stream, CIPHER_KEY, header,
+                           writer.frame_index, frame_size=1024)
+    for record in records[written:]:
+        writer.write(record)
+    writer.close()
+    assert read_records(stream.getvalue()) == records
+
+
+def test_archive_rewritten_frame_has_new_nonce():
+    """Tests a frame written again at the same index by a resumed export, as after an interruption before its checkpoint was saved.
+    Expects the frames to have different nonces."""
+
+    stream = io.BytesIO()
+    header = None
+    frames = []
+    for records in [create_records(10), create_records(10)]:
+        start = stream.tell()
+        writer = ArchiveWriter(stream, CIPHER_KEY, header, frame_index=0)
+        header = writer.header
+        for record in records:
+            writer.write(record)
+        writer.close()
+        frames.append(stream.getvalue()[max(start, ARCHIVE_HEADER.size):])
+    nonces = [FRAME_HEADER.unpack(frame[:FRAME_HEADER.size])[2]
+              for frame in frames]
+    assert len(nonces[0]) == FRAME_NONCE_SIZE
+    assert nonces[0] != nonces[1]
+
+
+def test_archive_rejects_wrong_key_and_tampering():
+    """Tests iterate_archive_frames() with a wrong cipher key, a modified frame, a modified nonce, a truncated archive, an archive without its last frame and a file that isn't an archive.
+    Expects ValueError."""
+
+    archive = write_archive(create_records(RECORD_COUNT))
+    tampered = bytearray(archive)
+    tampered[ARCHIVE_HEADER.size + FRAME_HEADER.size] ^= 1
+    tampered_nonce = bytearray(archive)
+    tampered_nonce[ARCHIVE_HEADER.size + FRAME_HEADER.size - 1] ^= 1
+    unfinished = io.BytesIO()
+    writer = ArchiveWriter(unfinished, CIPHER_KEY, frame_size=1024)
+    for record in create_records(RECORD_COUNT):
+        writer.write(record)
+    cases = [(archive, b'fedcba9876543210'), (bytes(tampered), CIPHER_KEY), (bytes(tampered_nonce), CIPHER_KEY),
+             (archive[:ARCHIVE_HEADER.size + 100], CIPHER_KEY),
+             (unfinished.getvalue(), CIPHER_KEY), (b'{"domain": "abc.com"}', CIPHER_KEY)]
+    for data, cipher_key in cases:
+        with pytest.raises(ValueError):
+            read_records(data, cipher_key)
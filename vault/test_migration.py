@@ -0,0 +1,113 @@
+import io
+import pytest
+from bson import ObjectId
+from bson.binary import Binary
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.response_messages import ERROR_ROTATION_IN_PROGRESS, ERROR_MIGRATION_LEGACY_FORMAT
+from crypto.crypto_pool import crypto_pool, decrypt_records
+from crypto.encrypter import Encrypter
+from crypto.secret_format import SECRET_FORMAT_LEGACY, SECRET_FORMAT_GCM
+from mock import Mock, patch
+from utils.hash import generate_hash
+from vault.migration import SecretFormatMigration
+from vault.test_rotation import FakeCollection
+from vault.tool import ThroughputReporter
+
+MASTER_PASSWORD = 'password'
+MASTER_KEY = '1234'
+RECORD_COUNT = 25
+
+
+def encrypt_record(secrets, version):
+    """
+    Returns:
+        list: The secrets encrypted by a single Encrypter of the version.
+    """
+    encrypter = Encrypter(MASTER_PASSWORD, int(MASTER_KEY), version)
+    return [encrypter.encrypt(secret) for secret in secrets]
+
+
+def create_vault():
+    """Creates a vault whose records are in the legacy format, except every fifth record which is in the binary format.
+    Returns:
+        (FakeCollection, FakeCollection, list): The master collection, the password manager collection and the secrets of its records.
+    """
+    secrets = [['secret{}-{}'.format(record, secret) for secret in range(3)]
+               for record in range(RECORD_COUNT)]
+    master_collection = FakeCollection([{'_id': ObjectId(),
+                                         MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash(MASTER_PASSWORD),
+                                         MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash(MASTER_KEY)}])
+    password_manager_collection = FakeCollection([{'_id': ObjectId(), PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: encrypt_record(
+        record_secrets, SECRET_FORMAT_GCM if index % 5 == 0 else SECRET_FORMAT_LEGACY)} for index, record_secrets in enumerate(secrets)])
+    return master_collection, password_manager_collection, secrets
+
+
+def create_migration(master_collection, password_manager_collection):
+    """
+    Returns:
+        SecretFormatMigration: A migration of the collections with a batch size of 10.
+    """
+    dbclient = Mock()
+    dbclient.get_collection = Mock(side_effect=lambda name: master_collection
+                                   if name == MASTER_PASSWORD_COLLECTION_NAME else password_manager_collection)
+    return SecretFormatMigration(dbclient, MASTER_PASSWORD, MASTER_KEY, batch_size=10,
+                                 reporter=ThroughputReporter('migrated', output=io.StringIO()))
+
+
+def test_migration():
+    """Tests a migration of a vault having records in both formats.
+    Expects only the legacy records to be converted, every secret to be binary and to decrypt to the original secret."""
+
+    master_collection, password_manager_collection, secrets = create_vault()
+    result = create_migration(
+        master_collection, password_manager_collection).run()
+    assert result['records'] == RECORD_COUNT - RECORD_COUNT // 5
+    assert result['skipped'] == 0
+    records = [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD]
+               for record in password_manager_collection.documents]
+    assert all(isinstance(secret, Binary)
+               for record_secrets in records for secret in record_secrets)
+    assert decrypt_records(MASTER_PASSWORD, int(MASTER_KEY), records) == secrets
+
+    assert create_migration(master_collection, password_manager_collection).run()[
+        'records'] == 0
+
+
+def test_migration_skips_concurrently_updated_records():
+    """Tests a record updated by a server between the read and the write of its batch.
+    Expects the update to be kept and the record to be reported as skipped."""
+
+    master_collection, password_manager_collection, secrets = create_vault()
+    document = password_manager_collection.documents[1]
+    updated_secrets = encrypt_record(['updated'], SECRET_FORMAT_LEGACY)
+    convert_records = crypto_pool.convert_records
+
+    def convert_and_update(*args):
+        result = convert_records(*args)
+        document[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] = updated_secrets
+        return result
+
+    with patch.object(crypto_pool, 'convert_records', Mock(side_effect=convert_and_update)):
+        result = create_migration(
+            master_collection, password_manager_collection).run()
+    assert result['skipped'] == 1
+    assert document[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] == updated_secrets
+
+
+def test_migration_preconditions():
+    """Tests a migration while the servers write the legacy format and while the master credentials are rotated.
+    Expects both to be rejected without converting any record."""
+
+    master_collection, password_manager_collection, _ = create_vault()
+    records = [list(record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD])
+               for record in password_manager_collection.documents]
+    with patch('vault.migration.SECRET_FORMAT_VERSION', SECRET_FORMAT_LEGACY):
+        with pytest.raises(AssertionError, match=ERROR_MIGRATION_LEGACY_FORMAT):
+            create_migration(master_collection,
+                             password_manager_collection).run()
+
+    master_collection.documents[0][MASTER_PASSWORD_COLLECTION_ROTATION_FIELD] = {}
+    with pytest.raises(AssertionError, match=ERROR_ROTATION_IN_PROGRESS):
+        create_migration(master_collection, password_manager_collection).run()
+    assert [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD]
+            for record in password_manager_collection.documents] == records
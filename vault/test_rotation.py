@@ -0,0 +1,212 @@
+import io
+import pytest
+from bson import ObjectId
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD
+from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_ROTATION_NEW_CREDENTIALS
+from crypto.crypto_pool import crypto_pool, encrypt_records, decrypt_records
+from mock import Mock, patch
+from utils.hash import generate_hash
+from utils.test import create_mock_cursor
+from vault.rotation import MasterCredentialRotation, ROTATION_STATE_FIELD, ROTATION_STATE_SWITCHED, ROTATION_SWITCHED_AT_FIELD
+from vault.tool import ThroughputReporter
+
+MASTER_PASSWORD = 'password'
+MASTER_KEY = '1234'
+NEW_MASTER_PASSWORD = 'new-password'
+NEW_MASTER_KEY = '5678'
+RECORD_COUNT = 25
+
+
+class FakeCollection:
+    """An in-memory collection supporting the queries and updates of the rotation and the migration.
+
+    Attributes:
+        documents (list): The documents in the order of _id.
+    """
+    documents = None
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return create_mock_cursor([dict(document) for document in self.documents if self.__match(document, query)])
+
+    def update_one(self, query, update):
+        for document in self.documents:
+            if self.__match(document, query):
+                self.__apply(document, update)
+                return Mock(modified_count=1)
+        return Mock(modified_count=0)
+
+    def update_many(self, query, update):
+        for document in self.documents:
+            if self.__match(document, query):
+                self.__apply(document, update)
+
+    def bulk_write(self, requests, ordered=True):
+        modified_count = 0
+        for request in requests:
+            modified_count += self.update_one(request._filter,
+                                              request._doc).modified_count
+        return Mock(modified_count=modified_count)
+
+    def __match(self, document, query):
+        for path, condition in query.items():
+            value = document
+            for field in path.split('.'):
+                value = value.get(field) if isinstance(value, dict) else None
+            if isinstance(condition, dict) and '$exists' in condition:
+                if (value != None) != condition['$exists']:
+                    return False
+            elif isinstance(condition, dict) and '$type' in condition:
+                if not isinstance(value, list) or not any(isinstance(item, str) for item in value):
+                    return False
+            elif isinstance(condition, dict) and '$gt' in condition:
+                if value == None or value <= condition['$gt']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def __apply(self, document, update):
+        if isinstance(update, list):
+            for field, value in update[0]['$set'].items():
+                document[field] = document[value[1:]]
+            for field in update[1]['$unset']:
+                document.pop(field, None)
+            return
+        for path, value in update.get('$set', {}).items():
+            target = document
+            fields = path.split('.')
+            for field in fields[:-1]:
+                target = target[field]
+            target[fields[-1]] = value
+        for path in update.get('$unset', {}):
+            document.pop(path, None)
+
+
+def create_vault():
+    """
+    Returns:
+        (FakeCollection, FakeCollection, list): The master collection, the password manager collection and the secrets of its records.
+    """
+    secrets = [['secret{}-{}'.format(record, secret) for secret in range(3)]
+               for record in range(RECORD_COUNT)]
+    master_collection = FakeCollection([{'_id': ObjectId(),
+                                         MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash(MASTER_PASSWORD),
+                                         MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash(MASTER_KEY)}])
+    password_manager_collection = FakeCollection(sorted([{'_id': ObjectId(), PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: record_secrets}
+                                                         for record_secrets in encrypt_records(MASTER_PASSWORD, int(MASTER_KEY), secrets)], key=lambda document: document['_id']))
+    return master_collection, password_manager_collection, secrets
+
+
+def create_rotation(master_collection, password_manager_collection, master_password=MASTER_PASSWORD, new_master_key=NEW_MASTER_KEY, sleep=None, clock=None):
+    """
+    Returns:
+        MasterCredentialRotation: A rotation of the collections with a batch size of 10.
+    """
+    dbclient = Mock()
+    dbclient.get_collection = Mock(side_effect=lambda name: master_collection
+                                   if name == MASTER_PASSWORD_COLLECTION_NAME else password_manager_collection)
+    return MasterCredentialRotation(dbclient, master_password, MASTER_KEY, NEW_MASTER_PASSWORD, new_master_key, batch_size=10,
+                                    cache_ttl=30, sleep=sleep or Mock(), clock=clock or Mock(return_value=100.0), reporter=ThroughputReporter('re-encrypted', output=io.StringIO()))
+
+
+def assert_rotated(master_collection, password_manager_collection, secrets):
+    """Asserts that the master collection row has the new credentials and the secrets are encrypted with them."""
+    document = master_collection.documents[0]
+    assert document[MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD] == generate_hash(
+        NEW_MASTER_PASSWORD)
+    assert document[MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD] == generate_hash(
+        NEW_MASTER_KEY)
+    assert MASTER_PASSWORD_COLLECTION_ROTATION_FIELD not in document
+    for record in password_manager_collection.documents:
+        assert PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD not in record
+        assert PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD not in record
+    assert decrypt_records(NEW_MASTER_PASSWORD, int(NEW_MASTER_KEY), [
+        record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in password_manager_collection.documents]) == secrets
+
+
+def test_rotation():
+    """Tests a rotation of the master password and master key.
+    Expects the new credentials in the master collection row, the secrets encrypted with them and a wait for the cached rows before and after the switch."""
+
+    master_collection, password_manager_collection, secrets = create_vault()
+    sleep = Mock()
+    result = create_rotation(
+        master_collection, password_manager_collection, sleep=sleep).run()
+    assert result['records'] == RECORD_COUNT
+    assert sleep.call_count == 2
+    assert_rotated(master_collection, password_manager_collection, secrets)
+
+
+def test_rotation_resumes_after_interruption():
+    """Tests a rotation interrupted after a batch and run again, and a rotation interrupted after the switch and run again.
+    Expects the second run to re-encrypt only the remaining records, and to only replace the secrets after the switch."""
+
+    master_collection, password_manager_collection, secrets = create_vault()
+    with patch.object(crypto_pool, 'reencrypt_records', Mock(side_effect=[crypto_pool.reencrypt_records(MASTER_PASSWORD, int(MASTER_KEY), NEW_MASTER_PASSWORD, int(NEW_MASTER_KEY), [
+            record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in password_manager_collection.documents[:10]]), RuntimeError()])):
+        with pytest.raises(RuntimeError):
+            create_rotation(master_collection,
+                            password_manager_collection).run()
+    assert MASTER_PASSWORD_COLLECTION_ROTATION_FIELD in master_collection.documents[0]
+    result = create_rotation(
+        master_collection, password_manager_collection).run()
+    assert result['records'] == RECORD_COUNT - 10
+    assert_rotated(master_collection, password_manager_collection, secrets)
+
+    master_collection, password_manager_collection, secrets = create_vault()
+    with pytest.raises(RuntimeError):
+        create_rotation(master_collection, password_manager_collection, sleep=Mock(
+            side_effect=[None, RuntimeError()])).run()
+    assert master_collection.documents[0][MASTER_PASSWORD_COLLECTION_ROTATION_FIELD][ROTATION_STATE_FIELD] == ROTATION_STATE_SWITCHED
+    create_rotation(master_collection, password_manager_collection,
+                    master_password='forgotten').run()
+    assert_rotated(master_collection, password_manager_collection, secrets)
+
+
+def test_rotation_resumed_after_switch_waits_for_cached_rows():
+    """Tests a rotation interrupted after the switch and run again 10 seconds later, and one whose rotation has no time of the switch.
+    Expects the rest of the cache TTL, or the whole TTL, to be waited before the secrets are replaced."""
+
+    for switched_at, wait in [(100.0, 20.0), (None, 30.0)]:
+        master_collection, password_manager_collection, secrets = create_vault()
+        with pytest.raises(RuntimeError):
+            create_rotation(master_collection, password_manager_collection, sleep=Mock(
+                side_effect=[None, RuntimeError()])).run()
+        rotation = master_collection.documents[0][MASTER_PASSWORD_COLLECTION_ROTATION_FIELD]
+        assert rotation[ROTATION_SWITCHED_AT_FIELD] == 100.0
+        if switched_at == None:
+            del rotation[ROTATION_SWITCHED_AT_FIELD]
+        else:
+            rotation[ROTATION_SWITCHED_AT_FIELD] = switched_at
+
+        pending_secrets = []
+        sleep = Mock(side_effect=lambda seconds: pending_secrets.extend(
+            record.get(PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD) for record in password_manager_collection.documents))
+        create_rotation(master_collection, password_manager_collection,
+                        sleep=sleep, clock=Mock(return_value=110.0)).run()
+        sleep.assert_called_once_with(wait)
+        assert None not in pending_secrets
+        assert_rotated(master_collection, password_manager_collection, secrets)
+
+
+def test_rotation_with_incorrect_credentials():
+    """Tests a rotation with an incorrect master password, and a resumed rotation with other new credentials.
+    Expects an AssertionError without changing the vault."""
+
+    master_collection, password_manager_collection, _ = create_vault()
+    with pytest.raises(AssertionError) as e:
+        create_rotation(master_collection, password_manager_collection,
+                        master_password='incorrect').run()
+    assert str(e.value) == ERROR_MASTER_PASSWORD
+    assert MASTER_PASSWORD_COLLECTION_ROTATION_FIELD not in master_collection.documents[0]
+
+    with pytest.raises(RuntimeError):
+        create_rotation(master_collection, password_manager_collection,
+                        sleep=Mock(side_effect=RuntimeError())).run()
+    with pytest.raises(AssertionError) as e:
+        create_rotation(master_collection, password_manager_collection,
+                        new_master_key='0000').run()
+    assert str(e.value) == ERROR_ROTATION_NEW_CREDENTIALS
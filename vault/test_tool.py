@@ -0,0 +1,187 @@
+import io
+import os
+import pytest
+from constants.database import MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD
+from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_CHECKPOINT_MISMATCH
+from crypto.crypto_pool import crypto_pool, encrypt_records, decrypt_records
+from mock import Mock, patch
+from utils.hash import generate_hash
+from utils.test import create_mock_cursor, create_random_string
+from vault.tool import ThroughputReporter, export_vault, import_vault, CHECKPOINT_SUFFIX
+
+MASTER_PASSWORD = 'password'
+MASTER_KEY = '1234'
+RECORD_COUNT = 100
+
+
+def create_vault(count):
+    """
+    Args:
+        count (int): Number of records.
+    Returns:
+        list: Records of the password manager collection sorted by domain and username, whose secrets are encrypted with the test credentials.
+    """
+    records = sorted([(create_random_string(20), create_random_string(20), [create_random_string(40) for _ in range(2)])
+                      for _ in range(count)])
+    secrets = encrypt_records(MASTER_PASSWORD, int(MASTER_KEY), [
+                              record[2] for record in records])
+    return [{PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: domain, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: username,
+             PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: encrypted} for (domain, username, _), encrypted in zip(records, secrets)]
+
+
+def create_vault_dbclient(records):
+    """Creates a mock DbClient whose master collection has the test credentials and whose password manager collection has the records.
+    A find() after a domain and username returns the records after them.
+    Args:
+        records (list): Records of the password manager collection sorted by domain and username.
+    Returns:
+        Mock: Mock DbClient object.
+    """
+    master_collection = Mock()
+    master_collection.find = Mock(side_effect=lambda query, projection: create_mock_cursor([{
+        MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD: generate_hash(MASTER_PASSWORD),
+        MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD: generate_hash(MASTER_KEY)
+    }]))
+
+    def find(query, projection):
+        if '$or' not in query:
+            return create_mock_cursor(records)
+        position = (query['$or'][1][PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD],
+                    query['$or'][1][PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]['$gt'])
+        return create_mock_cursor([record for record in records if (
+            record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD], record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]) > position])
+
+    collection = Mock()
+    collection.find = Mock(side_effect=find)
+    dbclient = Mock()
+    dbclient.get_collection = Mock(side_effect=lambda name: master_collection
+                                   if name == MASTER_PASSWORD_COLLECTION_NAME else collection)
+    return dbclient
+
+
+def create_reporter():
+    """
+    Returns:
+        ThroughputReporter: A reporter writing to memory.
+    """
+    return ThroughputReporter('processed', output=io.StringIO())
+
+
+def create_mock_dbclient_for(dbclient, collection):
+    """
+    Args:
+        dbclient (Mock): Mock DbClient whose master collection is used.
+        collection (Mock): The password manager collection.
+    Returns:
+        Mock: Mock DbClient object.
+    """
+    master_collection = dbclient.get_collection(MASTER_PASSWORD_COLLECTION_NAME)
+    target = Mock()
+    target.get_collection = Mock(side_effect=lambda name: master_collection
+                                 if name == MASTER_PASSWORD_COLLECTION_NAME else collection)
+    return target
+
+
+def test_export_and_import(tmp_path):
+    """Tests export_vault() interrupted after some frames, export_vault() again and import_vault() into another collection.
+    Expects the export to resume after the last written frame and the imported records to have the same secrets."""
+
+    records = create_vault(RECORD_COUNT)
+    dbclient = create_vault_dbclient(records)
+    path = str(tmp_path / 'vault.pwdv')
+
+    with patch.object(crypto_pool, 'decrypt_records', Mock(side_effect=[
+            decrypt_records(MASTER_PASSWORD, int(MASTER_KEY), [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in records[i:i + 10]]) for i in range(0, 30, 10)] + [RuntimeError()])):
+        with pytest.raises(RuntimeError):
+            export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                         batch_size=10, reporter=create_reporter(), frame_size=512)
+    assert os.path.exists(path + CHECKPOINT_SUFFIX)
+
+    result = export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                          batch_size=10, reporter=create_reporter(), frame_size=512)
+    assert result['records'] < RECORD_COUNT
+    assert not os.path.exists(path + CHECKPOINT_SUFFIX)
+
+    target = Mock()
+    result = import_vault(create_mock_dbclient_for(dbclient, target), path, MASTER_PASSWORD, MASTER_KEY,
+                          batch_size=7, reporter=create_reporter())
+    assert result['records'] == RECORD_COUNT
+    documents = [request._doc for call in target.bulk_write.call_args_list for request in call[0][0]]
+    assert [(document[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD], document[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]) for document in documents] == [
+        (record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD], record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]) for record in records]
+    assert decrypt_records(MASTER_PASSWORD, int(MASTER_KEY), [document[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for document in documents]) == decrypt_records(
+        MASTER_PASSWORD, int(MASTER_KEY), [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in records])
+
+
+def test_export_with_incorrect_master_password(tmp_path):
+    """Tests export_vault() with an incorrect master password.
+    Expects an AssertionError and no archive."""
+
+    dbclient = create_vault_dbclient(create_vault(1))
+    path = str(tmp_path / 'vault.pwdv')
+    with pytest.raises(AssertionError) as e:
+        export_vault(dbclient, path, 'incorrect', MASTER_KEY,
+                     reporter=create_reporter())
+    assert str(e.value) == ERROR_MASTER_PASSWORD
+    assert not os.path.exists(path)
+
+
+def interrupt_import(dbclient, path):
+    """Imports the first frame of an archive and interrupts the import, leaving its checkpoint."""
+    target = Mock()
+    target.bulk_write = Mock(side_effect=[None, RuntimeError()])
+    with pytest.raises(RuntimeError):
+        import_vault(create_mock_dbclient_for(dbclient, target), path, MASTER_PASSWORD, MASTER_KEY,
+                     batch_size=100, reporter=create_reporter())
+    assert os.path.exists(path + CHECKPOINT_SUFFIX)
+
+
+def test_checkpoint_of_another_command(tmp_path):
+    """Tests import_vault() next to the checkpoint of an interrupted export, and export_vault() next to the checkpoint of an interrupted import.
+    Expects both to be rejected without resuming from the checkpoint."""
+
+    records = create_vault(RECORD_COUNT)
+    dbclient = create_vault_dbclient(records)
+    path = str(tmp_path / 'vault.pwdv')
+    with patch.object(crypto_pool, 'decrypt_records', Mock(side_effect=[
+            decrypt_records(MASTER_PASSWORD, int(MASTER_KEY), [record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in records[:10]]), RuntimeError()])):
+        with pytest.raises(RuntimeError):
+            export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                         batch_size=10, reporter=create_reporter(), frame_size=512)
+    target = Mock()
+    with pytest.raises(AssertionError) as e:
+        import_vault(create_mock_dbclient_for(dbclient, target), path, MASTER_PASSWORD, MASTER_KEY,
+                     reporter=create_reporter())
+    assert str(e.value) == ERROR_CHECKPOINT_MISMATCH
+    target.bulk_write.assert_not_called()
+
+    os.remove(path + CHECKPOINT_SUFFIX)
+    export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                 batch_size=10, reporter=create_reporter(), frame_size=512)
+    interrupt_import(dbclient, path)
+    size = os.path.getsize(path)
+    with pytest.raises(AssertionError) as e:
+        export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                     batch_size=10, reporter=create_reporter(), frame_size=512)
+    assert str(e.value) == ERROR_CHECKPOINT_MISMATCH
+    assert os.path.getsize(path) == size
+
+
+def test_import_checkpoint_of_another_archive(tmp_path):
+    """Tests import_vault() of an archive replaced by another export after an interrupted import.
+    Expects the import to be rejected instead of skipping the frames of the new archive."""
+
+    dbclient = create_vault_dbclient(create_vault(RECORD_COUNT))
+    path = str(tmp_path / 'vault.pwdv')
+    other_path = str(tmp_path / 'other.pwdv')
+    export_vault(dbclient, path, MASTER_PASSWORD, MASTER_KEY,
+                 batch_size=10, reporter=create_reporter(), frame_size=512)
+    interrupt_import(dbclient, path)
+
+    export_vault(dbclient, other_path, MASTER_PASSWORD, MASTER_KEY,
+                 batch_size=10, reporter=create_reporter(), frame_size=512)
+    os.replace(other_path, path)
+    with pytest.raises(AssertionError) as e:
+        import_vault(create_mock_dbclient_for(dbclient, Mock()), path, MASTER_PASSWORD, MASTER_KEY,
+                     reporter=create_reporter())
+    assert str(e.value) == ERROR_CHECKPOINT_MISMATCH
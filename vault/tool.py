@@ -0,0 +1,367 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Exports the password manager collection to an encrypted archive and imports it back.
+
+The master password and master key are read from the PWDMNGR_MASTER_PASSWORD and PWDMNGR_MASTER_KEY environment variables or prompted for.
+They are checked against the master collection, the secrets are decrypted with them and the archive is encrypted with a key derived from them.
+The import encrypts the secrets with the master password and master key of the target database, which must be the same credentials.
+
+    python -m vault.tool export vault.pwdv
+    python -m vault.tool import vault.pwdv
+
+The records are streamed, so the memory used doesn't depend on the size of the vault.
+Progress is saved to a checkpoint file next to the archive after every frame. Running the same command again resumes from the checkpoint.
+The checkpoint records the command and the salt of the archive, so it is only resumed by the same command on the same archive.
+The import replaces the records having the same domain and username, so importing an archive again is safe.
+"""
+import argparse
+import getpass
+import itertools
+import json
+import os
+import sys
+import time
+from constants.database import MONGO_URI, DATABASE_NAME, MASTER_PASSWORD_COLLECTION_NAME, MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD, MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD, PASSWORD_MANAGER_COLLECTION_NAME, PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD, PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD, MASTER_PASSWORD_COLLECTION_ROTATION_FIELD
+from constants.request_parameters import RECORD_DOMAIN_FIELD, RECORD_USERNAME_FIELD, RECORD_SECRETS_FIELD
+from constants.response_messages import ERROR_MASTER_PASSWORD, ERROR_MASTER_KEY, ERROR_MULTIPLE_MASTER_ROWS, ERROR_ROTATION_IN_PROGRESS, ERROR_CHECKPOINT_MISMATCH
+from constants.vault_config import VAULT_EXPORT_BATCH_SIZE, VAULT_IMPORT_BATCH_SIZE, VAULT_PROGRESS_INTERVAL_SECONDS, VAULT_MASTER_PASSWORD_ENV, VAULT_MASTER_KEY_ENV
+from crypto.cipher_key_cache import cipher_key_cache
+from crypto.crypto_pool import crypto_pool
+from database.dbclient import DbClient, create_client_options, find_at_most
+from pymongo import ReplaceOne
+from utils.hash import generate_hash, generate_credentials_hash
+from utils.ngram import generate_ngram_fields
+from utils.page_token import generate_page_query
+from vault.archive import ARCHIVE_HEADER, ArchiveWriter, iterate_archive_frames, read_archive_header
+
+# Suffix of the checkpoint file of an archive.
+CHECKPOINT_SUFFIX = '.checkpoint'
+# Commands that write a checkpoint.
+CHECKPOINT_COMMAND_EXPORT = 'export'
+CHECKPOINT_COMMAND_IMPORT = 'import'
+
+
+class ThroughputReporter:
+    """Reports the number of records processed and the throughput in records/s at a fixed interval.
+
+    Attributes:
+        action (str): The action reported, like exported.
+        output (file): The text stream the reports are written to.
+        interval (float): Number of seconds between two reports.
+        clock (function): Returns the current time in seconds.
+        start (float): The time at which processing started.
+        last_report (float): The time of the last report.
+        records (int): Number of records processed.
+    """
+    action = None
+    output = None
+    interval = None
+    clock = None
+    start = None
+    last_report = None
+    records = None
+
+    def __init__(self, action, output=sys.stderr, interval=VAULT_PROGRESS_INTERVAL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            action (str): The action reported, like exported.
+            output (file, optional): The text stream the reports are written to. Defaults to sys.stderr.
+            interval (float, optional): Number of seconds between two reports. Defaults to VAULT_PROGRESS_INTERVAL_SECONDS.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.action = action
+        self.output = output
+        self.interval = interval
+        self.clock = clock
+        self.start = clock()
+        self.last_report = self.start
+        self.records = 0
+
+    def add(self, records):
+        """Adds processed records and writes a report if the interval has passed since the last one.
+        Args:
+            records (int): Number of records processed.
+        """
+        self.records += records
+        now = self.clock()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.__report()
+
+    def finish(self):
+        """Writes the final report.
+        Returns:
+            dict: The number of records, the seconds spent and the throughput in records/s.
+        """
+        self.__report()
+        seconds = self.clock() - self.start
+        return {
+            'records': self.records,
+            'seconds': seconds,
+            'records_per_second': self.records / seconds if seconds > 0 else 0.0
+        }
+
+    def __report(self):
+        seconds = self.clock() - self.start
+        rate = self.records / seconds if seconds > 0 else 0.0
+        self.output.write('{} {} records ({:.0f} records/s)\n'.format(
+            self.action, self.records, rate))
+        self.output.flush()
+
+
+def load_checkpoint(path):
+    """
+    Args:
+        path (str): Path of the checkpoint file.
+    Returns:
+        dict: The checkpoint, None if the file doesn't exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint to a temporary file and renames it, so that an interruption never leaves a partial checkpoint.
+    Args:
+        path (str): Path of the checkpoint file.
+        checkpoint (dict): The checkpoint.
+    """
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def create_checkpoint(command, header, **progress):
+    """
+    Args:
+        command (str): The command writing the checkpoint.
+        header (bytes): The header of the archive.
+        progress (dict): The progress of the command.
+    Returns:
+        dict: The checkpoint of the progress of the command on the archive.
+    """
+    return dict(progress, command=command, salt=ARCHIVE_HEADER.unpack(header)[2].hex())
+
+
+def assert_checkpoint(checkpoint, command, header):
+    """Asserts that a checkpoint was written by the command for the archive, so that it isn't resumed from the progress of another one.
+    Args:
+        checkpoint (dict): The checkpoint.
+        command (str): The command resuming from the checkpoint.
+        header (bytes): The header of the archive.
+    """
+    assert checkpoint.get('command') == command and checkpoint.get(
+        'salt') == ARCHIVE_HEADER.unpack(header)[2].hex(), ERROR_CHECKPOINT_MISMATCH
+
+
+def assert_master_credentials(dbclient, master_password, master_key):
+    """Asserts that the master password and master key match the row of the master collection.
+    Args:
+        dbclient (DbClient): The database client object.
+        master_password (str): Master password.
+        master_key (str): Master key as sent in requests.
+    Returns:
+        dict: The row of the master collection.
+    """
+    documents = find_at_most(
+        dbclient.get_collection(MASTER_PASSWORD_COLLECTION_NAME), {}, 2)
+    assert len(documents) == 1, ERROR_MULTIPLE_MASTER_ROWS
+    assert documents[0][MASTER_PASSWORD_COLLECTION_MASTER_PASSWORD_FIELD] == generate_hash(
+        master_password), ERROR_MASTER_PASSWORD
+    assert documents[0][MASTER_PASSWORD_COLLECTION_MASTER_KEY_FIELD] == generate_hash(
+        master_key), ERROR_MASTER_KEY
+    return documents[0]
+
+
+def export_vault(dbclient, path, master_password, master_key, batch_size=VAULT_EXPORT_BATCH_SIZE, reporter=None, **writer_options):
+    """Exports the password manager collection to an archive, resuming from its checkpoint if there is one.
+    The records are read in the order of the unique domain and username index, so the checkpoint is the domain and username of the last record written.
+    A checkpoint of another command or archive is rejected with an AssertionError.
+    While the master credentials are rotated, the secrets already re-encrypted with the given credentials are exported.
+    Args:
+        dbclient (DbClient): The database client object.
+        path (str): Path of the archive.
+        master_password (str): Master password.
+        master_key (str): Master key as sent in requests.
+        batch_size (int, optional): Number of records fetched and decrypted at a time. Defaults to VAULT_EXPORT_BATCH_SIZE.
+        reporter (ThroughputReporter, optional): Reports the progress. Defaults to a reporter writing to stderr.
+        writer_options (dict): The frame size and compression level of the ArchiveWriter.
+    Returns:
+        dict: The number of records exported, the seconds spent and the throughput in records/s.
+    """
+    assert_master_credentials(dbclient, master_password, master_key)
+    master_key = int(master_key)
+    if reporter == None:
+        reporter = ThroughputReporter('exported')
+    cipher_key = cipher_key_cache.get_binary(master_password, master_key)
+    checkpoint_path = path + CHECKPOINT_SUFFIX
+    checkpoint = load_checkpoint(checkpoint_path)
+    query = {}
+    if checkpoint == None:
+        stream = open(path, 'wb')
+        writer = ArchiveWriter(stream, cipher_key, **writer_options)
+        checkpoint = {'frames': 0, 'offset': 0, 'records': 0}
+    else:
+        stream = open(path, 'r+b')
+        try:
+            header = read_archive_header(stream)
+            assert_checkpoint(checkpoint, CHECKPOINT_COMMAND_EXPORT, header)
+        except (AssertionError, ValueError):
+            stream.close()
+            raise
+        stream.truncate(checkpoint['offset'])
+        stream.seek(checkpoint['offset'])
+        writer = ArchiveWriter(stream, cipher_key, header,
+                               checkpoint['frames'], **writer_options)
+        query = generate_page_query(*checkpoint['last'])
+
+    with stream:
+        cursor = dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME).find(query, {
+            '_id': 0,
+            PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: 1,
+            PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: 1,
+            PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD: 1,
+            PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD: 1,
+            PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD: 1
+        }).sort([(PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD, 1), (PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD, 1)]).batch_size(batch_size)
+        records = checkpoint['records']
+        credentials_hash = generate_credentials_hash(
+            master_password, master_key)
+        while True:
+            batch = list(itertools.islice(cursor, batch_size))
+            if len(batch) == 0:
+                break
+            secrets = crypto_pool.decrypt_records(master_password, master_key, [
+                record[PASSWORD_MANAGER_COLLECTION_PENDING_SECRETS_FIELD] if record.get(PASSWORD_MANAGER_COLLECTION_PENDING_CREDENTIALS_FIELD) == credentials_hash
+                else record[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] for record in batch])
+            for record, record_secrets in zip(batch, secrets):
+                records += 1
+                domain = record[PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD]
+                username = record[PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD]
+                if writer.write({RECORD_DOMAIN_FIELD: domain, RECORD_USERNAME_FIELD: username, RECORD_SECRETS_FIELD: record_secrets}):
+                    stream.flush()
+                    os.fsync(stream.fileno())
+                    checkpoint = create_checkpoint(CHECKPOINT_COMMAND_EXPORT, writer.header, frames=writer.frame_index,
+                                                   offset=stream.tell(), records=records, last=[domain, username])
+                    save_checkpoint(checkpoint_path, checkpoint)
+            reporter.add(len(batch))
+        writer.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return reporter.finish()
+
+
+def import_vault(dbclient, path, master_password, master_key, batch_size=VAULT_IMPORT_BATCH_SIZE, reporter=None):
+    """Imports the records of an archive into the password manager collection, resuming from its checkpoint if there is one.
+    Every record replaces the record having the same domain and username, so the frames imported before an interruption can be imported again.
+    The import is rejected while the master credentials are rotated, like the write requests.
+    A checkpoint of another command or archive is rejected with an AssertionError.
+    Args:
+        dbclient (DbClient): The database client object.
+        path (str): Path of the archive.
+        master_password (str): Master password.
+        master_key (str): Master key as sent in requests.
+        batch_size (int, optional): Number of records encrypted and written at a time. Defaults to VAULT_IMPORT_BATCH_SIZE.
+        reporter (ThroughputReporter, optional): Reports the progress. Defaults to a reporter writing to stderr.
+    Returns:
+        dict: The number of records imported, the seconds spent and the throughput in records/s.
+    """
+    document = assert_master_credentials(
+        dbclient, master_password, master_key)
+    assert document.get(
+        MASTER_PASSWORD_COLLECTION_ROTATION_FIELD) == None, ERROR_ROTATION_IN_PROGRESS
+    master_key = int(master_key)
+    if reporter == None:
+        reporter = ThroughputReporter('imported')
+    cipher_key = cipher_key_cache.get_binary(master_password, master_key)
+    checkpoint_path = path + CHECKPOINT_SUFFIX
+    checkpoint = load_checkpoint(checkpoint_path)
+    collection = dbclient.get_collection(PASSWORD_MANAGER_COLLECTION_NAME)
+    with open(path, 'rb') as stream:
+        header = read_archive_header(stream)
+        if checkpoint == None:
+            checkpoint = {'frames': 0, 'records': 0}
+        else:
+            assert_checkpoint(checkpoint, CHECKPOINT_COMMAND_IMPORT, header)
+        records = checkpoint['records']
+        stream.seek(0)
+        for index, frame in iterate_archive_frames(stream, cipher_key, checkpoint['frames']):
+            for start in range(0, len(frame), batch_size):
+                batch = frame[start:start + batch_size]
+                secrets = crypto_pool.encrypt_records(master_password, master_key, [
+                    record[RECORD_SECRETS_FIELD] for record in batch])
+                requests = []
+                for record, record_secrets in zip(batch, secrets):
+                    selector = {
+                        PASSWORD_MANAGER_COLLECTION_DOMAIN_FIELD: record[RECORD_DOMAIN_FIELD],
+                        PASSWORD_MANAGER_COLLECTION_USERNAME_FIELD: record[RECORD_USERNAME_FIELD]
+                    }
+                    document = dict(selector)
+                    document[PASSWORD_MANAGER_COLLECTION_SECRETS_FIELD] = record_secrets
+                    document.update(generate_ngram_fields(
+                        record[RECORD_DOMAIN_FIELD], record[RECORD_USERNAME_FIELD]))
+                    requests.append(ReplaceOne(
+                        selector, document, upsert=True))
+                collection.bulk_write(requests, ordered=False)
+                reporter.add(len(batch))
+            records += len(frame)
+            save_checkpoint(checkpoint_path, create_checkpoint(
+                CHECKPOINT_COMMAND_IMPORT, header, frames=index + 1, records=records))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return reporter.finish()
+
+
+def load_master_credentials(password_env=VAULT_MASTER_PASSWORD_ENV, key_env=VAULT_MASTER_KEY_ENV, prompt='Master'):
+    """Reads the master password and master key from the environment, prompting for the ones that are unset.
+    Args:
+        password_env (str, optional): The environment variable of the master password. Defaults to VAULT_MASTER_PASSWORD_ENV.
+        key_env (str, optional): The environment variable of the master key. Defaults to VAULT_MASTER_KEY_ENV.
+        prompt (str, optional): The start of the prompts. Defaults to Master.
+    Returns:
+        (str, str): The master password and master key.
+    """
+    master_password = os.environ.get(password_env)
+    if master_password == None:
+        master_password = getpass.getpass('{} password: '.format(prompt))
+    master_key = os.environ.get(key_env)
+    if master_key == None:
+        master_key = getpass.getpass('{} key: '.format(prompt))
+    return master_password, master_key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Exports the password manager collection to an encrypted archive and imports it back.')
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('archive', help='Path of the archive.')
+    parser.add_argument('--mongo-uri', default=MONGO_URI,
+                        help='Uri of the MongoDB server. Defaults to MONGO_URI.')
+    parser.add_argument('--database', default=DATABASE_NAME,
+                        help='Name of the database. Defaults to DATABASE_NAME.')
+    args = parser.parse_args(argv)
+
+    master_password, master_key = load_master_credentials()
+    dbclient = DbClient(args.mongo_uri, args.database,
+                        client_options=create_client_options(min_pool_size=0))
+    try:
+        if args.command == 'export':
+            result = export_vault(
+                dbclient, args.archive, master_password, master_key)
+        else:
+            result = import_vault(
+                dbclient, args.archive, master_password, master_key)
+    except (AssertionError, ValueError) as e:
+        sys.exit(str(e))
+    finally:
+        crypto_pool.shutdown()
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()